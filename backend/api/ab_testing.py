@@ -0,0 +1,268 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import uuid
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from config import settings
+from database import get_async_db
+from models import ABTest, ABTestResult, ABTestStatus, ABTestVariant
+from schemas import (
+    ABTestCreate, ABTestResponse, ABTestVariantResponse, ABTestResultResponse,
+    ABTestAssignmentResponse, ABTestSummaryResponse, ABTestStatsResponse, ABTestAnalysisRequest,
+    ABTestAnalysisResponse
+)
+from services.ab_analysis import analyze_totals, load_variant_totals, write_decisions
+from services.ab_router import traffic_router
+from services.ab_stats import evaluate, load_variant_names, load_variant_stats
+from services.agent_cache import agent_cache
+
+router = APIRouter()
+
+# Allowed status transitions for the lifecycle endpoints
+TRANSITIONS = {
+    "start": ({ABTestStatus.DRAFT, ABTestStatus.PAUSED}, ABTestStatus.RUNNING),
+    "pause": ({ABTestStatus.RUNNING}, ABTestStatus.PAUSED),
+    "complete": ({ABTestStatus.RUNNING, ABTestStatus.PAUSED}, ABTestStatus.COMPLETED),
+}
+
+async def _get_test(db: AsyncSession, test_id: str) -> ABTest:
+    test = await db.get(ABTest, test_id)
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="A/B test not found"
+        )
+    return test
+
+@router.get("/", response_model=List[ABTestResponse])
+async def list_ab_tests(
+    agent_id: Optional[str] = None,
+    status_filter: Optional[ABTestStatus] = Query(None, alias="status"),
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List A/B tests, newest first"""
+    query = select(ABTest)
+    if agent_id:
+        query = query.where(ABTest.agent_id == agent_id)
+    if status_filter:
+        query = query.where(ABTest.status == status_filter)
+
+    result = await db.execute(
+        query.order_by(ABTest.created_at.desc(), ABTest.id.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+@router.get("/summary", response_model=ABTestSummaryResponse)
+async def get_ab_test_summary(
+    agent_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Count tests by status"""
+    query = select(ABTest.status, func.count()).group_by(ABTest.status)
+    if agent_id:
+        query = query.where(ABTest.agent_id == agent_id)
+    distribution = {
+        (test_status.value if test_status else "unknown"): count
+        for test_status, count in (await db.execute(query)).all()
+    }
+
+    return {
+        "total_tests": sum(distribution.values()),
+        "active_tests": distribution.get(ABTestStatus.RUNNING.value, 0),
+        "completed_tests": distribution.get(ABTestStatus.COMPLETED.value, 0),
+        "avg_improvement": None,
+        "test_distribution": distribution
+    }
+
+@router.get("/analysis", response_model=List[ABTestAnalysisResponse])
+async def analyze_ab_tests(
+    test_id: Optional[List[str]] = Query(None),
+    resamples: int = Query(settings.AB_ANALYSIS_BOOTSTRAP_RESAMPLES, ge=0, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Analyze every running test (or the given ``test_id``s) in one
+    vectorized pass, without writing anything"""
+    rows = await load_variant_totals(db, test_id)
+    if not rows:
+        return []
+    return await run_in_threadpool(analyze_totals, rows, resamples)
+
+@router.post("/analysis", response_model=List[ABTestAnalysisResponse])
+async def apply_ab_test_analysis(
+    request: ABTestAnalysisRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Analyze like ``GET /analysis`` and write winners and confidence back"""
+    rows = await load_variant_totals(db, request.test_ids)
+    if not rows:
+        return []
+    resamples = settings.AB_ANALYSIS_BOOTSTRAP_RESAMPLES if request.resamples is None else request.resamples
+    results = await run_in_threadpool(analyze_totals, rows, resamples)
+    await write_decisions(db, results)
+    await db.commit()
+    return results
+
+@router.get("/assign", response_model=List[ABTestAssignmentResponse])
+async def assign_variants(agent_id: str, subject_key: str):
+    """Variants a subject is routed to, for clients that run the agent
+    themselves and report executions in batches. Served from memory."""
+    return [asdict(assignment) for assignment in traffic_router.assign(agent_id, subject_key)]
+
+@router.post("/", response_model=ABTestResponse, status_code=status.HTTP_201_CREATED)
+async def create_ab_test(
+    ab_test: ABTestCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a draft A/B test and its variants"""
+    agent = await agent_cache.get(db, ab_test.agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    if ab_test.variants:
+        variants = [variant.dict() for variant in ab_test.variants]
+    else:
+        variants = [
+            {"name": name, "traffic_percentage": weight}
+            for name, weight in ab_test.traffic_split.items()
+        ]
+    names = [v["name"] for v in variants]
+    if len(set(names)) != len(names):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Variant names must be unique"
+        )
+    weights = [v["traffic_percentage"] for v in variants]
+    if not weights or min(weights) < 0 or max(weights) <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Traffic weights must be non-negative with at least one positive"
+        )
+
+    test_id = str(uuid.uuid4())
+    db_test = ABTest(
+        id=test_id,
+        status=ABTestStatus.DRAFT,
+        **ab_test.dict(exclude={"variants"})
+    )
+    if ab_test.variants:
+        db_test.traffic_split = {v["name"]: v["traffic_percentage"] for v in variants}
+    db.add(db_test)
+    db.add_all(ABTestVariant(id=str(uuid.uuid4()), ab_test_id=test_id, **v) for v in variants)
+    await db.commit()
+    await db.refresh(db_test)
+    return db_test
+
+@router.get("/{test_id}", response_model=ABTestResponse)
+async def get_ab_test(
+    test_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get A/B test by ID"""
+    return await _get_test(db, test_id)
+
+@router.get("/{test_id}/variants", response_model=List[ABTestVariantResponse])
+async def list_ab_test_variants(
+    test_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List a test's variants"""
+    await _get_test(db, test_id)
+    result = await db.execute(
+        select(ABTestVariant).where(ABTestVariant.ab_test_id == test_id).order_by(ABTestVariant.name)
+    )
+    return result.scalars().all()
+
+@router.get("/{test_id}/results", response_model=List[ABTestResultResponse])
+async def list_ab_test_results(
+    test_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-variant result rows, oldest period first"""
+    await _get_test(db, test_id)
+    result = await db.execute(
+        select(ABTestResult)
+        .where(ABTestResult.ab_test_id == test_id)
+        .order_by(ABTestResult.period_start, ABTestResult.variant_id)
+    )
+    return result.scalars().all()
+
+@router.get("/{test_id}/stats", response_model=ABTestStatsResponse)
+async def get_ab_test_stats(
+    test_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cumulative per-variant stats and significance against the baseline,
+    merged from the period rows (as of the last stats flush)"""
+    test = await _get_test(db, test_id)
+    totals = (await load_variant_stats(db, [test_id])).get(test_id, {})
+    names = (await load_variant_names(db, [test_id])).get(test_id, {})
+    analysis = evaluate(totals, names)
+
+    variants = []
+    for variant_id, name in sorted(names.items(), key=lambda item: item[1]):
+        stats = totals.get(variant_id)
+        comparison = analysis["comparisons"].get(variant_id, {})
+        variants.append({
+            "variant_id": variant_id,
+            "variant_name": name,
+            "is_baseline": variant_id == analysis["baseline_variant_id"],
+            "executions_count": stats.executions if stats else 0,
+            "success_rate": stats.success_rate if stats else None,
+            "avg_execution_time": stats.execution_time.mean_or_none() if stats else None,
+            "avg_cost": stats.cost.mean_or_none() if stats else None,
+            "avg_rating": stats.rating.mean_or_none() if stats else None,
+            "lift": comparison.get("lift"),
+            "p_value": comparison.get("p_value"),
+            "sequential_p_value": comparison.get("sequential_p_value")
+        })
+
+    return {
+        "ab_test_id": test_id,
+        "baseline_variant_id": analysis["baseline_variant_id"],
+        "winner_variant_id": test.winner_variant_id,
+        "confidence_level": test.confidence_level,
+        "variants": variants
+    }
+
+@router.post("/{test_id}/{action}", response_model=ABTestResponse)
+async def transition_ab_test(
+    test_id: str,
+    action: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Start, pause or complete a test; routers pick the change up at once"""
+    if action not in TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown action: {action}"
+        )
+    allowed, target = TRANSITIONS[action]
+
+    test = await _get_test(db, test_id)
+    if test.status not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot {action} a {test.status.value} test"
+        )
+
+    now = datetime.now(timezone.utc)
+    test.status = target
+    if target == ABTestStatus.RUNNING and test.start_date is None:
+        test.start_date = now
+    if target == ABTestStatus.COMPLETED:
+        test.end_date = now
+    test.updated_at = now
+    await db.commit()
+    await db.refresh(test)
+
+    await traffic_router.notify_changed()
+    return test
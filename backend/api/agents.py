@@ -1,36 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+import json
 import uuid
 from datetime import datetime
 
-from database import get_db
-from models import Agent, AgentExecution, AgentStatus
+from config import settings
+from database import get_async_db
+from models import Agent, AgentExecution, AgentStatus, RollupGranularity
 from schemas import (
     AgentCreate, AgentUpdate, AgentResponse,
-    AgentExecutionCreate, AgentExecutionResponse
+    AgentExecutionCreate, AgentExecutionResponse,
+    AgentExecutionRecord, AgentExecutionBatchResponse, SimilarInputQuery, SimilarInputResponse,
+    AgentMetricsResponse, MetricsTimeseriesResponse, MetricsQuantilesResponse
 )
+from services.ab_router import traffic_router
+from services.ab_stats import ab_stats
+from services.agent_cache import agent_cache
+from services.export_service import stream_arrow, stream_ndjson
+from services.execution_service import (
+    build_execution_row, find_missing_agents, insert_execution_rows
+)
+from services.metrics_service import get_execution_stats, get_timeseries, get_quantiles, sketch_buffer
+from services.near_duplicates import near_duplicates
+from services.ingest_buffer import execution_buffer, BufferFullError
+from utils.pagination import paginate, set_next_cursor
 
 router = APIRouter()
 
 @router.get("/", response_model=List[AgentResponse])
 async def list_agents(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[AgentStatus] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all agents"""
-    query = db.query(Agent)
+    """List all agents, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page; ``skip`` is still honoured when no cursor is given.
+    """
+    query = select(Agent)
     if status:
-        query = query.filter(Agent.status == status)
-    agents = query.offset(skip).limit(limit).all()
+        query = query.where(Agent.status == status)
+    query = paginate(query, Agent.created_at, Agent.id, cursor, skip)
+    result = await db.execute(query.limit(limit))
+    agents = result.scalars().all()
+    set_next_cursor(response, agents, limit)
     return agents
 
 @router.post("/", response_model=AgentResponse, status_code=status.HTTP_201_CREATED)
 async def create_agent(
     agent: AgentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new agent"""
     db_agent = Agent(
@@ -38,17 +65,97 @@ async def create_agent(
         **agent.dict()
     )
     db.add(db_agent)
-    db.commit()
-    db.refresh(db_agent)
+    await db.commit()
+    await db.refresh(db_agent)
     return db_agent
 
+@router.post(
+    "/executions/batch",
+    response_model=AgentExecutionBatchResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def ingest_executions(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Record many executions, for one or more agents, in a single write.
+
+    Accepts a JSON array or NDJSON (``application/x-ndjson``) body.
+    Re-sending an execution is a no-op only if it carries the same ``id``
+    and ``created_at`` (the partitioned table's key), so a client-supplied
+    ``id`` must come with a ``created_at``.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            payload = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Malformed body: {e}"
+        )
+
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array or NDJSON body"
+        )
+    if len(payload) > settings.MAX_EXECUTION_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.MAX_EXECUTION_BATCH_SIZE} executions"
+        )
+
+    try:
+        records = [AgentExecutionRecord(**item) for item in payload]
+    except (ValidationError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+    unstamped = [i for i, r in enumerate(records) if r.id and r.created_at is None]
+    if unstamped:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Executions with an id need a created_at (items {', '.join(map(str, unstamped[:10]))})"
+        )
+
+    missing = await find_missing_agents(db, {r.agent_id for r in records})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent not found: {', '.join(sorted(missing))}"
+        )
+
+    rows = []
+    for record in records:
+        row = build_execution_row(record.agent_id, record.dict())
+        # Executions the client already routed keep their assignments
+        # where they match a running test
+        traffic_router.route_execution(row, record.subject_key)
+        rows.append(row)
+    # Re-sent executions (same id and created_at) are skipped, not rejected
+    inserted = await insert_execution_rows(db, rows)
+    await db.commit()
+    ab_stats.record_executions(inserted)
+    sketch_buffer.record_executions(inserted)
+    near_duplicates.record_executions(inserted)
+
+    return {
+        "inserted": len(inserted),
+        "execution_ids": [row["id"] for row in rows]
+    }
+
 @router.get("/{agent_id}", response_model=AgentResponse)
 async def get_agent(
     agent_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get agent by ID"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await agent_cache.get(db, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,135 +167,244 @@ async def get_agent(
 async def update_agent(
     agent_id: str,
     agent_update: AgentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update agent"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
+
     update_data = agent_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(agent, field, value)
-    
+
     agent.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
+    await agent_cache.invalidate(agent_id)
     return agent
 
 @router.delete("/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_agent(
     agent_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete agent"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
-    db.delete(agent)
-    db.commit()
+
+    await db.delete(agent)
+    await db.commit()
+    await agent_cache.invalidate(agent_id)
+    near_duplicates.forget(agent_id)
 
 @router.post("/{agent_id}/execute", response_model=AgentExecutionResponse)
 async def execute_agent(
     agent_id: str,
     execution: AgentExecutionCreate,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Execute an agent and record the execution"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    """Execute an agent and record the execution.
+
+    With EXECUTION_WRITE_BEHIND enabled the execution is queued and
+    acknowledged with 202 before it is written.
+    """
+    agent = await agent_cache.get(db, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
-    # TODO: Actually execute the agent using the appropriate model
+
+    # TODO: Actually execute the agent using the appropriate model (the
+    # assigned variant's model_version_id when an A/B test is running)
     # For now, create a mock execution
-    execution_id = str(uuid.uuid4())
-    
-    db_execution = AgentExecution(
-        id=execution_id,
-        agent_id=agent_id,
-        input_data=execution.input_data,
-        output_data={"result": "Mock execution result"},  # Mock output
-        context=execution.context,
-        success=True,
-        execution_time_ms=100,  # Mock execution time
-        cost=0.001,  # Mock cost
-        metadata=execution.metadata
-    )
-    
-    db.add(db_execution)
-    db.commit()
-    db.refresh(db_execution)
-    return db_execution
+    row = build_execution_row(agent_id, {
+        "input_data": execution.input_data,
+        "output_data": {"result": "Mock execution result"},  # Mock output
+        "context": execution.context,
+        "success": True,
+        "execution_time_ms": 100,  # Mock execution time
+        "cost": 0.001,  # Mock cost
+        "metadata": execution.metadata
+    })
+    traffic_router.tag_execution(row, execution.subject_key)
+
+    if execution_buffer.running:
+        try:
+            await execution_buffer.submit(row)
+        except BufferFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Execution buffer full: {e}",
+                headers={"Retry-After": "1"}
+            )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return row
+
+    inserted = await insert_execution_rows(db, [row])
+    await db.commit()
+    ab_stats.record_executions(inserted)
+    sketch_buffer.record_executions(inserted)
+    near_duplicates.record_executions(inserted)
+    return row
 
 @router.get("/{agent_id}/executions", response_model=List[AgentExecutionResponse])
 async def list_agent_executions(
     agent_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all executions for an agent"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    """List all executions for an agent, newest first (see list_agents for cursors)"""
+    agent = await agent_cache.get(db, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
-    executions = db.query(AgentExecution)\
-        .filter(AgentExecution.agent_id == agent_id)\
-        .order_by(AgentExecution.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
+
+    query = paginate(
+        select(AgentExecution).where(AgentExecution.agent_id == agent_id),
+        AgentExecution.created_at, AgentExecution.id, cursor, skip
+    )
+    result = await db.execute(query.limit(limit))
+    executions = result.scalars().all()
+    set_next_cursor(response, executions, limit)
+
     return executions
 
-@router.get("/{agent_id}/metrics")
+@router.get("/{agent_id}/executions/export")
+async def export_agent_executions(
+    agent_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream every execution for an agent joined with its feedback.
+
+    ``format=ndjson`` emits one JSON object per line; ``format=arrow``
+    emits an Arrow IPC stream (requires pyarrow).
+    """
+    agent = await agent_cache.get(db, agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Arrow export requires pyarrow"
+            )
+        return StreamingResponse(
+            stream_arrow(agent_id, since=since, until=until),
+            media_type="application/vnd.apache.arrow.stream"
+        )
+
+    return StreamingResponse(
+        stream_ndjson(agent_id, since=since, until=until),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/{agent_id}/similar-inputs", response_model=List[SimilarInputResponse])
+async def find_similar_inputs(
+    agent_id: str,
+    query: SimilarInputQuery,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Executions and scenarios of an agent whose input is a near-duplicate
+    of ``input_data``, most similar first"""
+    agent = await agent_cache.get(db, agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    return await near_duplicates.similar(
+        db, agent_id, query.input_data,
+        threshold=query.threshold or settings.NEAR_DUP_THRESHOLD,
+        limit=query.limit
+    )
+
+@router.get("/{agent_id}/metrics", response_model=AgentMetricsResponse)
 async def get_agent_metrics(
     agent_id: str,
-    db: Session = Depends(get_db)
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get agent performance metrics"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    """Get agent performance metrics, optionally within [since, until).
+
+    Lifetime metrics are read from rollups; windows query raw executions.
+    """
+    agent = await agent_cache.get(db, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
-    # Calculate basic metrics
-    executions = db.query(AgentExecution)\
-        .filter(AgentExecution.agent_id == agent_id)\
-        .all()
-    
-    if not executions:
-        return {
-            "total_executions": 0,
-            "success_rate": 0,
-            "avg_execution_time": 0,
-            "avg_cost": 0
-        }
-    
-    total = len(executions)
-    successful = sum(1 for e in executions if e.success)
-    avg_time = sum(e.execution_time_ms or 0 for e in executions) / total
-    avg_cost = sum(e.cost or 0 for e in executions) / total
-    
+
+    return await get_execution_stats(db, agent_id, since=since, until=until)
+
+@router.get("/{agent_id}/metrics/timeseries", response_model=MetricsTimeseriesResponse)
+async def get_agent_metrics_timeseries(
+    agent_id: str,
+    granularity: RollupGranularity = RollupGranularity.HOUR,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get bucketed agent metrics, read only from pre-aggregated rollups"""
+    agent = await agent_cache.get(db, agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    buckets = await get_timeseries(db, agent_id, granularity, since=since, until=until)
     return {
-        "total_executions": total,
-        "success_rate": successful / total if total > 0 else 0,
-        "avg_execution_time_ms": avg_time,
-        "avg_cost": avg_cost,
-        "last_execution": max(e.created_at for e in executions).isoformat() if executions else None
-    }
\ No newline at end of file
+        "agent_id": agent_id,
+        "granularity": granularity,
+        "buckets": buckets
+    }
+
+@router.get("/{agent_id}/metrics/quantiles", response_model=MetricsQuantilesResponse)
+async def get_agent_metrics_quantiles(
+    agent_id: str,
+    q: List[float] = Query([0.5, 0.9, 0.99]),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get execution time and cost percentiles from merged rollup sketches"""
+    if any(not 0 <= quantile <= 1 for quantile in q):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Quantiles must be between 0 and 1"
+        )
+
+    agent = await agent_cache.get(db, agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    return await get_quantiles(db, agent_id, q, since=since, until=until)
@@ -0,0 +1,229 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import json
+import uuid
+
+from config import settings
+from database import get_async_db
+from models import TrainingDataset
+from schemas import (
+    TrainingDatasetCreate, TrainingDatasetResponse, TrainingDatasetPageResponse,
+    TrainingDatasetBuildCreate
+)
+from services.agent_cache import agent_cache
+from services.dataset_builder import build_dataset, new_build_state
+from services.dataset_store import DatasetWriter, delete_dataset_files, empty_manifest, read_page
+
+router = APIRouter()
+
+async def _get_dataset(db: AsyncSession, dataset_id: str) -> TrainingDataset:
+    # Never load the legacy inline ``data`` column unless a reader needs it
+    dataset = await db.scalar(
+        select(TrainingDataset)
+        .options(defer(TrainingDataset.data))
+        .where(TrainingDataset.id == dataset_id)
+    )
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+    return dataset
+
+@router.get("/", response_model=List[TrainingDatasetResponse])
+async def list_datasets(
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List dataset manifests"""
+    result = await db.execute(
+        select(TrainingDataset)
+        .options(defer(TrainingDataset.data))
+        .order_by(TrainingDataset.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+@router.post("/", response_model=TrainingDatasetResponse, status_code=status.HTTP_201_CREATED)
+async def create_dataset(
+    dataset: TrainingDatasetCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a dataset; examples are written out of row as Parquet chunks"""
+    dataset_id = str(uuid.uuid4())
+
+    def write() -> dict:
+        writer = DatasetWriter(dataset_id)
+        writer.extend(dataset.data)
+        return writer.close()
+
+    manifest = await run_in_threadpool(write)
+    db_dataset = TrainingDataset(
+        id=dataset_id,
+        manifest=manifest,
+        example_count=manifest["total_rows"],
+        **dataset.dict(exclude={"data"})
+    )
+    db.add(db_dataset)
+    await db.commit()
+    return await _get_dataset(db, dataset_id)
+
+@router.post("/upload", response_model=TrainingDatasetResponse, status_code=status.HTTP_201_CREATED)
+async def upload_dataset(
+    request: Request,
+    name: str,
+    description: Optional[str] = None,
+    source_type: str = "import",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a dataset from an NDJSON body, one example per line.
+
+    The body is consumed as a stream and written chunk by chunk, so the
+    upload never has to fit in memory.
+    """
+    dataset_id = str(uuid.uuid4())
+    writer = DatasetWriter(dataset_id)
+    pending: List[dict] = []
+    buffer = b""
+
+    # Chunks already written are removed on any failure, including a
+    # client disconnect or cancellation mid-stream
+    try:
+        try:
+            async for part in request.stream():
+                buffer += part
+                *lines, buffer = buffer.split(b"\n")
+                pending.extend(json.loads(line) for line in lines if line.strip())
+                if len(pending) >= settings.DATASET_CHUNK_ROWS:
+                    await run_in_threadpool(writer.extend, pending)
+                    pending = []
+            if buffer.strip():
+                pending.append(json.loads(buffer))
+            await run_in_threadpool(writer.extend, pending)
+        except ValueError as e:
+            # JSONDecodeError and UnicodeDecodeError are both ValueErrors
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Malformed NDJSON: {e}"
+            )
+        manifest = await run_in_threadpool(writer.close)
+
+        db.add(TrainingDataset(
+            id=dataset_id,
+            name=name,
+            description=description,
+            source_type=source_type,
+            manifest=manifest,
+            example_count=manifest["total_rows"],
+            statistics={}
+        ))
+        await db.commit()
+    except BaseException:
+        delete_dataset_files(dataset_id)
+        raise
+    return await _get_dataset(db, dataset_id)
+
+@router.post("/from-feedback", response_model=TrainingDatasetResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_feedback_dataset(
+    request: TrainingDatasetBuildCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a dataset fed incrementally from an agent's feedback and start
+    the first build in the background"""
+    agent = await agent_cache.get(db, request.agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    dataset_id = str(uuid.uuid4())
+    db.add(TrainingDataset(
+        id=dataset_id,
+        name=request.name,
+        description=request.description,
+        source_type="feedback",
+        manifest=empty_manifest(),
+        example_count=0,
+        statistics={},
+        build_state=new_build_state(
+            request.agent_id, request.min_rating, request.model_version_id,
+            settings.NEAR_DUP_THRESHOLD if request.drop_near_duplicates else None
+        )
+    ))
+    await db.commit()
+
+    background_tasks.add_task(build_dataset, dataset_id)
+    return await _get_dataset(db, dataset_id)
+
+@router.post("/{dataset_id}/build", response_model=TrainingDatasetResponse, status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_feedback_dataset(
+    dataset_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Append feedback that arrived since the last build"""
+    dataset = await _get_dataset(db, dataset_id)
+    if not dataset.build_state:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dataset is not built from feedback"
+        )
+
+    background_tasks.add_task(build_dataset, dataset_id)
+    return dataset
+
+@router.get("/{dataset_id}", response_model=TrainingDatasetResponse)
+async def get_dataset(
+    dataset_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a dataset manifest and statistics"""
+    return await _get_dataset(db, dataset_id)
+
+@router.get("/{dataset_id}/examples", response_model=TrainingDatasetPageResponse)
+async def get_dataset_examples(
+    dataset_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.DATASET_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of examples, reading only the row groups it spans"""
+    dataset = await _get_dataset(db, dataset_id)
+
+    if dataset.manifest:
+        examples = await run_in_threadpool(read_page, dataset.manifest, offset, limit)
+        total = dataset.manifest["total_rows"]
+    else:
+        # Legacy dataset stored inline before chunked storage existed
+        data = await db.scalar(
+            select(TrainingDataset.data).where(TrainingDataset.id == dataset_id)
+        ) or []
+        examples = data[offset:offset + limit]
+        total = len(data)
+
+    return {
+        "dataset_id": dataset_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "examples": examples
+    }
+
+@router.delete("/{dataset_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_dataset(
+    dataset_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a dataset and its chunk files"""
+    dataset = await _get_dataset(db, dataset_id)
+    await db.delete(dataset)
+    await db.commit()
+    await run_in_threadpool(delete_dataset_files, dataset_id)
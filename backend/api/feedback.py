@@ -1,62 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import uuid
 from datetime import datetime
 
-from database import get_db
-from models import Feedback, AgentExecution, Agent
-from schemas import FeedbackCreate, FeedbackResponse
+from config import settings
+from database import get_async_db
+from models import Feedback, AgentExecution, FeedbackType
+from schemas import (
+    FeedbackCreate, FeedbackResponse, FeedbackSummaryResponse, FeedbackBatchResponse
+)
+from services.ab_stats import ab_stats
+from services.agent_cache import agent_cache
+from services.auto_feedback import REVIEWER_ID, load_scorer
+from services.feedback_service import resolve_executions, upsert_feedback_rows
+from utils.cache import TTLCache
+from utils.pagination import paginate, set_next_cursor
 
 router = APIRouter()
 
+# Per-worker cache of feedback summaries keyed by agent_id. Writes through
+# this worker invalidate immediately; other workers catch up within the TTL.
+summary_cache = TTLCache(ttl=settings.FEEDBACK_SUMMARY_CACHE_TTL_SECONDS)
+
 @router.get("/", response_model=List[FeedbackResponse])
 async def list_feedback(
+    response: Response,
     agent_id: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all feedback"""
-    query = db.query(Feedback)
+    """List all feedback, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page; ``skip`` is still honoured when no cursor is given.
+    """
+    query = select(Feedback)
     if agent_id:
-        query = query.filter(Feedback.agent_id == agent_id)
-    
-    feedback = query.order_by(Feedback.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
+        query = query.where(Feedback.agent_id == agent_id)
+
+    query = paginate(query, Feedback.created_at, Feedback.id, cursor, skip)
+    result = await db.execute(query.limit(limit))
+    feedback = result.scalars().all()
+    set_next_cursor(response, feedback, limit)
     return feedback
 
 @router.post("/", response_model=FeedbackResponse, status_code=status.HTTP_201_CREATED)
 async def create_feedback(
     feedback: FeedbackCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create feedback for an agent execution"""
     # Check if execution exists
-    execution = db.query(AgentExecution)\
-        .filter(AgentExecution.id == feedback.execution_id)\
-        .first()
-    
+    execution = await db.scalar(
+        select(AgentExecution).where(AgentExecution.id == feedback.execution_id)
+    )
+
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Execution not found"
         )
-    
+
     # Check if feedback already exists for this execution
-    existing_feedback = db.query(Feedback)\
-        .filter(Feedback.execution_id == feedback.execution_id)\
-        .first()
-    
+    existing_feedback = await db.scalar(
+        select(Feedback.id).where(Feedback.execution_id == feedback.execution_id)
+    )
+
     if existing_feedback:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Feedback already exists for this execution"
         )
-    
+
     # Create feedback
     db_feedback = Feedback(
         id=str(uuid.uuid4()),
@@ -64,19 +83,94 @@ async def create_feedback(
         execution_id=feedback.execution_id,
         **feedback.dict(exclude={"execution_id"})
     )
-    
+
     db.add(db_feedback)
-    db.commit()
-    db.refresh(db_feedback)
+    await db.commit()
+    await db.refresh(db_feedback)
+    summary_cache.invalidate(db_feedback.agent_id)
+    ab_stats.record_ratings([(db_feedback.execution_id, db_feedback.rating)])
     return db_feedback
 
+@router.post("/batch", response_model=FeedbackBatchResponse)
+async def create_feedback_batch(
+    items: List[FeedbackCreate],
+    update_existing: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create feedback for many executions in one round trip.
+
+    Executions are resolved with a single query and rows are written with
+    one INSERT ... ON CONFLICT (execution_id). Existing feedback is left
+    alone unless ``update_existing`` is set. Each item gets its own status.
+    """
+    if len(items) > settings.MAX_FEEDBACK_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.MAX_FEEDBACK_BATCH_SIZE} items"
+        )
+
+    executions = await resolve_executions(db, (item.execution_id for item in items))
+
+    statuses = {}
+    rows = []
+    seen = set()
+    for index, item in enumerate(items):
+        if item.execution_id not in executions:
+            statuses[index] = "execution_not_found"
+        elif item.execution_id in seen:
+            statuses[index] = "duplicate_in_batch"
+        else:
+            seen.add(item.execution_id)
+            rows.append({
+                "agent_id": executions[item.execution_id],
+                "execution_id": item.execution_id,
+                **item.dict(exclude={"execution_id"})
+            })
+
+    written = await upsert_feedback_rows(db, rows, update_existing=update_existing)
+    await db.commit()
+
+    for agent_id in {row["agent_id"] for row in rows}:
+        summary_cache.invalidate(agent_id)
+    # Only new feedback: an updated rating is already in the running
+    # totals and adding it again would count it twice
+    ab_stats.record_ratings(
+        (row["execution_id"], row["rating"]) for row in rows
+        if row["execution_id"] in written and written[row["execution_id"]][1]
+    )
+
+    results = []
+    counts = {"created": 0, "updated": 0, "skipped": 0}
+    for index, item in enumerate(items):
+        feedback_id = None
+        if index in statuses:
+            item_status = statuses[index]
+        elif item.execution_id in written:
+            feedback_id, inserted = written[item.execution_id]
+            item_status = "created" if inserted else "updated"
+        else:
+            item_status = "already_exists"
+
+        if item_status in ("created", "updated"):
+            counts[item_status] += 1
+        else:
+            counts["skipped"] += 1
+        results.append({
+            "index": index,
+            "execution_id": item.execution_id,
+            "status": item_status,
+            "feedback_id": feedback_id
+        })
+
+    return {**counts, "results": results}
+
 @router.get("/{feedback_id}", response_model=FeedbackResponse)
 async def get_feedback(
     feedback_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get feedback by ID"""
-    feedback = db.query(Feedback).filter(Feedback.id == feedback_id).first()
+    feedback = await db.get(Feedback, feedback_id)
     if not feedback:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,136 +178,152 @@ async def get_feedback(
         )
     return feedback
 
-@router.get("/agent/{agent_id}/summary")
+@router.get("/agent/{agent_id}/summary", response_model=FeedbackSummaryResponse)
 async def get_feedback_summary(
     agent_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get feedback summary for an agent"""
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    cached = summary_cache.get(agent_id)
+    if cached is not None:
+        return cached
+
+    agent = await agent_cache.get(db, agent_id)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found"
         )
-    
-    feedback_list = db.query(Feedback)\
-        .filter(Feedback.agent_id == agent_id)\
-        .all()
-    
-    if not feedback_list:
-        return {
+
+    # One grouped scan yields both the rating and the type distribution
+    result = await db.execute(
+        select(Feedback.rating, Feedback.type, func.count())
+        .where(Feedback.agent_id == agent_id)
+        .group_by(Feedback.rating, Feedback.type)
+    )
+    groups = result.all()
+
+    if not groups:
+        summary = {
             "total_feedback": 0,
             "avg_rating": None,
             "rating_distribution": {},
             "feedback_types": {}
         }
-    
-    # Calculate statistics
-    total = len(feedback_list)
-    
-    # Rating distribution
+        summary_cache.set(agent_id, summary)
+        return summary
+
+    total = 0
     rating_dist = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    ratings = []
-    
-    # Feedback type distribution
     type_dist = {}
-    
-    for fb in feedback_list:
-        if fb.rating:
-            rating_dist[fb.rating] = rating_dist.get(fb.rating, 0) + 1
-            ratings.append(fb.rating)
-        
-        fb_type = fb.type.value if fb.type else "unknown"
-        type_dist[fb_type] = type_dist.get(fb_type, 0) + 1
-    
-    avg_rating = sum(ratings) / len(ratings) if ratings else None
-    
-    return {
+
+    for rating, fb_type, count in groups:
+        total += count
+        if rating:
+            rating_dist[rating] = rating_dist.get(rating, 0) + count
+
+        fb_type = fb_type.value if fb_type else "unknown"
+        type_dist[fb_type] = type_dist.get(fb_type, 0) + count
+
+    rated = sum(rating_dist.values())
+    avg_rating = sum(r * c for r, c in rating_dist.items()) / rated if rated else None
+
+    summary = {
         "total_feedback": total,
         "avg_rating": avg_rating,
         "rating_distribution": rating_dist,
         "feedback_types": type_dist
     }
+    summary_cache.set(agent_id, summary)
+    return summary
 
 @router.get("/execution/{execution_id}")
 async def get_feedback_for_execution(
     execution_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get feedback for a specific execution"""
-    execution = db.query(AgentExecution)\
-        .filter(AgentExecution.id == execution_id)\
-        .first()
-    
+    execution = await db.scalar(
+        select(AgentExecution).where(AgentExecution.id == execution_id)
+    )
+
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Execution not found"
         )
-    
-    feedback = db.query(Feedback)\
-        .filter(Feedback.execution_id == execution_id)\
-        .first()
-    
+
+    feedback = await db.scalar(
+        select(Feedback).where(Feedback.execution_id == execution_id)
+    )
+
     if not feedback:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No feedback found for this execution"
         )
-    
+
     return feedback
 
 @router.post("/auto/{execution_id}")
 async def create_auto_feedback(
     execution_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create automated feedback for an execution"""
-    execution = db.query(AgentExecution)\
-        .filter(AgentExecution.id == execution_id)\
-        .first()
-    
+    execution = await db.scalar(
+        select(AgentExecution).where(AgentExecution.id == execution_id)
+    )
+
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Execution not found"
         )
-    
+
     # Check if feedback already exists
-    existing_feedback = db.query(Feedback)\
-        .filter(Feedback.execution_id == execution_id)\
-        .first()
-    
+    existing_feedback = await db.scalar(
+        select(Feedback.id).where(Feedback.execution_id == execution_id)
+    )
+
     if existing_feedback:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Feedback already exists for this execution"
         )
-    
-    # TODO: Implement actual automated feedback logic
-    # For now, create mock feedback based on execution success
-    if execution.success:
-        rating = 5
-        binary_feedback = True
-        comment = "Execution successful"
-    else:
-        rating = 1
-        binary_feedback = False
-        comment = "Execution failed"
-    
+
+    # Same pluggable scorer as the bulk worker (services/auto_feedback.py)
+    score = load_scorer()({
+        "id": execution.id,
+        "agent_id": execution.agent_id,
+        "input_data": execution.input_data,
+        "output_data": execution.output_data,
+        "success": execution.success,
+        "execution_time_ms": execution.execution_time_ms,
+        "cost": execution.cost,
+        "created_at": execution.created_at
+    })
+    if score is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Execution cannot be scored automatically"
+        )
+
     db_feedback = Feedback(
         id=str(uuid.uuid4()),
         agent_id=execution.agent_id,
         execution_id=execution_id,
-        type="rating",
-        rating=rating,
-        binary_feedback=binary_feedback,
-        comment=comment,
-        reviewer_id="auto_feedback_system"
+        type=FeedbackType.RATING,
+        rating=score.get("rating"),
+        binary_feedback=score.get("binary_feedback"),
+        comment=score.get("comment"),
+        correction=score.get("correction"),
+        reviewer_id=REVIEWER_ID
     )
-    
+
     db.add(db_feedback)
-    db.commit()
-    db.refresh(db_feedback)
-    return db_feedback
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_feedback)
+    summary_cache.invalidate(db_feedback.agent_id)
+    ab_stats.record_ratings([(db_feedback.execution_id, db_feedback.rating)])
+    return db_feedback
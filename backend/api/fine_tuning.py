@@ -0,0 +1,245 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import uuid
+from datetime import datetime, timezone
+
+from database import get_async_db
+from models import FineTuningJob, FineTuningStatus, FineTuningSweep, ModelVersion, TrainingDataset
+from schemas import (
+    FineTuningJobCreate, FineTuningJobResponse, FineTuningSweepCreate, FineTuningSweepResponse,
+    FineTuningSweepDetailResponse
+)
+from services.agent_cache import agent_cache
+from services.fine_tuning_scheduler import notify_jobs_changed
+from services.sweeps import FINISHED, cancel_sweep, create_sweep, finish_sweep, lock_sweeps
+from utils.sweeps import validate_space
+
+router = APIRouter()
+
+# A job can only be cancelled before it has finished
+CANCELLABLE = {FineTuningStatus.PENDING, FineTuningStatus.RUNNING}
+
+async def _get_job(db: AsyncSession, job_id: str, for_update: bool = False) -> FineTuningJob:
+    query = select(FineTuningJob).where(FineTuningJob.id == job_id)
+    if for_update:
+        query = query.with_for_update().execution_options(populate_existing=True)
+    job = await db.scalar(query)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fine-tuning job not found"
+        )
+    return job
+
+async def _check_references(
+    db: AsyncSession,
+    agent_id: str,
+    training_dataset_id: str,
+    base_model_version_id: str
+) -> None:
+    agent = await agent_cache.get(db, agent_id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    if not await db.scalar(select(TrainingDataset.id).where(TrainingDataset.id == training_dataset_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Training dataset not found"
+        )
+    if not await db.scalar(select(ModelVersion.id).where(ModelVersion.id == base_model_version_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Base model version not found"
+        )
+
+async def _get_sweep(db: AsyncSession, sweep_id: str, for_update: bool = False) -> FineTuningSweep:
+    query = select(FineTuningSweep).where(FineTuningSweep.id == sweep_id)
+    if for_update:
+        query = query.with_for_update()
+    sweep = await db.scalar(query)
+    if not sweep:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweep not found"
+        )
+    return sweep
+
+@router.get("/", response_model=List[FineTuningJobResponse])
+async def list_fine_tuning_jobs(
+    agent_id: Optional[str] = None,
+    status_filter: Optional[FineTuningStatus] = Query(None, alias="status"),
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List fine-tuning jobs, newest first"""
+    query = select(FineTuningJob)
+    if agent_id:
+        query = query.where(FineTuningJob.agent_id == agent_id)
+    if status_filter:
+        query = query.where(FineTuningJob.status == status_filter)
+
+    result = await db.execute(
+        query.order_by(FineTuningJob.created_at.desc(), FineTuningJob.id.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+@router.get("/queue")
+async def get_queue_summary(db: AsyncSession = Depends(get_async_db)):
+    """Count jobs by status"""
+    result = await db.execute(
+        select(FineTuningJob.status, func.count()).group_by(FineTuningJob.status)
+    )
+    return {
+        (job_status.value if job_status else "unknown"): count
+        for job_status, count in result.all()
+    }
+
+@router.post("/", response_model=FineTuningJobResponse, status_code=status.HTTP_201_CREATED)
+async def create_fine_tuning_job(
+    job: FineTuningJobCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Queue a fine-tuning job; an idle scheduler picks it up at once"""
+    await _check_references(db, job.agent_id, job.training_dataset_id, job.base_model_version_id)
+
+    db_job = FineTuningJob(
+        id=str(uuid.uuid4()),
+        status=FineTuningStatus.PENDING,
+        **job.dict()
+    )
+    db.add(db_job)
+    await notify_jobs_changed(db)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+@router.get("/sweeps", response_model=List[FineTuningSweepResponse])
+async def list_sweeps(
+    agent_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List hyperparameter sweeps, newest first"""
+    query = select(FineTuningSweep)
+    if agent_id:
+        query = query.where(FineTuningSweep.agent_id == agent_id)
+    result = await db.execute(
+        query.order_by(FineTuningSweep.created_at.desc(), FineTuningSweep.id.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+@router.post("/sweeps", response_model=FineTuningSweepResponse, status_code=status.HTTP_201_CREATED)
+async def create_fine_tuning_sweep(
+    request: FineTuningSweepCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Queue one trial job per sampled configuration. Trials that fall
+    behind at a rung are stopped early; the best finished trial's model
+    version is recorded (and promoted) when the last trial ends."""
+    if request.min_resource > request.max_resource:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_resource must not exceed max_resource"
+        )
+    try:
+        validate_space(request.search_space)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid search space: {e}"
+        )
+    await _check_references(db, request.agent_id, request.training_dataset_id, request.base_model_version_id)
+
+    sweep = FineTuningSweep(
+        id=str(uuid.uuid4()),
+        **request.dict(exclude={"base_hyperparameters", "priority", "seed"})
+    )
+    await create_sweep(db, sweep, request.base_hyperparameters, request.priority, request.seed)
+    await notify_jobs_changed(db)
+    await db.commit()
+    await db.refresh(sweep)
+    return sweep
+
+@router.get("/sweeps/{sweep_id}", response_model=FineTuningSweepDetailResponse)
+async def get_fine_tuning_sweep(
+    sweep_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """A sweep with its trials and the training steps early stopping saved"""
+    sweep = await _get_sweep(db, sweep_id)
+    trials = (await db.execute(
+        select(FineTuningJob).where(FineTuningJob.sweep_id == sweep_id).order_by(FineTuningJob.created_at)
+    )).scalars().all()
+
+    by_status = {}
+    for trial in trials:
+        by_status[trial.status.value] = by_status.get(trial.status.value, 0) + 1
+    return {
+        **FineTuningSweepResponse.model_validate(sweep).dict(),
+        "trials_by_status": by_status,
+        "steps_used": sum(int((trial.metrics or {}).get("step") or 0) for trial in trials),
+        "steps_budget": sweep.num_trials * sweep.max_resource,
+        "trials": trials
+    }
+
+@router.post("/sweeps/{sweep_id}/cancel", response_model=FineTuningSweepResponse)
+async def cancel_fine_tuning_sweep(
+    sweep_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancel a sweep and all of its unfinished trials"""
+    sweep = await _get_sweep(db, sweep_id, for_update=True)
+    if sweep.status in FINISHED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot cancel a {sweep.status.value} sweep"
+        )
+    await cancel_sweep(db, sweep)
+    await notify_jobs_changed(db)
+    await db.commit()
+    await db.refresh(sweep)
+    return sweep
+
+@router.get("/{job_id}", response_model=FineTuningJobResponse)
+async def get_fine_tuning_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a fine-tuning job; running jobs show their latest heartbeat metrics"""
+    return await _get_job(db, job_id)
+
+@router.post("/{job_id}/cancel", response_model=FineTuningJobResponse)
+async def cancel_fine_tuning_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancel a job. A running trainer is told to stop on the scheduler's
+    next heartbeat and its slot goes to the next queued job."""
+    # Sweep before job, the order every sweep writer locks in
+    sweep_id = (await _get_job(db, job_id)).sweep_id
+    if sweep_id:
+        await lock_sweeps(db, [sweep_id])
+    job = await _get_job(db, job_id, for_update=True)
+    if job.status not in CANCELLABLE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot cancel a {job.status.value} job"
+        )
+
+    now = datetime.now(timezone.utc)
+    job.status = FineTuningStatus.CANCELLED
+    job.completed_at = now
+    job.updated_at = now
+    if job.sweep_id:
+        await db.flush()
+        await finish_sweep(db, job.sweep_id)
+    await notify_jobs_changed(db)
+    await db.commit()
+    await db.refresh(job)
+    return job
@@ -0,0 +1,183 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import uuid
+
+from config import settings
+from database import get_async_db
+from models import JobCheckpoint, SyntheticScenario
+from schemas import (
+    SyntheticScenarioCreate, SyntheticScenarioResponse, SyntheticGenerationCreate,
+    SyntheticGenerationRunResponse
+)
+from services.agent_cache import agent_cache
+from services.near_duplicates import SCENARIO, near_duplicates
+from services.scenario_generator import (
+    checkpoint_name, generate_for_agent, is_orphaned, mark_orphaned, new_run_state, run_slots
+)
+from utils.pagination import NEXT_CURSOR_HEADER, keyset_page, next_cursor
+
+router = APIRouter()
+
+async def _get_scenario(db: AsyncSession, scenario_id: str) -> SyntheticScenario:
+    scenario = await db.get(SyntheticScenario, scenario_id)
+    if not scenario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scenario not found"
+        )
+    return scenario
+
+@router.get("/", response_model=List[SyntheticScenarioResponse])
+async def list_scenarios(
+    response: Response,
+    agent_id: Optional[str] = None,
+    scenario_type: Optional[str] = None,
+    difficulty: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List scenarios, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page.
+    """
+    query = select(SyntheticScenario)
+    if agent_id:
+        query = query.where(SyntheticScenario.agent_id == agent_id)
+    if scenario_type:
+        query = query.where(SyntheticScenario.scenario_type == scenario_type)
+    if difficulty:
+        query = query.where(SyntheticScenario.difficulty == difficulty)
+
+    try:
+        query = keyset_page(query, SyntheticScenario.created_at, SyntheticScenario.id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    scenarios = (await db.execute(query.limit(limit))).scalars().all()
+    cursor = next_cursor(scenarios, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return scenarios
+
+@router.post("/", response_model=SyntheticScenarioResponse, status_code=status.HTTP_201_CREATED)
+async def create_scenario(
+    scenario: SyntheticScenarioCreate,
+    agent_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a hand-written scenario"""
+    if agent_id and not await agent_cache.get(db, agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    db_scenario = SyntheticScenario(id=str(uuid.uuid4()), agent_id=agent_id, **scenario.dict())
+    db.add(db_scenario)
+    await db.commit()
+    await db.refresh(db_scenario)
+    near_duplicates.record_scenarios([
+        {"id": db_scenario.id, "agent_id": agent_id, "input_data": db_scenario.input_data}
+    ])
+    return db_scenario
+
+async def _generate_in_slot(*args, **kwargs) -> None:
+    try:
+        await generate_for_agent(*args, **kwargs)
+    finally:
+        run_slots.release()
+
+@router.post("/generate", response_model=SyntheticGenerationRunResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_scenarios(
+    request: SyntheticGenerationCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Start a generation run in the background; poll ``/runs/{run_id}``
+    for progress and throughput. Answers 429 while this process already
+    runs SYNTHETIC_MAX_CONCURRENT_RUNS generations."""
+    if request.count > settings.SYNTHETIC_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SYNTHETIC_MAX_SCENARIOS} scenarios per run"
+        )
+    if not request.templates and not request.from_executions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give templates, seed from executions, or both"
+        )
+    if not await agent_cache.get(db, request.agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    if not run_slots.try_acquire():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{run_slots.limit} generation runs already in progress; retry later"
+        )
+    run_id = str(uuid.uuid4())
+    state = new_run_state(request.count)
+    try:
+        db.add(JobCheckpoint(name=checkpoint_name(run_id), state=state))
+        await db.commit()
+    except BaseException:
+        run_slots.release()
+        raise
+
+    background_tasks.add_task(
+        _generate_in_slot,
+        run_id,
+        request.agent_id,
+        request.count,
+        templates=[template.dict() for template in request.templates],
+        from_executions=request.from_executions,
+        execution_success=request.execution_success,
+        max_seeds=min(request.max_seeds or settings.SYNTHETIC_MAX_SEEDS, settings.SYNTHETIC_MAX_SEEDS),
+        seed=request.seed,
+        drop_near_duplicates=request.drop_near_duplicates
+    )
+    return {"run_id": run_id, **state}
+
+@router.get("/runs/{run_id}", response_model=SyntheticGenerationRunResponse)
+async def get_generation_run(
+    run_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Progress of a generation run"""
+    checkpoint = await db.get(JobCheckpoint, checkpoint_name(run_id))
+    if not checkpoint:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Generation run not found"
+        )
+    if is_orphaned(checkpoint):
+        mark_orphaned(checkpoint)
+        await db.commit()
+    return {"run_id": run_id, **checkpoint.state}
+
+@router.get("/{scenario_id}", response_model=SyntheticScenarioResponse)
+async def get_scenario(
+    scenario_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a scenario by ID"""
+    return await _get_scenario(db, scenario_id)
+
+@router.delete("/{scenario_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_scenario(
+    scenario_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a scenario"""
+    scenario = await _get_scenario(db, scenario_id)
+    await db.delete(scenario)
+    await db.commit()
+    near_duplicates.discard(scenario.agent_id, SCENARIO, scenario_id)
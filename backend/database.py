@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
@@ -23,6 +24,34 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+def _async_database_url(url: str) -> str:
+    """Map a sync driver URL onto its asyncio driver (psycopg2 -> asyncpg)"""
+    if url.startswith("postgresql+asyncpg://") or url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+# Create async engine used by the request handlers
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    echo=settings.DEBUG
+)
+
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 metadata = MetaData()
@@ -35,6 +64,15 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
 @contextmanager
 def get_db_context():
     """Context manager for database sessions"""
@@ -48,9 +86,18 @@ def get_db_context():
         db.close()
 
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables (tests and local scratch databases only;
+    deployed databases are migrated with `alembic upgrade head`)"""
     try:
         Base.metadata.create_all(bind=engine)
+        if engine.dialect.name == "postgresql":
+            from services.partition_service import (
+                PARTITIONED_TABLES, create_default_partition, ensure_partitions
+            )
+            with engine.begin() as conn:
+                for table in PARTITIONED_TABLES:
+                    create_default_partition(conn, table)
+                    ensure_partitions(conn, table)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Failed to create database tables: {e}")
@@ -69,6 +116,7 @@ def drop_db():
 from models import (
     Agent,
     AgentExecution,
+    ExecutionRollup,
     Feedback,
     ABTest,
     ABTestVariant,
@@ -76,7 +124,9 @@ from models import (
     FineTuningJob,
     SyntheticScenario,
     TrainingDataset,
+    DatasetExampleHash,
     ModelVersion,
+    JobCheckpoint,
     User,
     Organization
 )
\ No newline at end of file
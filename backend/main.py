@@ -5,10 +5,17 @@ from contextlib import asynccontextmanager
 import logging
 from typing import Optional
 
-from database import engine, Base
+from database import AsyncSessionLocal, async_engine, init_db
 from config import settings
 from middleware import LoggingMiddleware
-from api import agents, feedback, ab_testing, fine_tuning, synthetic_data
+from api import agents, feedback, datasets, ab_testing, fine_tuning, synthetic_data
+from services.ab_router import traffic_router
+from services.ab_stats import ab_stats
+from services.agent_cache import agent_cache
+from services.ingest_buffer import execution_buffer
+from services.metrics_service import sketch_buffer
+from services.scenario_generator import fail_orphaned_runs
+from utils.pagination import NEXT_CURSOR_HEADER
 
 # Configure logging
 logging.basicConfig(
@@ -24,17 +31,40 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Agent Gym API")
     
-    # Create database tables
+    # Schema is managed with `alembic upgrade head`; create_all is only a
+    # convenience for throwaway local databases
+    if settings.DB_AUTO_CREATE:
+        try:
+            init_db()
+        except Exception as e:
+            logger.error(f"Failed to create database tables: {e}")
+
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        async with AsyncSessionLocal() as db:
+            orphaned = await fail_orphaned_runs(db)
+            await db.commit()
+        if orphaned:
+            logger.warning(f"Marked {orphaned} interrupted synthetic generation runs as failed")
     except Exception as e:
-        logger.error(f"Failed to create database tables: {e}")
+        logger.error(f"Failed to check for interrupted generation runs: {e}")
+
+    if settings.EXECUTION_WRITE_BEHIND:
+        execution_buffer.start()
+    await agent_cache.start()
+    await traffic_router.start()
+    ab_stats.start()
+    sketch_buffer.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Agent Gym API")
+    await execution_buffer.stop()
+    await agent_cache.stop()
+    await traffic_router.stop()
+    await ab_stats.stop()
+    await sketch_buffer.stop()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Agent Gym API",
@@ -50,6 +80,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide response headers from scripts unless listed here
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Custom middleware
@@ -58,6 +90,7 @@ app.add_middleware(LoggingMiddleware)
 # Include routers
 app.include_router(agents.router, prefix="/api/v1/agents", tags=["agents"])
 app.include_router(feedback.router, prefix="/api/v1/feedback", tags=["feedback"])
+app.include_router(datasets.router, prefix="/api/v1/datasets", tags=["datasets"])
 app.include_router(ab_testing.router, prefix="/api/v1/ab-testing", tags=["ab-testing"])
 app.include_router(fine_tuning.router, prefix="/api/v1/fine-tuning", tags=["fine-tuning"])
 app.include_router(synthetic_data.router, prefix="/api/v1/synthetic-data", tags=["synthetic-data"])
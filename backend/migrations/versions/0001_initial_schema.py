@@ -0,0 +1,236 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+agent_status = sa.Enum("ACTIVE", "INACTIVE", "TRAINING", "ERROR", name="agentstatus")
+feedback_type = sa.Enum("RATING", "CORRECTION", "COMMENT", "BINARY", name="feedbacktype")
+ab_test_status = sa.Enum("DRAFT", "RUNNING", "PAUSED", "COMPLETED", "ARCHIVED", name="abteststatus")
+fine_tuning_status = sa.Enum("PENDING", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", name="finetuningstatus")
+rollup_granularity = sa.Enum("MINUTE", "HOUR", "DAY", name="rollupgranularity")
+
+
+def _timestamps(updated: bool = True):
+    columns = [sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())]
+    if updated:
+        columns.append(sa.Column("updated_at", sa.DateTime(timezone=True)))
+    return columns
+
+
+def upgrade() -> None:
+    op.create_table(
+        "organizations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("plan", sa.String()),
+        sa.Column("settings", sa.JSON()),
+        *_timestamps(),
+    )
+    op.create_index("ix_organizations_id", "organizations", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("name", sa.String()),
+        sa.Column("role", sa.String()),
+        sa.Column("organization_id", sa.String(), sa.ForeignKey("organizations.id")),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "agents",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id")),
+        sa.Column("organization_id", sa.String(), sa.ForeignKey("organizations.id")),
+        sa.Column("model_type", sa.String()),
+        sa.Column("model_config", sa.JSON()),
+        sa.Column("status", agent_status),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(),
+    )
+    op.create_index("ix_agents_id", "agents", ["id"])
+
+    op.create_table(
+        "training_datasets",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("source_type", sa.String()),
+        sa.Column("data", sa.JSON()),
+        sa.Column("statistics", sa.JSON()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_training_datasets_id", "training_datasets", ["id"])
+
+    op.create_table(
+        "model_versions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("model_path", sa.String()),
+        sa.Column("performance_metrics", sa.JSON()),
+        sa.Column("training_data_hash", sa.String()),
+        sa.Column("is_production", sa.Boolean()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_model_versions_id", "model_versions", ["id"])
+
+    op.create_table(
+        "fine_tuning_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("status", fine_tuning_status),
+        sa.Column("training_dataset_id", sa.String(), sa.ForeignKey("training_datasets.id")),
+        sa.Column("base_model_version_id", sa.String(), sa.ForeignKey("model_versions.id")),
+        sa.Column("new_model_version_id", sa.String(), sa.ForeignKey("model_versions.id")),
+        sa.Column("hyperparameters", sa.JSON()),
+        sa.Column("metrics", sa.JSON()),
+        sa.Column("error_message", sa.Text()),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(),
+    )
+    op.create_index("ix_fine_tuning_jobs_id", "fine_tuning_jobs", ["id"])
+
+    op.create_table(
+        "agent_executions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("input_data", sa.JSON()),
+        sa.Column("output_data", sa.JSON()),
+        sa.Column("context", sa.JSON()),
+        sa.Column("success", sa.Boolean()),
+        sa.Column("execution_time_ms", sa.Integer()),
+        sa.Column("cost", sa.Float()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_agent_executions_id", "agent_executions", ["id"])
+
+    op.create_table(
+        "execution_rollups",
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id"), primary_key=True),
+        sa.Column("granularity", rollup_granularity, primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("executions_count", sa.BigInteger(), nullable=False),
+        sa.Column("success_count", sa.BigInteger(), nullable=False),
+        sa.Column("total_execution_time_ms", sa.BigInteger(), nullable=False),
+        sa.Column("total_cost", sa.Float(), nullable=False),
+        sa.Column("last_execution_at", sa.DateTime(timezone=True)),
+        sa.Column("execution_time_sketch", sa.JSON()),
+        sa.Column("cost_sketch", sa.JSON()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "feedback",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("execution_id", sa.String(), sa.ForeignKey("agent_executions.id"), unique=True),
+        sa.Column("type", feedback_type),
+        sa.Column("rating", sa.Integer()),
+        sa.Column("correction", sa.Text()),
+        sa.Column("comment", sa.Text()),
+        sa.Column("binary_feedback", sa.Boolean()),
+        sa.Column("reviewer_id", sa.String()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_feedback_id", "feedback", ["id"])
+
+    op.create_table(
+        "ab_tests",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("status", ab_test_status),
+        sa.Column("traffic_split", sa.JSON()),
+        sa.Column("metrics", sa.JSON()),
+        sa.Column("start_date", sa.DateTime(timezone=True)),
+        sa.Column("end_date", sa.DateTime(timezone=True)),
+        sa.Column("winner_variant_id", sa.String()),
+        sa.Column("confidence_level", sa.Float()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(),
+    )
+    op.create_index("ix_ab_tests_id", "ab_tests", ["id"])
+
+    op.create_table(
+        "ab_test_variants",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("ab_test_id", sa.String(), sa.ForeignKey("ab_tests.id")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("model_version_id", sa.String(), sa.ForeignKey("model_versions.id")),
+        sa.Column("traffic_percentage", sa.Float()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_ab_test_variants_id", "ab_test_variants", ["id"])
+
+    op.create_table(
+        "ab_test_results",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("ab_test_id", sa.String(), sa.ForeignKey("ab_tests.id")),
+        sa.Column("variant_id", sa.String(), sa.ForeignKey("ab_test_variants.id")),
+        sa.Column("executions_count", sa.Integer()),
+        sa.Column("success_count", sa.Integer()),
+        sa.Column("avg_execution_time", sa.Float()),
+        sa.Column("avg_cost", sa.Float()),
+        sa.Column("avg_rating", sa.Float()),
+        sa.Column("metrics", sa.JSON()),
+        sa.Column("period_start", sa.DateTime(timezone=True)),
+        sa.Column("period_end", sa.DateTime(timezone=True)),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_ab_test_results_id", "ab_test_results", ["id"])
+
+    op.create_table(
+        "synthetic_scenarios",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("scenario_type", sa.String()),
+        sa.Column("input_data", sa.JSON()),
+        sa.Column("expected_output", sa.JSON()),
+        sa.Column("difficulty", sa.Integer()),
+        sa.Column("tags", sa.JSON()),
+        sa.Column("metadata", sa.JSON()),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_synthetic_scenarios_id", "synthetic_scenarios", ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "synthetic_scenarios", "ab_test_results", "ab_test_variants", "ab_tests",
+        "feedback", "execution_rollups", "agent_executions", "fine_tuning_jobs",
+        "model_versions", "training_datasets", "agents", "users", "organizations",
+    ):
+        op.drop_table(table)
+
+    bind = op.get_bind()
+    for enum in (rollup_granularity, fine_tuning_status, ab_test_status, feedback_type, agent_status):
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,49 @@
+"""hot path composite indexes
+
+Supports the newest-first keyset pagination on agents, executions and
+feedback. Built CONCURRENTLY so the migration does not block writes on
+large tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_agents_created_at_id", "agents", ["created_at", "id"]),
+    ("ix_agent_executions_agent_id_created_at", "agent_executions", ["agent_id", "created_at", "id"]),
+    ("ix_feedback_agent_id_created_at", "feedback", ["agent_id", "created_at", "id"]),
+    ("ix_feedback_created_at_id", "feedback", ["created_at", "id"]),
+]
+
+
+def _columns(names):
+    # Newest-first ordering: key columns after agent_id are descending
+    return [sa.text(name) if name == "agent_id" else sa.text(f"{name} DESC") for name in names]
+
+
+def upgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, _columns(columns),
+                postgresql_concurrently=concurrently,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=concurrently, if_exists=True)
@@ -0,0 +1,120 @@
+"""partition agent_executions by created_at month
+
+Rebuilds agent_executions as a RANGE-partitioned table with one partition
+per month plus a DEFAULT catch-all, and copies existing rows across. The
+primary key becomes (id, created_at) because Postgres requires the
+partition key in every unique constraint, which also means
+feedback.execution_id can no longer carry a foreign key.
+
+For very large existing tables, prefer attaching the legacy table as a
+partition after adding a matching CHECK constraint instead of copying.
+Future partitions are created by services/partition_service.py.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.partition_service import (
+    add_months, create_default_partition, create_partition, ensure_partitions, month_start
+)
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.drop_constraint("feedback_execution_id_fkey", "feedback", type_="foreignkey")
+    op.rename_table("agent_executions", "agent_executions_legacy")
+    op.execute("ALTER INDEX ix_agent_executions_id RENAME TO ix_agent_executions_legacy_id")
+    op.execute(
+        "ALTER INDEX ix_agent_executions_agent_id_created_at "
+        "RENAME TO ix_agent_executions_legacy_agent_id_created_at"
+    )
+
+    op.create_table(
+        "agent_executions",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("input_data", sa.JSON()),
+        sa.Column("output_data", sa.JSON()),
+        sa.Column("context", sa.JSON()),
+        sa.Column("success", sa.Boolean()),
+        sa.Column("execution_time_ms", sa.Integer()),
+        sa.Column("cost", sa.Float()),
+        sa.Column("metadata", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_agent_executions_id", "agent_executions", ["id"])
+    op.create_index(
+        "ix_agent_executions_agent_id_created_at", "agent_executions",
+        [sa.text("agent_id"), sa.text("created_at DESC"), sa.text("id DESC")]
+    )
+
+    create_default_partition(bind, "agent_executions")
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM agent_executions_legacy")).scalar()
+    if oldest is not None:
+        month = month_start(oldest)
+        current = month_start(datetime.now(timezone.utc))
+        while month < current:
+            create_partition(bind, "agent_executions", month)
+            month = add_months(month, 1)
+    ensure_partitions(bind, "agent_executions")
+
+    op.execute(
+        "INSERT INTO agent_executions "
+        "(id, agent_id, input_data, output_data, context, success, execution_time_ms, cost, metadata, created_at) "
+        "SELECT id, agent_id, input_data, output_data, context, success, execution_time_ms, cost, metadata, "
+        "COALESCE(created_at, now()) FROM agent_executions_legacy"
+    )
+    op.drop_table("agent_executions_legacy")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.rename_table("agent_executions", "agent_executions_partitioned")
+    op.execute("ALTER INDEX ix_agent_executions_id RENAME TO ix_agent_executions_partitioned_id")
+    op.execute(
+        "ALTER INDEX ix_agent_executions_agent_id_created_at "
+        "RENAME TO ix_agent_executions_partitioned_agent_id_created_at"
+    )
+    op.create_table(
+        "agent_executions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("input_data", sa.JSON()),
+        sa.Column("output_data", sa.JSON()),
+        sa.Column("context", sa.JSON()),
+        sa.Column("success", sa.Boolean()),
+        sa.Column("execution_time_ms", sa.Integer()),
+        sa.Column("cost", sa.Float()),
+        sa.Column("metadata", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_agent_executions_id", "agent_executions", ["id"])
+    op.create_index(
+        "ix_agent_executions_agent_id_created_at", "agent_executions",
+        [sa.text("agent_id"), sa.text("created_at DESC"), sa.text("id DESC")]
+    )
+    op.execute("INSERT INTO agent_executions SELECT * FROM agent_executions_partitioned")
+    op.drop_table("agent_executions_partitioned")
+    op.create_foreign_key(
+        "feedback_execution_id_fkey", "feedback", "agent_executions", ["execution_id"], ["id"]
+    )
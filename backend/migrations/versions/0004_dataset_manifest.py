@@ -0,0 +1,25 @@
+"""out-of-row training dataset storage
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("training_datasets", sa.Column("manifest", sa.JSON()))
+    op.add_column("training_datasets", sa.Column("example_count", sa.Integer(), server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("training_datasets", "example_count")
+    op.drop_column("training_datasets", "manifest")
@@ -0,0 +1,33 @@
+"""incremental dataset builder state
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("training_datasets", sa.Column("build_state", sa.JSON()))
+    op.create_table(
+        "dataset_example_hashes",
+        sa.Column(
+            "dataset_id", sa.String(),
+            sa.ForeignKey("training_datasets.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dataset_example_hashes")
+    op.drop_column("training_datasets", "build_state")
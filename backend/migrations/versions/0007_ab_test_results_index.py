@@ -0,0 +1,36 @@
+"""ab_test_results lookup index
+
+The streaming A/B stats engine reads every period row of a test on each
+flush. Built CONCURRENTLY so the migration does not block writes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_ab_test_results_test_period", "ab_test_results", ["ab_test_id", "period_start"],
+            postgresql_concurrently=concurrently,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_ab_test_results_test_period", table_name="ab_test_results",
+            postgresql_concurrently=concurrently, if_exists=True,
+        )
@@ -0,0 +1,54 @@
+"""fine-tuning scheduler columns
+
+Queue priority plus the worker, heartbeat and attempt bookkeeping the
+fine-tuning scheduler claims and reaps jobs with. The queue index is
+partial over pending jobs so it stays small however many jobs finish.
+Indexes are built CONCURRENTLY so the migration does not block writes.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("fine_tuning_jobs", sa.Column("priority", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("fine_tuning_jobs", sa.Column("worker_id", sa.String()))
+    op.add_column("fine_tuning_jobs", sa.Column("heartbeat_at", sa.DateTime(timezone=True)))
+    op.add_column("fine_tuning_jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fine_tuning_jobs_queue", "fine_tuning_jobs",
+            [sa.text("priority DESC"), "created_at", "id"],
+            postgresql_where=sa.text("status = 'PENDING'"),
+            postgresql_concurrently=concurrently,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_fine_tuning_jobs_status_heartbeat", "fine_tuning_jobs", ["status", "heartbeat_at"],
+            postgresql_concurrently=concurrently,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name in ("ix_fine_tuning_jobs_status_heartbeat", "ix_fine_tuning_jobs_queue"):
+            op.drop_index(
+                name, table_name="fine_tuning_jobs",
+                postgresql_concurrently=concurrently, if_exists=True,
+            )
+    for column in ("attempts", "heartbeat_at", "worker_id", "priority"):
+        op.drop_column("fine_tuning_jobs", column)
@@ -0,0 +1,66 @@
+"""fine-tuning sweeps
+
+Parent rows for hyperparameter sweeps; each trial is a fine_tuning_jobs
+row pointing back at its sweep.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Created by 0001
+fine_tuning_status = postgresql.ENUM(
+    "PENDING", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", name="finetuningstatus", create_type=False
+)
+
+
+def upgrade() -> None:
+    status_type = fine_tuning_status if op.get_bind().dialect.name == "postgresql" else sa.String()
+    op.create_table(
+        "fine_tuning_sweeps",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("agent_id", sa.String(), sa.ForeignKey("agents.id")),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("status", status_type),
+        sa.Column("training_dataset_id", sa.String(), sa.ForeignKey("training_datasets.id")),
+        sa.Column("base_model_version_id", sa.String(), sa.ForeignKey("model_versions.id")),
+        sa.Column("search_space", sa.JSON()),
+        sa.Column("objective", sa.String(), nullable=False),
+        sa.Column("mode", sa.String(), nullable=False),
+        sa.Column("num_trials", sa.Integer(), nullable=False),
+        sa.Column("min_resource", sa.Integer(), nullable=False),
+        sa.Column("max_resource", sa.Integer(), nullable=False),
+        sa.Column("reduction_factor", sa.Integer(), nullable=False),
+        sa.Column("promote", sa.Boolean()),
+        sa.Column("rungs", sa.JSON()),
+        sa.Column("best_job_id", sa.String()),
+        sa.Column("best_model_version_id", sa.String(), sa.ForeignKey("model_versions.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_fine_tuning_sweeps_id", "fine_tuning_sweeps", ["id"])
+
+    op.add_column(
+        "fine_tuning_jobs",
+        sa.Column("sweep_id", sa.String(), sa.ForeignKey("fine_tuning_sweeps.id")),
+    )
+    op.create_index("ix_fine_tuning_jobs_sweep_id", "fine_tuning_jobs", ["sweep_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fine_tuning_jobs_sweep_id", table_name="fine_tuning_jobs")
+    op.drop_column("fine_tuning_jobs", "sweep_id")
+    op.drop_index("ix_fine_tuning_sweeps_id", table_name="fine_tuning_sweeps")
+    op.drop_table("fine_tuning_sweeps")
@@ -0,0 +1,45 @@
+"""synthetic scenario listing indexes
+
+Generation runs insert scenarios by the million; these support the
+newest-first keyset pagination of the synthetic data API. Built
+CONCURRENTLY so the migration does not block writes.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_synthetic_scenarios_agent_id_created_at", [sa.text("agent_id"), sa.text("created_at DESC"), sa.text("id DESC")]),
+    ("ix_synthetic_scenarios_created_at_id", [sa.text("created_at DESC"), sa.text("id DESC")]),
+]
+
+
+def upgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name, "synthetic_scenarios", columns,
+                postgresql_concurrently=concurrently,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(
+                name, table_name="synthetic_scenarios",
+                postgresql_concurrently=concurrently, if_exists=True,
+            )
@@ -0,0 +1,31 @@
+"""agent_executions (created_at, id) index
+
+Supports the auto feedback job's oldest-first keyset scan across all
+agents. agent_executions is partitioned on Postgres, where indexes cannot
+be built CONCURRENTLY on the parent, so this takes a plain CREATE INDEX.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_agent_executions_created_at_id", "agent_executions",
+        [sa.text("created_at"), sa.text("id")],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_agent_executions_created_at_id", table_name="agent_executions", if_exists=True)
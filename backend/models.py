@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, 
-    Float, ForeignKey, JSON, Enum, BigInteger
+    Float, ForeignKey, JSON, Enum, BigInteger, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,6 +28,11 @@ class ABTestStatus(str, enum.Enum):
     COMPLETED = "completed"
     ARCHIVED = "archived"
 
+class RollupGranularity(str, enum.Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
 class FineTuningStatus(str, enum.Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -85,6 +90,10 @@ class Agent(Base):
     fine_tuning_jobs = relationship("FineTuningJob", back_populates="agent")
     model_versions = relationship("ModelVersion", back_populates="agent")
 
+    __table_args__ = (
+        Index("ix_agents_created_at_id", created_at.desc(), id.desc()),
+    )
+
 class AgentExecution(Base):
     __tablename__ = "agent_executions"
     
@@ -97,17 +106,46 @@ class AgentExecution(Base):
     execution_time_ms = Column(Integer)
     cost = Column(Float)
     metadata = Column(JSON, default={})
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the primary key because the table is range-partitioned by month
+    # on created_at (see services/partition_service.py)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     agent = relationship("Agent", back_populates="executions")
-    feedback = relationship("Feedback", back_populates="execution", uselist=False)
+    feedback = relationship(
+        "Feedback",
+        primaryjoin="AgentExecution.id == foreign(Feedback.execution_id)",
+        back_populates="execution",
+        uselist=False
+    )
+
+    __table_args__ = (
+        Index("ix_agent_executions_agent_id_created_at", agent_id, created_at.desc(), id.desc()),
+        Index("ix_agent_executions_created_at_id", created_at, id),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+class ExecutionRollup(Base):
+    __tablename__ = "execution_rollups"
+    
+    agent_id = Column(String, ForeignKey("agents.id"), primary_key=True)
+    granularity = Column(Enum(RollupGranularity), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    executions_count = Column(BigInteger, nullable=False, default=0)
+    success_count = Column(BigInteger, nullable=False, default=0)
+    total_execution_time_ms = Column(BigInteger, nullable=False, default=0)
+    total_cost = Column(Float, nullable=False, default=0.0)
+    last_execution_at = Column(DateTime(timezone=True))
+    execution_time_sketch = Column(JSON)  # QuantileSketch.to_dict(), hour/day buckets only
+    cost_sketch = Column(JSON)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Feedback(Base):
     __tablename__ = "feedback"
     
     id = Column(String, primary_key=True, index=True)
     agent_id = Column(String, ForeignKey("agents.id"))
-    execution_id = Column(String, ForeignKey("agent_executions.id"), unique=True)
+    # No FK: a partitioned agent_executions cannot have a unique key on id alone
+    execution_id = Column(String, unique=True)
     type = Column(Enum(FeedbackType))
     rating = Column(Integer)  # 1-5 scale
     correction = Column(Text)  # Correct answer if wrong
@@ -118,7 +156,16 @@ class Feedback(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     agent = relationship("Agent", back_populates="feedback")
-    execution = relationship("AgentExecution", back_populates="feedback")
+    execution = relationship(
+        "AgentExecution",
+        primaryjoin="foreign(Feedback.execution_id) == AgentExecution.id",
+        back_populates="feedback"
+    )
+
+    __table_args__ = (
+        Index("ix_feedback_agent_id_created_at", agent_id, created_at.desc(), id.desc()),
+        Index("ix_feedback_created_at_id", created_at.desc(), id.desc()),
+    )
 
 class ABTest(Base):
     __tablename__ = "ab_tests"
@@ -176,6 +223,10 @@ class ABTestResult(Base):
     ab_test = relationship("ABTest", back_populates="results")
     variant = relationship("ABTestVariant", back_populates="results")
 
+    __table_args__ = (
+        Index("ix_ab_test_results_test_period", ab_test_id, period_start),
+    )
+
 class FineTuningJob(Base):
     __tablename__ = "fine_tuning_jobs"
     
@@ -184,6 +235,8 @@ class FineTuningJob(Base):
     name = Column(String, nullable=False)
     description = Column(Text)
     status = Column(Enum(FineTuningStatus), default=FineTuningStatus.PENDING)
+    priority = Column(Integer, nullable=False, default=0, server_default="0")  # Higher runs first
+    sweep_id = Column(String, ForeignKey("fine_tuning_sweeps.id"), index=True)  # Set on sweep trials
     training_dataset_id = Column(String, ForeignKey("training_datasets.id"))
     base_model_version_id = Column(String, ForeignKey("model_versions.id"))
     new_model_version_id = Column(String, ForeignKey("model_versions.id"))
@@ -192,6 +245,10 @@ class FineTuningJob(Base):
     error_message = Column(Text)
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
+    # Scheduler bookkeeping (services/fine_tuning_scheduler.py)
+    worker_id = Column(String)
+    heartbeat_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
     metadata = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -200,6 +257,45 @@ class FineTuningJob(Base):
     training_dataset = relationship("TrainingDataset")
     base_model_version = relationship("ModelVersion", foreign_keys=[base_model_version_id])
     new_model_version = relationship("ModelVersion", foreign_keys=[new_model_version_id])
+    sweep = relationship("FineTuningSweep", back_populates="trials")
+
+    __table_args__ = (
+        # Claim order of the scheduler's queue, pending jobs only
+        Index(
+            "ix_fine_tuning_jobs_queue", priority.desc(), created_at, id,
+            postgresql_where=status == FineTuningStatus.PENDING
+        ),
+        Index("ix_fine_tuning_jobs_status_heartbeat", status, heartbeat_at),
+    )
+
+class FineTuningSweep(Base):
+    """Hyperparameter sweep: one FineTuningJob per trial, pruned with ASHA"""
+    __tablename__ = "fine_tuning_sweeps"
+    
+    id = Column(String, primary_key=True, index=True)
+    agent_id = Column(String, ForeignKey("agents.id"))
+    name = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(Enum(FineTuningStatus), default=FineTuningStatus.PENDING)
+    training_dataset_id = Column(String, ForeignKey("training_datasets.id"))
+    base_model_version_id = Column(String, ForeignKey("model_versions.id"))
+    search_space = Column(JSON)  # See utils/sweeps.py
+    objective = Column(String, nullable=False, default="loss")  # Metric the trainer reports
+    mode = Column(String, nullable=False, default="min")  # "min" or "max"
+    num_trials = Column(Integer, nullable=False)
+    min_resource = Column(Integer, nullable=False, default=1)  # Steps before the first rung
+    max_resource = Column(Integer, nullable=False)  # Steps of a full trial
+    reduction_factor = Column(Integer, nullable=False, default=3)
+    promote = Column(Boolean, default=True)  # Make the best model version the production one
+    rungs = Column(JSON, default={})  # {step: {job_id: objective}} recorded so far
+    best_job_id = Column(String)
+    best_model_version_id = Column(String, ForeignKey("model_versions.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True))
+    
+    agent = relationship("Agent")
+    trials = relationship("FineTuningJob", back_populates="sweep")
 
 class TrainingDataset(Base):
     __tablename__ = "training_datasets"
@@ -208,13 +304,24 @@ class TrainingDataset(Base):
     name = Column(String, nullable=False)
     description = Column(Text)
     source_type = Column(String)  # "feedback", "synthetic", "manual", "import"
-    data = Column(JSON)  # Training examples
+    data = Column(JSON)  # Legacy inline examples; new datasets store chunks out of row
+    manifest = Column(JSON)  # Chunk files under UPLOAD_DIR (services/dataset_store.py)
+    example_count = Column(Integer, default=0)
     statistics = Column(JSON)  # Dataset statistics
+    build_state = Column(JSON)  # Incremental builder config, watermark and set hash
     metadata = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     fine_tuning_jobs = relationship("FineTuningJob", back_populates="training_dataset")
 
+class DatasetExampleHash(Base):
+    """Content hashes already in a dataset, used to dedupe incremental builds"""
+    __tablename__ = "dataset_example_hashes"
+    
+    dataset_id = Column(String, ForeignKey("training_datasets.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class ModelVersion(Base):
     __tablename__ = "model_versions"
     
@@ -233,6 +340,14 @@ class ModelVersion(Base):
     fine_tuning_jobs_as_base = relationship("FineTuningJob", foreign_keys=[FineTuningJob.base_model_version_id], back_populates="base_model_version")
     fine_tuning_jobs_as_new = relationship("FineTuningJob", foreign_keys=[FineTuningJob.new_model_version_id], back_populates="new_model_version")
 
+class JobCheckpoint(Base):
+    """Resumable progress for background jobs, keyed by job name"""
+    __tablename__ = "job_checkpoints"
+    
+    name = Column(String, primary_key=True)
+    state = Column(JSON, default={})
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class SyntheticScenario(Base):
     __tablename__ = "synthetic_scenarios"
     
@@ -248,4 +363,9 @@ class SyntheticScenario(Base):
     metadata = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    agent = relationship("Agent")
\ No newline at end of file
+    agent = relationship("Agent")
+
+    __table_args__ = (
+        Index("ix_synthetic_scenarios_agent_id_created_at", agent_id, created_at.desc(), id.desc()),
+        Index("ix_synthetic_scenarios_created_at_id", created_at.desc(), id.desc()),
+    )
\ No newline at end of file
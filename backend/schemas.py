@@ -3,7 +3,7 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
-from models import AgentStatus, FeedbackType, ABTestStatus, FineTuningStatus
+from models import AgentStatus, FeedbackType, ABTestStatus, FineTuningStatus, RollupGranularity
 
 # Base schemas
 class BaseSchema(BaseModel):
@@ -72,7 +72,8 @@ class AgentExecutionBase(BaseSchema):
     metadata: Optional[Dict[str, Any]] = {}
 
 class AgentExecutionCreate(AgentExecutionBase):
-    pass
+    # Stable id (user, session, ...) that A/B tests bucket on
+    subject_key: Optional[str] = None
 
 class AgentExecutionResponse(AgentExecutionBase):
     id: str
@@ -83,6 +84,32 @@ class AgentExecutionResponse(AgentExecutionBase):
     cost: Optional[float] = None
     created_at: datetime
 
+class AgentExecutionRecord(AgentExecutionBase):
+    """An execution reported by the client, used by batch ingestion"""
+    agent_id: str
+    id: Optional[str] = None
+    subject_key: Optional[str] = None
+    output_data: Optional[Dict[str, Any]] = None
+    success: Optional[bool] = None
+    execution_time_ms: Optional[int] = Field(None, ge=0)
+    cost: Optional[float] = Field(None, ge=0)
+    created_at: Optional[datetime] = None
+
+class AgentExecutionBatchResponse(BaseSchema):
+    inserted: int  # new rows; re-sent executions are acknowledged but not counted
+    execution_ids: List[str]
+
+class SimilarInputQuery(BaseSchema):
+    """Find an agent's execution and scenario inputs similar to ``input_data``"""
+    input_data: Dict[str, Any]
+    threshold: Optional[float] = Field(None, gt=0, le=1)  # defaults to NEAR_DUP_THRESHOLD
+    limit: int = Field(10, ge=1, le=1000)
+
+class SimilarInputResponse(BaseSchema):
+    source: str  # "execution" or "scenario"
+    id: str
+    similarity: float  # estimated Jaccard similarity of the inputs' shingles
+
 # Feedback schemas
 class FeedbackBase(BaseSchema):
     type: FeedbackType
@@ -102,6 +129,18 @@ class FeedbackResponse(FeedbackBase):
     execution_id: str
     created_at: datetime
 
+class FeedbackBatchItemResult(BaseSchema):
+    index: int
+    execution_id: str
+    status: str  # "created", "updated", "already_exists", "execution_not_found", "duplicate_in_batch"
+    feedback_id: Optional[str] = None
+
+class FeedbackBatchResponse(BaseSchema):
+    created: int
+    updated: int
+    skipped: int
+    results: List[FeedbackBatchItemResult]
+
 # A/B Testing schemas
 class ABTestBase(BaseSchema):
     name: str
@@ -112,9 +151,6 @@ class ABTestBase(BaseSchema):
     end_date: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = {}
 
-class ABTestCreate(ABTestBase):
-    pass
-
 class ABTestResponse(ABTestBase):
     id: str
     agent_id: str
@@ -126,18 +162,29 @@ class ABTestResponse(ABTestBase):
 
 class ABTestVariantBase(BaseSchema):
     name: str
-    model_version_id: str
+    model_version_id: Optional[str] = None
     traffic_percentage: float
     metadata: Optional[Dict[str, Any]] = {}
 
 class ABTestVariantCreate(ABTestVariantBase):
     pass
 
+class ABTestCreate(ABTestBase):
+    agent_id: str
+    # Defaults to one variant per traffic_split entry
+    variants: Optional[List[ABTestVariantCreate]] = None
+
 class ABTestVariantResponse(ABTestVariantBase):
     id: str
     ab_test_id: str
     created_at: datetime
 
+class ABTestAssignmentResponse(BaseSchema):
+    ab_test_id: str
+    variant_id: str
+    variant_name: str
+    model_version_id: Optional[str] = None
+
 class ABTestResultBase(BaseSchema):
     executions_count: int = 0
     success_count: int = 0
@@ -154,6 +201,52 @@ class ABTestResultResponse(ABTestResultBase):
     variant_id: str
     created_at: datetime
 
+class ABTestVariantStatsResponse(BaseSchema):
+    variant_id: str
+    variant_name: str
+    is_baseline: bool
+    executions_count: int
+    success_rate: Optional[float] = None
+    avg_execution_time: Optional[float] = None
+    avg_cost: Optional[float] = None
+    avg_rating: Optional[float] = None
+    lift: Optional[float] = None
+    p_value: Optional[float] = None
+    sequential_p_value: Optional[float] = None
+
+class ABTestVariantAnalysis(BaseSchema):
+    variant_id: str
+    variant_name: str
+    executions_count: int
+    success_rate: Optional[float] = None
+    lift: Optional[float] = None
+    lift_low: Optional[float] = None
+    lift_high: Optional[float] = None
+    difference_low: Optional[float] = None
+    difference_high: Optional[float] = None
+    p_value: Optional[float] = None
+    sequential_p_value: Optional[float] = None
+
+class ABTestAnalysisRequest(BaseSchema):
+    """Re-analyze and write back winners and confidence levels"""
+    test_ids: Optional[List[str]] = None  # default: every running test
+    resamples: Optional[int] = Field(None, ge=0, le=10000)  # defaults to AB_ANALYSIS_BOOTSTRAP_RESAMPLES
+
+class ABTestAnalysisResponse(BaseSchema):
+    ab_test_id: str
+    baseline_variant_id: Optional[str] = None
+    winner_variant_id: Optional[str] = None
+    confidence_level: Optional[float] = None
+    # Challengers only; each is compared with the baseline
+    variants: List[ABTestVariantAnalysis]
+
+class ABTestStatsResponse(BaseSchema):
+    ab_test_id: str
+    baseline_variant_id: Optional[str] = None
+    winner_variant_id: Optional[str] = None
+    confidence_level: Optional[float] = None
+    variants: List[ABTestVariantStatsResponse]
+
 # Fine-tuning schemas
 class FineTuningJobBase(BaseSchema):
     name: str
@@ -161,10 +254,11 @@ class FineTuningJobBase(BaseSchema):
     training_dataset_id: str
     base_model_version_id: str
     hyperparameters: Optional[Dict[str, Any]] = {}
+    priority: int = 0  # Higher runs first
     metadata: Optional[Dict[str, Any]] = {}
 
 class FineTuningJobCreate(FineTuningJobBase):
-    pass
+    agent_id: str
 
 class FineTuningJobResponse(FineTuningJobBase):
     id: str
@@ -173,27 +267,90 @@ class FineTuningJobResponse(FineTuningJobBase):
     new_model_version_id: Optional[str] = None
     metrics: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
+    attempts: int = 0
+    heartbeat_at: Optional[datetime] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+class FineTuningSweepBase(BaseSchema):
+    name: str
+    description: Optional[str] = None
+    training_dataset_id: str
+    base_model_version_id: str
+    search_space: Dict[str, Any]
+    objective: str = "loss"
+    mode: str = Field("min", pattern="^(min|max)$")
+    num_trials: int = Field(..., ge=1, le=1000)
+    min_resource: int = Field(1, ge=1)
+    max_resource: int = Field(..., ge=1)
+    reduction_factor: int = Field(3, ge=2)
+    promote: bool = True
+
+class FineTuningSweepCreate(FineTuningSweepBase):
+    """Sweep of ``num_trials`` sampled configurations; trial hyperparameters
+    are ``base_hyperparameters`` overlaid with the sample and ``epochs`` set
+    to ``max_resource``"""
+    agent_id: str
+    base_hyperparameters: Dict[str, Any] = {}
+    priority: int = 0
+    seed: Optional[int] = None
+
+class FineTuningSweepResponse(FineTuningSweepBase):
+    id: str
+    agent_id: str
+    status: FineTuningStatus
+    rungs: Optional[Dict[str, Any]] = None
+    best_job_id: Optional[str] = None
+    best_model_version_id: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class FineTuningSweepDetailResponse(FineTuningSweepResponse):
+    trials_by_status: Dict[str, int]
+    steps_used: int  # Training steps spent across all trials
+    steps_budget: int  # num_trials * max_resource, without early stopping
+    trials: List[FineTuningJobResponse]
+
 # Training Dataset schemas
 class TrainingDatasetBase(BaseSchema):
     name: str
     description: Optional[str] = None
     source_type: str = "feedback"
-    data: List[Dict[str, Any]]
     statistics: Optional[Dict[str, Any]] = {}
     metadata: Optional[Dict[str, Any]] = {}
 
 class TrainingDatasetCreate(TrainingDatasetBase):
-    pass
+    data: List[Dict[str, Any]]
 
 class TrainingDatasetResponse(TrainingDatasetBase):
+    """Dataset manifest; examples are fetched page by page"""
     id: str
+    example_count: int = 0
+    manifest: Optional[Dict[str, Any]] = None
+    build_state: Optional[Dict[str, Any]] = None
     created_at: datetime
 
+class TrainingDatasetBuildCreate(BaseSchema):
+    """Dataset built incrementally from an agent's rated and corrected
+    executions; examples whose input near-duplicates one already in the
+    dataset are dropped unless ``drop_near_duplicates`` is false"""
+    name: str
+    description: Optional[str] = None
+    agent_id: str
+    min_rating: int = Field(4, ge=1, le=5)
+    model_version_id: Optional[str] = None
+    drop_near_duplicates: bool = True
+
+class TrainingDatasetPageResponse(BaseSchema):
+    dataset_id: str
+    offset: int
+    limit: int
+    total: int
+    examples: List[Dict[str, Any]]
+
 # Model Version schemas
 class ModelVersionBase(BaseSchema):
     version: str
@@ -230,6 +387,41 @@ class SyntheticScenarioResponse(SyntheticScenarioBase):
     agent_id: Optional[str] = None
     created_at: datetime
 
+class SyntheticTemplate(BaseSchema):
+    name: Optional[str] = None
+    input_data: Dict[str, Any]
+    expected_output: Optional[Dict[str, Any]] = None
+    scenario_type: str = "common"
+    difficulty: Optional[int] = Field(1, ge=1, le=5)
+    tags: Optional[List[str]] = []
+
+class SyntheticGenerationCreate(BaseSchema):
+    """Generate ``count`` variants of the templates and/or the agent's
+    most recent executions (``execution_success`` filters them).
+    With ``drop_near_duplicates``, variants near-duplicating an earlier
+    variant of the run are skipped and more are drawn in their place."""
+    agent_id: str
+    count: int = Field(..., ge=1)
+    templates: List[SyntheticTemplate] = []
+    from_executions: bool = True
+    execution_success: Optional[bool] = None
+    max_seeds: Optional[int] = Field(None, ge=1)
+    seed: Optional[int] = None
+    drop_near_duplicates: bool = False
+
+class SyntheticGenerationRunResponse(BaseSchema):
+    run_id: str
+    status: str
+    requested: int
+    generated: int
+    inserted: int
+    near_duplicates: int = 0
+    seeds: int
+    seed: Optional[int] = None  # random seed, drawn when not given
+    elapsed_seconds: float
+    scenarios_per_second: float
+    error: Optional[str] = None
+
 # Analytics schemas
 class AgentMetricsResponse(BaseSchema):
     total_executions: int
@@ -238,6 +430,25 @@ class AgentMetricsResponse(BaseSchema):
     avg_cost: float
     last_execution: Optional[str] = None
 
+class MetricsBucketResponse(BaseSchema):
+    bucket_start: datetime
+    executions_count: int
+    success_rate: float
+    avg_execution_time_ms: float
+    avg_cost: float
+
+class MetricsTimeseriesResponse(BaseSchema):
+    agent_id: str
+    granularity: RollupGranularity
+    buckets: List[MetricsBucketResponse]
+
+class MetricsQuantilesResponse(BaseSchema):
+    agent_id: str
+    granularity: RollupGranularity
+    sample_count: int
+    execution_time_ms: Dict[str, Optional[float]]
+    cost: Dict[str, Optional[float]]
+
 class FeedbackSummaryResponse(BaseSchema):
     total_feedback: int
     avg_rating: Optional[float] = None
@@ -0,0 +1,247 @@
+"""
+Batch A/B analysis across every running test.
+
+Per-variant totals for all selected tests come from one GROUP BY over
+``ab_test_results``; they are laid out as NumPy arrays with one element
+per (test, challenger) pair and analyzed in a single vectorized pass
+(utils.batch_significance): lift, normal confidence intervals, p-values,
+mSPRT sequential p-values and bootstrap lift intervals. Confidence and
+winners follow the same rules as the streaming engine (services.ab_stats)
+and are written back with one executemany UPDATE; stopping tests early is
+left to the streaming engine.
+
+    python -m services.ab_analysis              # analyze and write back
+    python -m services.ab_analysis --benchmark 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import ABTest, ABTestResult, ABTestStatus, ABTestVariant
+from services.ab_stats import baseline_variant
+from utils.batch_significance import analyze_pairs, select_winners
+
+logger = logging.getLogger(__name__)
+
+PAIR_FIELDS = [
+    "lift", "lift_low", "lift_high", "difference_low", "difference_high",
+    "p_value", "sequential_p_value",
+]
+
+
+def _float(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+async def load_variant_totals(db: AsyncSession, test_ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """One row per variant of every running test (or of ``test_ids``)"""
+    query = (
+        select(
+            ABTest.id.label("ab_test_id"),
+            ABTest.confidence_level,
+            ABTest.winner_variant_id,
+            ABTestVariant.id.label("variant_id"),
+            ABTestVariant.name,
+            func.coalesce(func.sum(ABTestResult.executions_count), 0).label("executions"),
+            func.coalesce(func.sum(ABTestResult.success_count), 0).label("successes"),
+        )
+        .join(ABTestVariant, ABTestVariant.ab_test_id == ABTest.id)
+        .outerjoin(ABTestResult, ABTestResult.variant_id == ABTestVariant.id)
+        .group_by(ABTest.id, ABTest.confidence_level, ABTest.winner_variant_id, ABTestVariant.id, ABTestVariant.name)
+    )
+    if test_ids is None:
+        query = query.where(ABTest.status == ABTestStatus.RUNNING)
+    else:
+        query = query.where(ABTest.id.in_(list(test_ids)))
+    return [dict(row._mapping) for row in await db.execute(query)]
+
+
+def analyze_totals(
+    rows: List[Dict[str, Any]],
+    resamples: int = settings.AB_ANALYSIS_BOOTSTRAP_RESAMPLES,
+    alpha: float = settings.AB_SIGNIFICANCE_ALPHA,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Analyze every test in ``rows`` (as from load_variant_totals) at once"""
+    tests: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        test = tests.setdefault(row["ab_test_id"], {
+            "confidence_level": row["confidence_level"],
+            "winner_variant_id": row["winner_variant_id"],
+            "variants": {},
+        })
+        test["variants"][row["variant_id"]] = row
+
+    test_ids = list(tests)
+    pair_test: List[int] = []
+    pair_variant: List[str] = []
+    base_s: List[int] = []
+    base_n: List[int] = []
+    s: List[int] = []
+    n: List[int] = []
+    baselines: List[Optional[str]] = []
+    for position, test_id in enumerate(test_ids):
+        variants = tests[test_id]["variants"]
+        baseline_id = baseline_variant({v: variants[v]["name"] for v in variants})
+        baselines.append(baseline_id)
+        base = variants[baseline_id]
+        for variant_id, variant in variants.items():
+            if variant_id == baseline_id:
+                continue
+            pair_test.append(position)
+            pair_variant.append(variant_id)
+            base_s.append(base["successes"])
+            base_n.append(base["executions"])
+            s.append(variant["successes"])
+            n.append(variant["executions"])
+
+    pair_test_arr = np.array(pair_test, dtype=np.int64)
+    pairs = analyze_pairs(
+        np.array(base_s), np.array(base_n), np.array(s), np.array(n),
+        confidence=1 - alpha, tau=settings.AB_SEQUENTIAL_TAU, resamples=resamples, seed=seed
+    )
+    challengers = np.bincount(pair_test_arr, minlength=len(test_ids))
+    current = np.array(
+        [tests[t]["confidence_level"] if tests[t]["confidence_level"] is not None else np.nan for t in test_ids],
+        dtype=np.float64
+    )
+    decision = select_winners(
+        pair_test_arr, pairs["difference"], pairs["sequential_p_value"], challengers, current, alpha
+    )
+
+    results = []
+    for position, test_id in enumerate(test_ids):
+        test = tests[test_id]
+        winner = test["winner_variant_id"]
+        if winner is None:
+            winner_pair = decision["winner_pair"][position]
+            if winner_pair >= 0:
+                winner = pair_variant[winner_pair]
+            elif winner_pair == -1:
+                winner = baselines[position]
+        has_data = decision["best_pair"][position] >= 0 and not np.isnan(
+            pairs["sequential_p_value"][decision["best_pair"][position]]
+        )
+        results.append({
+            "ab_test_id": test_id,
+            "baseline_variant_id": baselines[position],
+            "winner_variant_id": winner,
+            "confidence_level": (
+                float(decision["confidence"][position]) if has_data else test["confidence_level"]
+            ),
+            "variants": [],
+        })
+
+    for i, variant_id in enumerate(pair_variant):
+        variant = tests[test_ids[pair_test[i]]]["variants"][variant_id]
+        results[pair_test[i]]["variants"].append({
+            "variant_id": variant_id,
+            "variant_name": variant["name"],
+            "executions_count": variant["executions"],
+            "success_rate": _float(pairs["rate"][i]),
+            **{field: _float(pairs[field][i]) for field in PAIR_FIELDS},
+        })
+    return results
+
+
+async def write_decisions(db: AsyncSession, results: List[Dict[str, Any]]) -> int:
+    """Bulk-write confidence and winner for every analyzed test"""
+    params = [
+        {
+            "b_id": result["ab_test_id"],
+            "b_winner": result["winner_variant_id"],
+            "b_confidence": result["confidence_level"],
+        }
+        for result in results
+    ]
+    if not params:
+        return 0
+    table = ABTest.__table__
+    confidence = bindparam("b_confidence")
+    # Same monotone rules as the streaming engine, enforced in SQL so a
+    # concurrent flush is never overwritten with an older value
+    await db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            winner_variant_id=func.coalesce(table.c.winner_variant_id, bindparam("b_winner")),
+            confidence_level=case(
+                (table.c.confidence_level.is_(None), confidence),
+                (confidence > table.c.confidence_level, confidence),
+                else_=table.c.confidence_level
+            )
+        ),
+        params
+    )
+    return len(params)
+
+
+async def run_analysis(
+    test_ids: Optional[Sequence[str]] = None,
+    write: bool = True,
+    resamples: int = settings.AB_ANALYSIS_BOOTSTRAP_RESAMPLES
+) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
+        rows = await load_variant_totals(db, test_ids)
+        results = analyze_totals(rows, resamples=resamples) if rows else []
+        if write and results:
+            await write_decisions(db, results)
+            await db.commit()
+    return results
+
+
+def benchmark(tests: int = 1000, variants: int = 3, resamples: int = 1000, seed: int = 0) -> Dict[str, float]:
+    """Time analyze_totals on synthetic totals (no database)"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for t in range(tests):
+        for v in range(variants):
+            executions = int(rng.integers(1_000, 100_000))
+            rows.append({
+                "ab_test_id": f"test-{t}",
+                "confidence_level": None,
+                "winner_variant_id": None,
+                "variant_id": f"test-{t}-variant-{v}",
+                "name": "control" if v == 0 else f"variant_{v}",
+                "executions": executions,
+                "successes": int(rng.binomial(executions, 0.30 + 0.01 * v)),
+            })
+
+    started = time.perf_counter()
+    analyze_totals(rows, resamples=0)
+    closed_form = time.perf_counter() - started
+    started = time.perf_counter()
+    analyze_totals(rows, resamples=resamples, seed=seed)
+    with_bootstrap = time.perf_counter() - started
+    return {
+        "tests": tests,
+        "pairs": tests * (variants - 1),
+        "closed_form_seconds": closed_form,
+        "with_bootstrap_seconds": with_bootstrap,
+        "bootstrap_resamples": resamples,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--benchmark", type=int, metavar="TESTS")
+    parser.add_argument("--resamples", type=int, default=settings.AB_ANALYSIS_BOOTSTRAP_RESAMPLES)
+    parser.add_argument("--dry-run", action="store_true", help="analyze without writing back")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.benchmark:
+        for key, value in benchmark(args.benchmark, resamples=args.resamples).items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+    else:
+        results = asyncio.run(run_analysis(write=not args.dry_run, resamples=args.resamples))
+        logger.info(f"Analyzed {len(results)} running A/B tests")
@@ -0,0 +1,209 @@
+"""
+In-memory A/B traffic router.
+
+Assignment runs in front of every execution, so it never touches the
+database: the router holds an immutable snapshot mapping each agent to
+the compiled splits of its running tests, and ``assign`` is a dict lookup
+plus one salted hash per test. The snapshot is rebuilt and swapped
+atomically when tests change (``notify_changed`` refreshes this worker
+and publishes on Redis so the others refresh too) and every
+AB_ROUTER_REFRESH_SECONDS as a fallback, which also picks up tests whose
+start or end date has passed.
+
+Variant weights come from ``ABTestVariant.traffic_percentage``, falling
+back to the test's ``traffic_split`` entry for the variant's name.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from config import settings
+from database import AsyncSessionLocal
+from models import ABTest, ABTestStatus
+from utils.traffic import WeightedSplit
+
+logger = logging.getLogger(__name__)
+
+CHANGE_CHANNEL = "agent-gym:ab-tests-changed"
+ASSIGNMENTS_KEY = "ab_assignments"
+
+
+@dataclass(frozen=True)
+class Assignment:
+    ab_test_id: str
+    variant_id: str
+    variant_name: str
+    model_version_id: Optional[str]
+
+
+def _variant_label(assignment: Assignment) -> str:
+    return assignment.variant_id
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _is_live(test: ABTest, now: datetime) -> bool:
+    if test.start_date and _aware(test.start_date) > now:
+        return False
+    if test.end_date and _aware(test.end_date) <= now:
+        return False
+    return True
+
+
+def compile_snapshot(tests: Iterable[ABTest]) -> Dict[str, Tuple[WeightedSplit, ...]]:
+    """Compile running tests (with variants loaded) into per-agent splits"""
+    now = datetime.now(timezone.utc)
+    snapshot: Dict[str, List[WeightedSplit]] = {}
+    for test in tests:
+        if not _is_live(test, now):
+            continue
+        split = test.traffic_split or {}
+        arms = [
+            (
+                Assignment(test.id, variant.id, variant.name, variant.model_version_id),
+                variant.traffic_percentage if variant.traffic_percentage is not None
+                else split.get(variant.name, 0.0),
+            )
+            for variant in sorted(test.variants, key=lambda v: v.name)
+        ]
+        try:
+            snapshot.setdefault(test.agent_id, []).append(WeightedSplit(test.id, arms, label=_variant_label))
+        except ValueError:
+            logger.warning(f"A/B test {test.id} has no variant with traffic; not routing it")
+    return {agent_id: tuple(splits) for agent_id, splits in snapshot.items()}
+
+
+class TrafficRouter:
+    def __init__(self, refresh_seconds: float = settings.AB_ROUTER_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Dict[str, Tuple[WeightedSplit, ...]] = {}
+        self._redis = None
+        self._tasks: List[asyncio.Task] = []
+
+    def assign(self, agent_id: str, subject_key: str) -> List[Assignment]:
+        """Variant of every running test on the agent for this subject"""
+        splits = self._snapshot.get(agent_id)
+        if not splits:
+            return []
+        return [split.pick(subject_key) for split in splits]
+
+    def tag_execution(self, row: Dict[str, Any], subject_key: Optional[str] = None) -> List[Assignment]:
+        """Assign an execution row and record the variants in its metadata.
+
+        Without a subject key the execution id is used, which randomizes
+        per execution rather than per user. Assignments already in the
+        metadata are replaced.
+        """
+        assignments = self.assign(row["agent_id"], subject_key or row["id"])
+        metadata = {key: value for key, value in (row.get("metadata") or {}).items() if key != ASSIGNMENTS_KEY}
+        if assignments:
+            metadata[ASSIGNMENTS_KEY] = {a.ab_test_id: a.variant_id for a in assignments}
+        row["metadata"] = metadata
+        return assignments
+
+    def route_execution(self, row: Dict[str, Any], subject_key: Optional[str] = None) -> Dict[str, str]:
+        """Tag an execution the client may have routed itself.
+
+        A reported ``{test_id: variant_id}`` pair is kept only if it is a
+        variant of a running test on the row's agent; every other running
+        test gets the router's pick and anything else reported is dropped,
+        so stats never reference tests or variants that do not exist.
+        """
+        metadata = dict(row.get("metadata") or {})
+        reported = metadata.pop(ASSIGNMENTS_KEY, None)
+        if not isinstance(reported, dict):
+            reported = {}
+        assignments = {}
+        for split in self._snapshot.get(row["agent_id"], ()):
+            variant_id = reported.get(split.salt)
+            if not any(arm.variant_id == variant_id for arm in split.arms):
+                variant_id = split.pick(subject_key or row["id"]).variant_id
+            assignments[split.salt] = variant_id
+        if assignments:
+            metadata[ASSIGNMENTS_KEY] = assignments
+        row["metadata"] = metadata
+        return assignments
+
+    async def refresh(self) -> None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ABTest)
+                .options(selectinload(ABTest.variants))
+                .where(ABTest.status == ABTestStatus.RUNNING)
+            )
+            snapshot = compile_snapshot(result.scalars().all())
+        self._snapshot = snapshot
+        logger.info(f"A/B router compiled {sum(map(len, snapshot.values()))} running tests")
+
+    def _client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    async def notify_changed(self) -> None:
+        """Refresh now and tell other workers to do the same"""
+        await self.refresh()
+        try:
+            await self._client().publish(CHANGE_CHANNEL, "refresh")
+        except Exception as e:
+            logger.warning(f"A/B router change broadcast failed: {e}")
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"A/B router initial refresh failed: {e}")
+        self._tasks = [asyncio.create_task(self._poll()), asyncio.create_task(self._listen())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"A/B router refresh failed, keeping previous snapshot: {e}")
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                pubsub = self._client().pubsub()
+                await pubsub.subscribe(CHANGE_CHANNEL)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Missed changes are picked up by the periodic refresh
+                logger.warning(f"A/B router subscription lost, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+traffic_router = TrafficRouter()
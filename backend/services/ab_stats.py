@@ -0,0 +1,342 @@
+"""
+Streaming A/B statistics.
+
+Executions tagged by the traffic router (``metadata.ab_assignments``) and
+ratings on those executions are folded into per-variant VariantStats
+accumulators in memory as they are committed, keyed by period
+(AB_STATS_PERIOD_SECONDS). Every AB_STATS_FLUSH_SECONDS the engine merges
+them into ``ab_test_results`` period rows -- one row per
+(test, variant, period) with a deterministic id, so workers flushing the
+same period merge into it instead of racing -- keeping the Welford state
+in ``metrics`` so rows stay mergeable.
+
+After each flush the tests that received data are re-evaluated from their
+period rows: each variant's success rate is compared with the baseline
+(the variant named "control", else the first by name) and
+``ABTest.confidence_level`` / ``winner_variant_id`` are updated. The
+confidence level is ``1 - p`` for the mSPRT sequential p-value
+(Bonferroni-adjusted across challengers) and only ever increases, so it
+can be watched continuously; with AB_AUTO_STOP a test is completed as
+soon as it crosses ``1 - AB_SIGNIFICANCE_ALPHA``.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import ABTest, ABTestResult, ABTestStatus, ABTestVariant, AgentExecution
+from services.ab_router import ASSIGNMENTS_KEY, traffic_router
+from utils.online_stats import VariantStats
+from utils.significance import compare_proportions
+
+logger = logging.getLogger(__name__)
+
+RESULT_ID_NAMESPACE = uuid.UUID("6f1d3c56-2f8e-4d3b-9a57-3c0a4b1e8f21")
+BASELINE_NAME = "control"
+
+PeriodKey = Tuple[str, str, datetime]
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def period_start(at: datetime, period_seconds: int = settings.AB_STATS_PERIOD_SECONDS) -> datetime:
+    epoch = int(_aware(at).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % period_seconds, tz=timezone.utc)
+
+
+def result_id(ab_test_id: str, variant_id: str, start: datetime) -> str:
+    return str(uuid.uuid5(RESULT_ID_NAMESPACE, f"{ab_test_id}:{variant_id}:{start.isoformat()}"))
+
+
+def baseline_variant(variants: Dict[str, str]) -> Optional[str]:
+    """Baseline variant id from ``{variant_id: name}``"""
+    if not variants:
+        return None
+    for variant_id, name in variants.items():
+        if name == BASELINE_NAME:
+            return variant_id
+    return min(variants, key=lambda variant_id: variants[variant_id])
+
+
+def evaluate(
+    stats: Dict[str, VariantStats],
+    names: Dict[str, str],
+    tau: float = settings.AB_SEQUENTIAL_TAU
+) -> Dict[str, Any]:
+    """Compare every challenger with the baseline.
+
+    Returns the baseline, the per-variant comparisons, the best challenger
+    by sequential p-value and its Bonferroni-adjusted confidence.
+    """
+    baseline_id = baseline_variant(names)
+    base = stats.get(baseline_id)
+    comparisons: Dict[str, Dict[str, Any]] = {}
+    challengers = [variant_id for variant_id in names if variant_id != baseline_id]
+    for variant_id in challengers:
+        variant = stats.get(variant_id)
+        if base is None or variant is None:
+            continue
+        comparison = compare_proportions(
+            base.successes, base.executions, variant.successes, variant.executions, tau
+        )
+        if comparison is not None:
+            comparisons[variant_id] = comparison
+
+    best = min(comparisons, key=lambda v: comparisons[v]["sequential_p_value"], default=None)
+    confidence = None
+    leader = None
+    if best is not None:
+        adjusted = min(1.0, comparisons[best]["sequential_p_value"] * max(len(challengers), 1))
+        confidence = 1.0 - adjusted
+        leader = best if comparisons[best]["difference"] > 0 else baseline_id
+    return {
+        "baseline_variant_id": baseline_id,
+        "comparisons": comparisons,
+        "leader_variant_id": leader,
+        "confidence_level": confidence,
+    }
+
+
+async def load_variant_stats(db: AsyncSession, test_ids: Iterable[str]) -> Dict[str, Dict[str, VariantStats]]:
+    """Cumulative VariantStats per test and variant, merged from period rows"""
+    result = await db.execute(
+        select(
+            ABTestResult.ab_test_id, ABTestResult.variant_id, ABTestResult.executions_count,
+            ABTestResult.success_count, ABTestResult.metrics
+        ).where(ABTestResult.ab_test_id.in_(list(test_ids)))
+    )
+    totals: Dict[str, Dict[str, VariantStats]] = {}
+    for test_id, variant_id, executions, successes, metrics in result.all():
+        variant = totals.setdefault(test_id, {}).setdefault(variant_id, VariantStats())
+        variant.merge(VariantStats.from_result(executions, successes, metrics))
+    return totals
+
+
+async def load_variant_names(db: AsyncSession, test_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    result = await db.execute(
+        select(ABTestVariant.ab_test_id, ABTestVariant.id, ABTestVariant.name)
+        .where(ABTestVariant.ab_test_id.in_(list(test_ids)))
+    )
+    names: Dict[str, Dict[str, str]] = {}
+    for test_id, variant_id, name in result.all():
+        names.setdefault(test_id, {})[variant_id] = name
+    return names
+
+
+class ABStatsEngine:
+    def __init__(
+        self,
+        flush_seconds: float = settings.AB_STATS_FLUSH_SECONDS,
+        period_seconds: int = settings.AB_STATS_PERIOD_SECONDS,
+    ):
+        self.flush_seconds = flush_seconds
+        self.period_seconds = period_seconds
+        self._pending: Dict[PeriodKey, VariantStats] = {}
+        self._ratings: List[Tuple[str, float, datetime]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _bucket(
+        self,
+        ab_test_id: str,
+        variant_id: str,
+        at: datetime,
+        target: Optional[Dict[PeriodKey, VariantStats]] = None
+    ) -> VariantStats:
+        target = self._pending if target is None else target
+        key = (ab_test_id, variant_id, period_start(at, self.period_seconds))
+        stats = target.get(key)
+        if stats is None:
+            stats = target[key] = VariantStats()
+        return stats
+
+    def record_executions(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Fold committed execution rows into the current accumulators"""
+        for row in rows:
+            assignments = (row.get("metadata") or {}).get(ASSIGNMENTS_KEY)
+            if not assignments:
+                continue
+            for ab_test_id, variant_id in assignments.items():
+                self._bucket(ab_test_id, variant_id, row["created_at"]).add_execution(
+                    row.get("success"), row.get("execution_time_ms"), row.get("cost")
+                )
+
+    def record_ratings(self, ratings: Iterable[Tuple[str, Optional[float]]]) -> None:
+        """Queue ``(execution_id, rating)`` pairs; their variants are
+        resolved in bulk at flush time, off the request path"""
+        now = datetime.now(timezone.utc)
+        self._ratings.extend(
+            (execution_id, rating, now) for execution_id, rating in ratings if rating is not None
+        )
+
+    async def _resolve_ratings(
+        self,
+        db: AsyncSession,
+        ratings: List[Tuple[str, float, datetime]],
+        target: Dict[PeriodKey, VariantStats]
+    ) -> None:
+        metadata = AgentExecution.__table__.c.metadata
+        result = await db.execute(
+            select(AgentExecution.id, metadata)
+            .where(AgentExecution.id.in_({execution_id for execution_id, _, _ in ratings}))
+        )
+        assignments = {
+            execution_id: (meta or {}).get(ASSIGNMENTS_KEY) for execution_id, meta in result.all()
+        }
+        for execution_id, rating, at in ratings:
+            for ab_test_id, variant_id in (assignments.get(execution_id) or {}).items():
+                self._bucket(ab_test_id, variant_id, at, target).add_rating(rating)
+
+    async def _drop_unknown(self, db: AsyncSession, pending: Dict[PeriodKey, VariantStats]) -> None:
+        """Drop keys whose (test, variant) pair does not exist, e.g. from a
+        deleted test: they would fail the result row's foreign keys on
+        every retry"""
+        known = set((await db.execute(
+            select(ABTestVariant.ab_test_id, ABTestVariant.id)
+            .where(ABTestVariant.ab_test_id.in_({key[0] for key in pending}))
+        )).all())
+        for key in [key for key in pending if (key[0], key[1]) not in known]:
+            logger.warning(f"Dropping A/B stats for unknown test {key[0]} / variant {key[1]}")
+            del pending[key]
+
+    async def _merge_periods(self, db: AsyncSession, pending: Dict[PeriodKey, VariantStats]) -> None:
+        period = timedelta(seconds=self.period_seconds)
+        ids = {key: result_id(*key) for key in pending}
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        await db.execute(
+            dialect.insert(ABTestResult.__table__)
+            .values([
+                {
+                    "id": ids[key], "ab_test_id": key[0], "variant_id": key[1],
+                    "executions_count": 0, "success_count": 0, "metrics": {},
+                    "period_start": key[2], "period_end": key[2] + period,
+                }
+                for key in pending
+            ])
+            .on_conflict_do_nothing()
+        )
+
+        # Lock the period rows so concurrent flushes merge one at a time,
+        # in id order so two flushes never wait on each other's rows
+        rows = (await db.execute(
+            select(ABTestResult).where(ABTestResult.id.in_(list(ids.values())))
+            .order_by(ABTestResult.id).with_for_update()
+        )).scalars().all()
+        by_id = {row.id: row for row in rows}
+        for key, delta in pending.items():
+            row = by_id[ids[key]]
+            stats = VariantStats.from_result(row.executions_count, row.success_count, row.metrics)
+            stats.merge(delta)
+            row.executions_count = stats.executions
+            row.success_count = stats.successes
+            row.avg_execution_time = stats.execution_time.mean_or_none()
+            row.avg_cost = stats.cost.mean_or_none()
+            row.avg_rating = stats.rating.mean_or_none()
+            row.metrics = stats.to_metrics()
+
+    async def _evaluate_tests(self, db: AsyncSession, test_ids: Set[str]) -> bool:
+        """Update confidence and winner; returns True if a test was stopped"""
+        totals = await load_variant_stats(db, test_ids)
+        names = await load_variant_names(db, test_ids)
+        tests = (await db.execute(
+            select(ABTest).where(ABTest.id.in_(list(test_ids))).order_by(ABTest.id).with_for_update()
+        )).scalars().all()
+
+        stopped = False
+        threshold = 1.0 - settings.AB_SIGNIFICANCE_ALPHA
+        for test in tests:
+            if test.status != ABTestStatus.RUNNING:
+                continue
+            analysis = evaluate(totals.get(test.id, {}), names.get(test.id, {}))
+            confidence = analysis["confidence_level"]
+            if confidence is None:
+                continue
+            # Sequential p-values are always valid at their running minimum
+            test.confidence_level = max(test.confidence_level or 0.0, confidence)
+            if test.confidence_level >= threshold:
+                if test.winner_variant_id is None:
+                    test.winner_variant_id = analysis["leader_variant_id"]
+                if settings.AB_AUTO_STOP:
+                    test.status = ABTestStatus.COMPLETED
+                    test.end_date = datetime.now(timezone.utc)
+                    stopped = True
+                    logger.info(f"A/B test {test.id} stopped early at confidence {test.confidence_level:.4f}")
+        return stopped
+
+    async def flush(self) -> int:
+        """Write pending accumulators; returns the number of period rows touched"""
+        pending, self._pending = self._pending, {}
+        ratings, self._ratings = self._ratings, []
+        if not pending and not ratings:
+            return 0
+
+        resolved = False
+        try:
+            async with AsyncSessionLocal() as db:
+                if ratings:
+                    await self._resolve_ratings(db, ratings, pending)
+                resolved = True
+                await self._drop_unknown(db, pending)
+                if not pending:
+                    return 0
+                await self._merge_periods(db, pending)
+                stopped = await self._evaluate_tests(db, {key[0] for key in pending})
+                await db.commit()
+        except IntegrityError as e:
+            # A test deleted since _drop_unknown; retrying the same keys
+            # would fail forever, so this flush's stats are dropped
+            logger.error(f"Dropped A/B stats for {len(pending)} periods that violate a constraint: {e}")
+            return 0
+        except Exception:
+            # Put everything back so the next flush retries it
+            for (ab_test_id, variant_id, start), stats in pending.items():
+                self._bucket(ab_test_id, variant_id, start).merge(stats)
+            if not resolved:
+                self._ratings.extend(ratings)
+            raise
+
+        if stopped:
+            await traffic_router.notify_changed()
+        return len(pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final A/B stats flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"A/B stats flush failed, will retry: {e}")
+
+
+ab_stats = ABStatsEngine()
@@ -0,0 +1,204 @@
+"""
+Two-level cache for Agent lookups on the request hot path.
+
+L1 is a per-worker TTL/LRU cache; L2 is Redis (settings.REDIS_URL), shared
+by every worker. Entries are plain column snapshots, not ORM objects, so
+they are safe to share across sessions. ``invalidate`` clears both tiers
+and publishes the agent id so other workers drop their L1 copy straight
+away instead of waiting for the TTL.
+
+A lookup that misses both tiers can race an update: it may read the row
+before the update commits and finish after ``invalidate`` has run, which
+would cache the old snapshot until the TTL. Each agent therefore has a
+generation, bumped by ``invalidate`` (per worker for L1, in Redis for L2),
+and a fill only lands if the generation it saw before reading is still
+current.
+
+Redis is optional at runtime: if it is unreachable (calls time out after
+REDIS_SOCKET_TIMEOUT_SECONDS), lookups fall through to the database and
+the L1 TTL bounds staleness.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Agent
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "agent-gym:agent:"
+GENERATION_PREFIX = "agent-gym:agent-generation:"
+INVALIDATION_CHANNEL = "agent-gym:agent-invalidate"
+
+# KEYS: snapshot, generation; ARGV: generation read before the fill, snapshot, ttl
+_FILL_IF_CURRENT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return nil
+"""
+
+
+def agent_snapshot(agent: Agent) -> Dict[str, Any]:
+    """Column values of an Agent, JSON-serializable"""
+    snapshot = {}
+    for column in Agent.__table__.columns:
+        value = getattr(agent, column.key)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        elif hasattr(value, "value"):
+            value = value.value
+        snapshot[column.name] = value
+    return snapshot
+
+
+class AgentCache:
+    def __init__(
+        self,
+        l1_ttl: float = settings.AGENT_CACHE_L1_TTL_SECONDS,
+        l2_ttl: int = settings.AGENT_CACHE_L2_TTL_SECONDS,
+        max_size: int = settings.AGENT_CACHE_MAX_SIZE,
+    ):
+        self.l1 = TTLCache(ttl=l1_ttl, max_size=max_size)
+        self.l2_ttl = l2_ttl
+        self._redis = None
+        self._subscriber = None
+        self._listener: Optional[asyncio.Task] = None
+        # (epoch, per-agent count); the epoch moves when all of L1 is cleared
+        self._epoch = 0
+        self._generations: Dict[str, int] = {}
+        self.hits = {"l1": 0, "l2": 0, "db": 0}
+
+    def _client(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+            )
+        return self._redis
+
+    def _subscriber_client(self):
+        # Separate connection without a read timeout: the subscription
+        # legitimately sits idle between invalidations
+        if self._subscriber is None:
+            import redis.asyncio as redis
+            self._subscriber = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+                socket_keepalive=True,
+            )
+        return self._subscriber
+
+    def _generation(self, agent_id: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(agent_id, 0)
+
+    def _fill_l1(self, agent_id: str, generation: Tuple[int, int], snapshot: Dict[str, Any]) -> None:
+        if self._generation(agent_id) == generation:
+            self.l1.set(agent_id, snapshot)
+
+    def _invalidate_l1(self, agent_id: str) -> None:
+        self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        self.l1.invalidate(agent_id)
+
+    async def get(self, db: AsyncSession, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Agent snapshot by id, or None if the agent does not exist"""
+        snapshot = self.l1.get(agent_id)
+        if snapshot is not None:
+            self.hits["l1"] += 1
+            return snapshot
+
+        generation = self._generation(agent_id)
+        try:
+            cached, l2_generation = await self._client().mget(KEY_PREFIX + agent_id, GENERATION_PREFIX + agent_id)
+        except Exception as e:
+            logger.warning(f"Agent cache L2 read failed: {e}")
+            cached = l2_generation = None
+        if cached is not None:
+            snapshot = json.loads(cached)
+            self._fill_l1(agent_id, generation, snapshot)
+            self.hits["l2"] += 1
+            return snapshot
+
+        agent = await db.get(Agent, agent_id)
+        if agent is None:
+            return None
+        self.hits["db"] += 1
+        snapshot = agent_snapshot(agent)
+        self._fill_l1(agent_id, generation, snapshot)
+        try:
+            await self._client().eval(
+                _FILL_IF_CURRENT, 2, KEY_PREFIX + agent_id, GENERATION_PREFIX + agent_id,
+                l2_generation or "0", json.dumps(snapshot), self.l2_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Agent cache L2 write failed: {e}")
+        return snapshot
+
+    async def invalidate(self, agent_id: str) -> None:
+        """Drop an agent from both tiers and tell other workers to do the same.
+
+        Call after the change is committed.
+        """
+        self._invalidate_l1(agent_id)
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                # The generation outlives any fill that could have read it
+                pipe.incr(GENERATION_PREFIX + agent_id)
+                pipe.expire(GENERATION_PREFIX + agent_id, self.l2_ttl)
+                pipe.delete(KEY_PREFIX + agent_id)
+                pipe.publish(INVALIDATION_CHANNEL, agent_id)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Agent cache invalidation broadcast failed: {e}")
+
+    async def start(self) -> None:
+        """Subscribe to invalidations published by other workers"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for client in (self._redis, self._subscriber):
+            if client is not None:
+                await client.close()
+        self._redis = self._subscriber = None
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                pubsub = self._subscriber_client().pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._invalidate_l1(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Missed messages are covered by the L1 TTL; clear to be safe
+                logger.warning(f"Agent cache subscription lost, retrying in {delay:.0f}s: {e}")
+                self._epoch += 1
+                self._generations.clear()
+                self.l1.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+agent_cache = AgentCache()
@@ -0,0 +1,214 @@
+"""
+Bulk automated feedback.
+
+Scans executions that have no feedback yet, scores them in batches with a
+pluggable scorer and writes the results with one bulk
+``INSERT ... ON CONFLICT DO NOTHING`` per batch, so manual feedback that
+lands concurrently always wins.
+
+A scorer is any picklable callable ``scorer(execution: dict) -> dict | None``
+returning ``rating``, ``binary_feedback`` and ``comment`` (or None to leave
+the execution unscored). Select one with AUTO_FEEDBACK_SCORER as a
+``module:function`` path.
+
+Progress is checkpointed in ``job_checkpoints`` after every batch, so the
+job resumes where it stopped. Executions can commit with a ``created_at``
+behind the cursor (long transactions, client-supplied timestamps), so
+each run starts AUTO_FEEDBACK_OVERLAP_SECONDS behind it; executions
+already scored are skipped by the query itself. Each batch runs with the checkpoint row
+locked, so overlapping runs (e.g. a slow run and the next beat) take turns
+instead of scoring the same executions.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import AgentExecution, Feedback, FeedbackType, JobCheckpoint
+from services.ab_stats import ab_stats
+from services.feedback_service import upsert_feedback_rows
+from utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "auto_feedback"
+REVIEWER_ID = "auto_feedback_system"
+
+Scorer = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def success_scorer(execution: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Default scorer: rate on the execution's own success flag"""
+    if execution.get("success") is None:
+        return None
+    if execution["success"]:
+        return {"rating": 5, "binary_feedback": True, "comment": "Execution successful"}
+    return {"rating": 1, "binary_feedback": False, "comment": "Execution failed"}
+
+
+def load_scorer(path: str = settings.AUTO_FEEDBACK_SCORER) -> Scorer:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _score_all(scorer: Scorer, executions: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    return [scorer(execution) for execution in executions]
+
+
+async def _lock_checkpoint(db: AsyncSession) -> JobCheckpoint:
+    """The checkpoint row, locked until the next commit.
+
+    Runs re-lock it before every batch, so overlapping runs take turns and
+    each picks up the cursor the other committed.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    await db.execute(
+        dialect.insert(JobCheckpoint.__table__)
+        .values(name=CHECKPOINT_NAME, state={"cursor": None, "scanned": 0, "scored": 0, "written": 0})
+        .on_conflict_do_nothing()
+    )
+    return await db.scalar(
+        select(JobCheckpoint)
+        .where(JobCheckpoint.name == CHECKPOINT_NAME)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+async def _unscored_batch(db: AsyncSession, cursor: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Oldest executions past ``cursor`` that have no feedback row"""
+    query = (
+        select(
+            AgentExecution.id, AgentExecution.agent_id, AgentExecution.input_data,
+            AgentExecution.output_data, AgentExecution.success,
+            AgentExecution.execution_time_ms, AgentExecution.cost, AgentExecution.created_at,
+        )
+        .where(~select(Feedback.id).where(Feedback.execution_id == AgentExecution.id).exists())
+        .order_by(AgentExecution.created_at, AgentExecution.id)
+        .limit(limit)
+    )
+    if cursor:
+        created_at, execution_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(AgentExecution.created_at, AgentExecution.id) > tuple_(created_at, execution_id)
+        )
+    return [dict(row._mapping) for row in await db.execute(query)]
+
+
+def _rewind(cursor: Optional[str], overlap: timedelta) -> Optional[str]:
+    """A cursor ``overlap`` before ``cursor``, ahead of every id at that time"""
+    if not cursor:
+        return None
+    created_at, _ = decode_cursor(cursor)
+    return encode_cursor(created_at - overlap, "")
+
+
+async def run_auto_feedback(
+    scorer: Optional[Scorer] = None,
+    batch_size: int = settings.AUTO_FEEDBACK_BATCH_SIZE,
+    processes: int = settings.AUTO_FEEDBACK_PROCESSES,
+    max_batches: Optional[int] = None,
+    overlap_seconds: float = settings.AUTO_FEEDBACK_OVERLAP_SECONDS
+) -> Dict[str, Any]:
+    """Score unscored executions until caught up (or ``max_batches`` ran).
+
+    Returns the run's throughput counters.
+    """
+    scorer = scorer or load_scorer()
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 0 else None
+    loop = asyncio.get_running_loop()
+    stats = {"batches": 0, "scanned": 0, "scored": 0, "written": 0}
+    started = time.monotonic()
+    position: Optional[str] = None
+
+    try:
+        async with AsyncSessionLocal() as db:
+            while max_batches is None or stats["batches"] < max_batches:
+                checkpoint = await _lock_checkpoint(db)
+                saved = checkpoint.state.get("cursor")
+                if position is None:
+                    position = _rewind(saved, timedelta(seconds=overlap_seconds))
+                elif saved and decode_cursor(saved) > decode_cursor(position):
+                    # Another run moved past us; continue from its cursor
+                    position = saved
+                executions = await _unscored_batch(db, position, batch_size)
+                if not executions:
+                    await db.commit()
+                    break
+
+                if pool is not None:
+                    # Fan the batch out across the pool in roughly equal slices
+                    step = max(1, len(executions) // processes)
+                    slices = [executions[i:i + step] for i in range(0, len(executions), step)]
+                    parts = await asyncio.gather(*(
+                        loop.run_in_executor(pool, _score_all, scorer, part) for part in slices
+                    ))
+                    scores = [score for part in parts for score in part]
+                else:
+                    scores = _score_all(scorer, executions)
+
+                rows = [
+                    {
+                        "agent_id": execution["agent_id"],
+                        "execution_id": execution["id"],
+                        "type": FeedbackType.RATING,
+                        "rating": score.get("rating"),
+                        "binary_feedback": score.get("binary_feedback"),
+                        "comment": score.get("comment"),
+                        "correction": score.get("correction"),
+                        "reviewer_id": REVIEWER_ID,
+                        "metadata": {"scorer": settings.AUTO_FEEDBACK_SCORER},
+                    }
+                    for execution, score in zip(executions, scores)
+                    if score is not None
+                ]
+                written = await upsert_feedback_rows(db, rows)
+
+                last = executions[-1]
+                position = encode_cursor(last["created_at"], last["id"])
+                state = dict(checkpoint.state)
+                if not saved or decode_cursor(position) > decode_cursor(saved):
+                    state["cursor"] = position
+                state["scanned"] += len(executions)
+                state["scored"] += len(rows)
+                state["written"] += len(written)
+                checkpoint.state = state
+                await db.commit()
+                ab_stats.record_ratings(
+                    (row["execution_id"], row["rating"]) for row in rows
+                    if row["execution_id"] in written and written[row["execution_id"]][1]
+                )
+
+                stats["batches"] += 1
+                stats["scanned"] += len(executions)
+                stats["scored"] += len(rows)
+                stats["written"] += len(written)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    # This runs outside the API process, so flush A/B ratings here
+    await ab_stats.flush()
+
+    elapsed = time.monotonic() - started
+    stats["elapsed_seconds"] = elapsed
+    stats["executions_per_second"] = stats["scanned"] / elapsed if elapsed else 0.0
+    logger.info(
+        f"Auto feedback: scanned {stats['scanned']}, wrote {stats['written']} "
+        f"in {elapsed:.1f}s ({stats['executions_per_second']:.0f} executions/s)"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_auto_feedback())
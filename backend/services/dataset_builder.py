@@ -0,0 +1,253 @@
+"""
+Incremental feedback-to-dataset builder.
+
+Turns AgentExecution + Feedback pairs into training examples. Each run
+only reads feedback past the watermark stored in
+``TrainingDataset.build_state``, walking it in fixed-size keyset chunks.
+Per chunk it:
+
+1. builds examples (the correction when one was given, otherwise the
+   agent's output for positively rated executions),
+2. drops examples whose input is a near-duplicate (MinHash similarity
+   at or above the dataset's ``near_duplicate_threshold``) of an example
+   already in the dataset or earlier in the chunk, using an LSH index so
+   each example is compared only with its bucket-mates,
+3. dedupes the rest on a normalized content hash via
+   ``INSERT ... ON CONFLICT DO NOTHING`` into ``dataset_example_hashes``,
+4. appends the survivors as a new Parquet chunk, and
+5. advances the watermark, the dataset's set hash and the target
+   ``ModelVersion.training_data_hash`` in the same commit.
+
+Feedback can commit with a ``created_at`` behind the watermark (long
+transactions), so each run re-reads DATASET_BUILD_OVERLAP_SECONDS behind
+it; re-read rows are dropped by the content-hash dedupe. Feedback is read
+once, by creation time: a rating or correction changed after its row was
+read is not picked up, and the example built from it stays as it was.
+
+A run can therefore stop at any point and resume, and memory does not
+grow with history length beyond the near-duplicate index, which is
+rebuilt from the dataset's chunks at the start of each run and capped at
+NEAR_DUP_MAX_ITEMS signatures (the oldest are evicted).
+
+    python -m services.dataset_builder <dataset_id>
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import (
+    AgentExecution, DatasetExampleHash, Feedback, ModelVersion, TrainingDataset
+)
+from services.dataset_store import DatasetWriter, iter_examples
+from services.near_duplicates import near_duplicates, new_index
+from utils.hashing import SetHash, content_hash
+from utils.minhash import LSHIndex
+from utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_RATING = 4
+
+
+def new_build_state(
+    agent_id: str,
+    min_rating: int = DEFAULT_MIN_RATING,
+    model_version_id: Optional[str] = None,
+    near_duplicate_threshold: Optional[float] = settings.NEAR_DUP_THRESHOLD
+) -> Dict[str, Any]:
+    return {
+        "agent_id": agent_id,
+        "min_rating": min_rating,
+        "model_version_id": model_version_id,
+        "near_duplicate_threshold": near_duplicate_threshold,
+        "watermark": None,
+        "set_hash": SetHash().hexdigest(),
+        "rows_scanned": 0,
+        "duplicates_skipped": 0,
+        "near_duplicates_skipped": 0,
+    }
+
+
+def build_example(execution: AgentExecution, feedback: Feedback) -> Dict[str, Any]:
+    output = {"text": feedback.correction} if feedback.correction else execution.output_data
+    return {
+        "input": execution.input_data,
+        "output": output,
+        "context": execution.context,
+        "rating": feedback.rating,
+        "source": "correction" if feedback.correction else "rated_output",
+        "execution_id": execution.id,
+        "feedback_id": feedback.id,
+    }
+
+
+async def _claim_new_hashes(db: AsyncSession, dataset_id: str, hashes: List[str]) -> set:
+    """Insert hashes not yet in the dataset; returns the ones that were new"""
+    if not hashes:
+        return set()
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialect.insert(DatasetExampleHash.__table__)
+        .values([{"dataset_id": dataset_id, "content_hash": h} for h in hashes])
+        .on_conflict_do_nothing()
+        .returning(DatasetExampleHash.__table__.c.content_hash)
+    )
+    return set((await db.execute(stmt)).scalars().all())
+
+
+def load_near_duplicate_index(manifest: Optional[Dict[str, Any]]) -> LSHIndex:
+    """LSH index over the inputs of a dataset's examples, keyed by content hash"""
+    index = new_index()
+    for example in iter_examples(manifest) if manifest else ():
+        index.add(content_hash(example["input"], example["output"]), near_duplicates.signature(example["input"]))
+    return index
+
+
+async def build_increment(
+    db: AsyncSession,
+    dataset: TrainingDataset,
+    chunk_rows: int = settings.DATASET_BUILD_CHUNK_ROWS,
+    near_duplicate_index: Optional[LSHIndex] = None,
+    after: Optional[str] = None
+) -> Tuple[int, Optional[str]]:
+    """Process one chunk past ``after`` (default: the watermark).
+
+    Returns the feedback rows read and the cursor of the last one, to
+    pass as ``after`` for the next chunk; the stored watermark never moves
+    backwards. ``near_duplicate_index`` (see ``load_near_duplicate_index``)
+    is only used when the dataset has a ``near_duplicate_threshold``, and
+    gains the chunk's new examples.
+    """
+    # Re-read under a row lock: concurrent builds of one dataset take turns
+    # per chunk, each appending to the other's manifest, so they never
+    # write the same chunk names; rows both read are deduped on content hash
+    dataset = await db.scalar(
+        select(TrainingDataset)
+        .where(TrainingDataset.id == dataset.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    state = dict(dataset.build_state)
+
+    query = (
+        select(Feedback, AgentExecution)
+        .join(AgentExecution, AgentExecution.id == Feedback.execution_id)
+        .where(
+            Feedback.agent_id == state["agent_id"],
+            or_(Feedback.correction.isnot(None), Feedback.rating >= state["min_rating"])
+        )
+        .order_by(Feedback.created_at, Feedback.id)
+        .limit(chunk_rows)
+    )
+    after = after or state["watermark"]
+    if after:
+        created_at, feedback_id = decode_cursor(after)
+        query = query.where(tuple_(Feedback.created_at, Feedback.id) > tuple_(created_at, feedback_id))
+
+    pairs = (await db.execute(query)).all()
+    if not pairs:
+        await db.commit()
+        return 0, after
+
+    examples: Dict[str, Dict[str, Any]] = {}
+    for feedback, execution in pairs:
+        example = build_example(execution, feedback)
+        examples.setdefault(content_hash(example["input"], example["output"]), example)
+
+    near_duplicates_skipped = 0
+    threshold = state.get("near_duplicate_threshold")
+    if threshold and near_duplicate_index is not None:
+        def drop_near_duplicates() -> Dict[str, Dict[str, Any]]:
+            return {
+                digest: example for digest, example in examples.items()
+                if near_duplicate_index.add_unless_duplicate(
+                    digest, near_duplicates.signature(example["input"]), threshold
+                ) in (None, digest)
+            }
+
+        kept = await asyncio.to_thread(drop_near_duplicates)
+        near_duplicates_skipped = len(examples) - len(kept)
+        examples = kept
+
+    new_hashes = await _claim_new_hashes(db, dataset.id, list(examples))
+    fresh = [(h, examples[h]) for h in examples if h in new_hashes]
+
+    def append() -> Dict[str, Any]:
+        writer = DatasetWriter(dataset.id, manifest=dataset.manifest, chunk_rows=chunk_rows)
+        for digest, example in fresh:
+            writer.add(example, content_hash=digest)
+        return writer.close()
+
+    manifest = await asyncio.to_thread(append) if fresh else dataset.manifest
+
+    set_hash = SetHash.from_hexdigest(state["set_hash"])
+    set_hash.update(h for h, _ in fresh)
+
+    last_feedback = pairs[-1][0]
+    position = encode_cursor(last_feedback.created_at, last_feedback.id)
+    if not state["watermark"] or decode_cursor(position) > decode_cursor(state["watermark"]):
+        state["watermark"] = position
+    state["set_hash"] = set_hash.hexdigest()
+    state["rows_scanned"] += len(pairs)
+    state["duplicates_skipped"] += len(pairs) - len(fresh) - near_duplicates_skipped
+    state["near_duplicates_skipped"] = state.get("near_duplicates_skipped", 0) + near_duplicates_skipped
+
+    dataset.build_state = state
+    dataset.manifest = manifest
+    dataset.example_count = manifest["total_rows"] if manifest else 0
+    if state.get("model_version_id"):
+        model_version = await db.get(ModelVersion, state["model_version_id"])
+        if model_version:
+            model_version.training_data_hash = state["set_hash"]
+
+    await db.commit()
+    return len(pairs), position
+
+
+async def build_dataset(
+    dataset_id: str,
+    chunk_rows: int = settings.DATASET_BUILD_CHUNK_ROWS,
+    overlap_seconds: float = settings.DATASET_BUILD_OVERLAP_SECONDS
+) -> Dict[str, Any]:
+    """Run chunks until the dataset has caught up with its agent's feedback"""
+    async with AsyncSessionLocal() as db:
+        dataset = await db.get(TrainingDataset, dataset_id)
+        if dataset is None or not dataset.build_state:
+            raise ValueError(f"Dataset {dataset_id} has no builder configuration")
+
+        index = None
+        if dataset.build_state.get("near_duplicate_threshold"):
+            index = await asyncio.to_thread(load_near_duplicate_index, dataset.manifest)
+
+        position = None
+        if dataset.build_state["watermark"]:
+            created_at, _ = decode_cursor(dataset.build_state["watermark"])
+            position = encode_cursor(created_at - timedelta(seconds=overlap_seconds), "")
+
+        while True:
+            rows, position = await build_increment(db, dataset, chunk_rows, index, position)
+            if rows < chunk_rows:
+                break
+            logger.info(f"Dataset {dataset_id}: {dataset.example_count} examples so far")
+
+        logger.info(
+            f"Dataset {dataset_id} up to date: {dataset.example_count} examples, "
+            f"{dataset.build_state['duplicates_skipped']} duplicates and "
+            f"{dataset.build_state.get('near_duplicates_skipped', 0)} near-duplicates skipped"
+        )
+        return dataset.build_state
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build_dataset(sys.argv[1]))
@@ -0,0 +1,176 @@
+"""
+Out-of-row storage for TrainingDataset contents.
+
+Examples are written to Parquet chunk files under
+``{UPLOAD_DIR}/datasets/{dataset_id}/``; the database row only keeps a
+manifest listing the chunks and their row counts. Readers use the manifest
+to open just the chunks a page touches, and the Parquet footer to read
+just the row groups (DATASET_ROW_GROUP_ROWS rows each) it touches within
+them: chunks are zstd-compressed per row group, so a page decompresses a
+few groups rather than whole chunks, and a dataset costs the same to page
+through at any size.
+
+Each example is stored as one JSON-encoded ``example`` column alongside
+its ``content_hash``; examples have no fixed schema, so a wider columnar
+layout would have to be inferred per dataset.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+
+MANIFEST_VERSION = 1
+CHUNK_PREFIX = "part-"
+
+
+def dataset_dir(dataset_id: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "datasets", dataset_id)
+
+
+def example_hash(example: Dict[str, Any]) -> str:
+    """Stable content hash of an example (key order and whitespace insensitive)"""
+    canonical = json.dumps(example, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def empty_manifest() -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "format": "parquet", "total_rows": 0, "chunks": []}
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([("example", pa.string()), ("content_hash", pa.string())])
+
+
+class DatasetWriter:
+    """Append examples to a dataset, cutting a new chunk every ``chunk_rows``.
+
+    Starting from an existing manifest appends new chunks after the old
+    ones; existing chunk files are never rewritten. The manifest is copied,
+    so assigning ``close()``'s result back to a model attribute is a change
+    SQLAlchemy saves rather than the same (mutated) object.
+    """
+
+    def __init__(
+        self,
+        dataset_id: str,
+        manifest: Optional[Dict[str, Any]] = None,
+        chunk_rows: int = settings.DATASET_CHUNK_ROWS,
+        row_group_rows: int = settings.DATASET_ROW_GROUP_ROWS
+    ):
+        self.dataset_id = dataset_id
+        self.manifest = copy.deepcopy(manifest) if manifest else empty_manifest()
+        self.chunk_rows = chunk_rows
+        self.row_group_rows = row_group_rows
+        self._pending: List[Dict[str, Any]] = []
+        os.makedirs(dataset_dir(dataset_id), exist_ok=True)
+
+    def add(self, example: Dict[str, Any], content_hash: Optional[str] = None) -> None:
+        self._pending.append({
+            "example": json.dumps(example, default=str),
+            "content_hash": content_hash or example_hash(example),
+        })
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, examples: Iterable[Dict[str, Any]]) -> None:
+        for example in examples:
+            self.add(example)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        index = len(self.manifest["chunks"])
+        relative = os.path.join("datasets", self.dataset_id, f"{CHUNK_PREFIX}{index:05d}.parquet")
+        path = os.path.join(settings.UPLOAD_DIR, relative)
+        table = pa.Table.from_pylist(self._pending, schema=_schema())
+        pq.write_table(table, path, compression="zstd", row_group_size=self.row_group_rows)
+
+        self.manifest["chunks"].append({
+            "path": relative,
+            "rows": len(self._pending),
+            "bytes": os.path.getsize(path),
+        })
+        self.manifest["total_rows"] += len(self._pending)
+        self._pending = []
+
+    def close(self) -> Dict[str, Any]:
+        self.flush()
+        return self.manifest
+
+
+def _chunk_path(chunk: Dict[str, Any]) -> str:
+    return os.path.join(settings.UPLOAD_DIR, chunk["path"])
+
+
+def open_chunk(chunk: Dict[str, Any]):
+    """Memory-mapped pyarrow ParquetFile for one chunk (reads only the footer)"""
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(_chunk_path(chunk), memory_map=True)
+
+
+def _read_rows(chunk: Dict[str, Any], column: str, offset: int, limit: int) -> List[Any]:
+    """``column`` values of a chunk's rows [offset, offset + limit), decoding
+    only the row groups they fall in"""
+    parquet = open_chunk(chunk)
+    groups = []
+    first_row = None
+    start = 0
+    for index in range(parquet.num_row_groups):
+        end = start + parquet.metadata.row_group(index).num_rows
+        if end > offset and start < offset + limit:
+            groups.append(index)
+            first_row = start if first_row is None else first_row
+        start = end
+    if not groups:
+        return []
+    values = parquet.read_row_groups(groups, columns=[column]).column(column)
+    return values.slice(offset - first_row, limit).to_pylist()
+
+
+def read_page(manifest: Dict[str, Any], offset: int, limit: int) -> List[Dict[str, Any]]:
+    """Examples [offset, offset + limit), reading only the row groups that hold them"""
+    examples: List[Dict[str, Any]] = []
+    start = 0
+    for chunk in manifest["chunks"]:
+        end = start + chunk["rows"]
+        if end > offset and len(examples) < limit:
+            local_offset = max(offset - start, 0)
+            take = min(limit - len(examples), chunk["rows"] - local_offset)
+            examples.extend(json.loads(value) for value in _read_rows(chunk, "example", local_offset, take))
+        if len(examples) >= limit:
+            break
+        start = end
+    return examples
+
+
+def _iter_column(manifest: Dict[str, Any], column: str) -> Iterator[Any]:
+    # One row group resident at a time
+    for chunk in manifest["chunks"]:
+        parquet = open_chunk(chunk)
+        for index in range(parquet.num_row_groups):
+            yield from parquet.read_row_group(index, columns=[column]).column(column).to_pylist()
+
+
+def iter_examples(manifest: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Stream every example"""
+    for value in _iter_column(manifest, "example"):
+        yield json.loads(value)
+
+
+def iter_hashes(manifest: Dict[str, Any]) -> Iterator[str]:
+    return _iter_column(manifest, "content_hash")
+
+
+def delete_dataset_files(dataset_id: str) -> None:
+    shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
@@ -0,0 +1,114 @@
+"""
+Execution ingestion helpers shared by the single and batch write paths.
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Set
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Agent, AgentExecution
+from services.metrics_service import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_COLUMNS = [
+    "id", "agent_id", "input_data", "output_data", "context", "success",
+    "execution_time_ms", "cost", "metadata", "created_at",
+]
+JSON_COLUMNS = {"input_data", "output_data", "context", "metadata"}
+COPY_STAGING_TABLE = "agent_executions_staging"
+
+
+def build_execution_row(agent_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an execution payload into a full agent_executions row"""
+    return {
+        "id": data.get("id") or str(uuid.uuid4()),
+        "agent_id": agent_id,
+        "input_data": data.get("input_data"),
+        "output_data": data.get("output_data"),
+        "context": data.get("context") or {},
+        "success": data.get("success"),
+        "execution_time_ms": data.get("execution_time_ms"),
+        "cost": data.get("cost"),
+        "metadata": data.get("metadata") or {},
+        "created_at": data.get("created_at") or datetime.now(timezone.utc),
+    }
+
+
+async def find_missing_agents(db: AsyncSession, agent_ids: Iterable[str]) -> Set[str]:
+    """Return the subset of agent_ids that do not exist, in one query"""
+    wanted = set(agent_ids)
+    if not wanted:
+        return set()
+    result = await db.execute(select(Agent.id).where(Agent.id.in_(wanted)))
+    return wanted - set(result.scalars().all())
+
+
+async def insert_execution_rows(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Write execution rows without a per-row round trip; returns the new ones.
+
+    Rows whose ``(id, created_at)`` already exists are skipped, so a client
+    re-sending a batch that committed but timed out gets no conflict and
+    nothing is counted twice. Large batches on Postgres go through COPY
+    into a staging table; everything else uses a multi-row
+    ``INSERT ... ON CONFLICT DO NOTHING`` (SQLAlchemy batches executemany
+    into VALUES lists). Rollup buckets are updated for the new rows in the
+    same transaction, which the caller owns.
+    """
+    if not rows:
+        return []
+
+    if db.bind.dialect.name == "postgresql" and len(rows) >= settings.COPY_THRESHOLD_ROWS:
+        new_ids = await _copy_execution_rows(db, rows)
+    else:
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        table = AgentExecution.__table__
+        result = await db.execute(dialect.insert(table).on_conflict_do_nothing().returning(table.c.id), rows)
+        new_ids = set(result.scalars().all())
+
+    inserted = []
+    for row in rows:
+        if row["id"] in new_ids:
+            new_ids.discard(row["id"])
+            inserted.append(row)
+    await apply_rollups(db, inserted)
+    return inserted
+
+
+async def _copy_execution_rows(db: AsyncSession, rows: List[Dict[str, Any]]) -> Set[str]:
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    records = [
+        tuple(
+            json.dumps(row[col]) if col in JSON_COLUMNS and row[col] is not None else row[col]
+            for col in EXECUTION_COLUMNS
+        )
+        for row in rows
+    ]
+    # COPY cannot skip conflicts, so copy into a per-transaction staging
+    # table and move the rows over with ON CONFLICT DO NOTHING
+    columns = ", ".join(f'"{col}"' for col in EXECUTION_COLUMNS)
+    await conn.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {COPY_STAGING_TABLE} "
+        f"(LIKE {AgentExecution.__tablename__} INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    await conn.execute(text(f"TRUNCATE {COPY_STAGING_TABLE}"))
+    await raw.driver_connection.copy_records_to_table(
+        COPY_STAGING_TABLE,
+        records=records,
+        columns=EXECUTION_COLUMNS,
+    )
+    result = await conn.execute(text(
+        f"INSERT INTO {AgentExecution.__tablename__} ({columns}) "
+        f"SELECT {columns} FROM {COPY_STAGING_TABLE} ON CONFLICT DO NOTHING RETURNING id"
+    ))
+    new_ids = set(result.scalars().all())
+    logger.debug(f"Copied {len(records)} executions, {len(new_ids)} new")
+    return new_ids
@@ -0,0 +1,128 @@
+"""
+Streaming export of executions joined with their feedback.
+
+Rows are read through a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) and emitted batch by batch, so memory stays bounded by
+EXPORT_BATCH_SIZE no matter how many rows the export covers.
+"""
+
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select
+
+from config import settings
+from database import AsyncSessionLocal
+from models import AgentExecution, Feedback
+
+EXECUTION_FIELDS = [
+    "id", "agent_id", "input_data", "output_data", "context", "success",
+    "execution_time_ms", "cost", "created_at",
+]
+FEEDBACK_FIELDS = [
+    "id", "type", "rating", "correction", "comment", "binary_feedback",
+    "reviewer_id", "created_at",
+]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+def export_row(execution: AgentExecution, feedback: Optional[Feedback]) -> Dict[str, Any]:
+    row = {field: _plain(getattr(execution, field)) for field in EXECUTION_FIELDS}
+    row["feedback"] = (
+        {field: _plain(getattr(feedback, field)) for field in FEEDBACK_FIELDS}
+        if feedback is not None else None
+    )
+    return row
+
+
+async def iter_export_batches(
+    agent_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = settings.EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield lists of export rows, oldest first, from a server-side cursor"""
+    query = (
+        select(AgentExecution, Feedback)
+        .outerjoin(Feedback, Feedback.execution_id == AgentExecution.id)
+        .where(AgentExecution.agent_id == agent_id)
+        .order_by(AgentExecution.created_at, AgentExecution.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if since:
+        query = query.where(AgentExecution.created_at >= since)
+    if until:
+        query = query.where(AgentExecution.created_at < until)
+
+    # Own session: the stream outlives the request handler's dependency
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield [export_row(execution, feedback) for execution, feedback in partition]
+            # Drop the ORM objects of the batch just sent
+            db.expunge_all()
+
+
+async def stream_ndjson(agent_id: str, **kwargs) -> AsyncIterator[bytes]:
+    async for batch in iter_export_batches(agent_id, **kwargs):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch).encode()
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("agent_id", pa.string()),
+        ("input_data", pa.string()),
+        ("output_data", pa.string()),
+        ("context", pa.string()),
+        ("success", pa.bool_()),
+        ("execution_time_ms", pa.int64()),
+        ("cost", pa.float64()),
+        ("created_at", pa.string()),
+        ("feedback", pa.string()),
+    ])
+
+
+async def stream_arrow(agent_id: str, **kwargs) -> AsyncIterator[bytes]:
+    """Arrow IPC stream; JSON payload columns are carried as strings"""
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    json_columns = {"input_data", "output_data", "context", "feedback"}
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    yield drain()
+    async for batch in iter_export_batches(agent_id, **kwargs):
+        columns = {
+            name: [
+                json.dumps(row[name], default=str) if name in json_columns and row[name] is not None
+                else row[name]
+                for row in batch
+            ]
+            for name in schema.names
+        }
+        writer.write_batch(pa.record_batch(
+            [pa.array(columns[name], type=schema.field(name).type) for name in schema.names],
+            schema=schema
+        ))
+        yield drain()
+    writer.close()
+    yield drain()
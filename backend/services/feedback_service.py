@@ -0,0 +1,89 @@
+"""
+Bulk feedback writes.
+
+Relies on the unique constraint on ``feedback.execution_id``: rows are
+written with ``INSERT ... ON CONFLICT (execution_id)`` statements of up to
+FEEDBACK_ROWS_PER_STATEMENT rows instead of a check-then-insert round trip
+per item.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import literal_column, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AgentExecution, Feedback
+
+# Keeps one INSERT's bind parameters well under Postgres' 32767 limit
+FEEDBACK_ROWS_PER_STATEMENT = 2000
+
+FEEDBACK_UPDATE_COLUMNS = [
+    "type", "rating", "correction", "comment", "binary_feedback", "reviewer_id", "metadata",
+]
+
+
+async def resolve_executions(db: AsyncSession, execution_ids: Iterable[str]) -> Dict[str, str]:
+    """Map execution id -> agent id for the ids that exist, in one query"""
+    wanted = set(execution_ids)
+    if not wanted:
+        return {}
+    result = await db.execute(
+        select(AgentExecution.id, AgentExecution.agent_id).where(AgentExecution.id.in_(wanted))
+    )
+    return dict(result.all())
+
+
+async def upsert_feedback_rows(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    update_existing: bool = False
+) -> Dict[str, Tuple[str, bool]]:
+    """Write feedback rows keyed on execution_id (caller commits).
+
+    Returns ``{execution_id: (feedback_id, inserted)}`` for every row that
+    was written. With ``update_existing`` False, rows whose execution
+    already has feedback are skipped and are absent from the result.
+    """
+    if not rows:
+        return {}
+
+    for row in rows:
+        row.setdefault("id", str(uuid.uuid4()))
+
+    written: Dict[str, Tuple[str, bool]] = {}
+    for i in range(0, len(rows), FEEDBACK_ROWS_PER_STATEMENT):
+        written.update(await _upsert_chunk(db, rows[i:i + FEEDBACK_ROWS_PER_STATEMENT], update_existing))
+    return written
+
+
+async def _upsert_chunk(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    update_existing: bool
+) -> Dict[str, Tuple[str, bool]]:
+    is_postgres = db.bind.dialect.name == "postgresql"
+    dialect = postgresql if is_postgres else sqlite
+    table = Feedback.__table__
+    stmt = dialect.insert(table).values(rows)
+    if update_existing:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.execution_id],
+            set_={column: stmt.excluded[column] for column in FEEDBACK_UPDATE_COLUMNS}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.execution_id])
+
+    if is_postgres or not update_existing:
+        # xmax = 0 distinguishes fresh inserts from conflict updates on Postgres
+        inserted = literal_column("xmax = 0") if update_existing else true()
+        result = await db.execute(stmt.returning(table.c.execution_id, table.c.id, inserted))
+        return {execution_id: (feedback_id, bool(was_inserted)) for execution_id, feedback_id, was_inserted in result}
+
+    # SQLite has no xmax: look up which executions already had feedback
+    existing = set((await db.execute(
+        select(table.c.execution_id).where(table.c.execution_id.in_([row["execution_id"] for row in rows]))
+    )).scalars().all())
+    result = await db.execute(stmt.returning(table.c.execution_id, table.c.id))
+    return {execution_id: (feedback_id, execution_id not in existing) for execution_id, feedback_id in result}
@@ -0,0 +1,586 @@
+"""
+Fine-tuning job scheduler.
+
+Each scheduler process claims PENDING jobs and runs them with the
+configured trainer (services.trainers) in its own process pool,
+FINE_TUNING_WORKER_PROCESSES at a time. Any number of schedulers can run
+side by side:
+
+- Claiming takes a transaction-scoped advisory lock, counts RUNNING jobs
+  globally and per organization, and picks the highest-priority pending
+  jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` that still fit
+  FINE_TUNING_MAX_RUNNING_JOBS and FINE_TUNING_MAX_RUNNING_JOBS_PER_ORG
+  (utils.scheduling.admit). The lock keeps the counts exact across
+  schedulers; SKIP LOCKED steps over rows a cancel request is holding.
+- Idle schedulers wait on Postgres ``LISTEN fine_tuning_jobs``. Creating,
+  cancelling and finishing a job NOTIFY the channel, so queued work starts
+  as soon as a slot frees; FINE_TUNING_IDLE_POLL_SECONDS is only a
+  fallback for missed notifications.
+- Trainers report intermediate metrics through a manager queue. Every
+  FINE_TUNING_HEARTBEAT_SECONDS the scheduler writes the latest metrics
+  with a heartbeat for each job it runs and tells the trainers of jobs
+  cancelled meanwhile to stop. RUNNING jobs whose heartbeat is older than
+  FINE_TUNING_HEARTBEAT_TIMEOUT_SECONDS (their scheduler died) go back to
+  the queue, or fail after FINE_TUNING_MAX_ATTEMPTS.
+- A heartbeat only proves the scheduler is alive, so a job whose trainer
+  has not reported for FINE_TUNING_REPORT_TIMEOUT_SECONDS (hung, or stuck
+  in one huge step) is failed and told to stop. Its pool worker stays
+  busy, and its slot taken, until the trainer returns.
+
+A completed job gets a new ModelVersion for its agent. Trials of a
+hyperparameter sweep are judged at the sweep's rung milestones as they
+report, and the sweep is finished with its last trial (services.sweeps).
+
+    python -m services.fine_tuning_scheduler
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import JSON, bindparam, func, or_, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Agent, FineTuningJob, FineTuningStatus, FineTuningSweep, ModelVersion, TrainingDataset
+from services.sweeps import finish_sweep, lock_sweeps, record_rung, sweep_payload
+from services.trainers import run_trainer
+from utils.scheduling import admit
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "fine_tuning_jobs"
+# pg_advisory_xact_lock key serializing admission across schedulers
+ADMISSION_LOCK_KEY = 0x66745F6A6F6273
+# Pending rows locked per free slot, so capped organizations can be skipped
+CANDIDATES_PER_SLOT = 4
+HISTORY_LIMIT = 200
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def notify_jobs_changed(db: AsyncSession) -> None:
+    """NOTIFY idle schedulers once ``db`` commits (no-op without Postgres)"""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_notify(CHANNEL, "")))
+
+
+def job_payload(job: FineTuningJob) -> Dict[str, Any]:
+    """What a trainer gets to see of its job"""
+    return {
+        "id": job.id,
+        "agent_id": job.agent_id,
+        "name": job.name,
+        "training_dataset_id": job.training_dataset_id,
+        "base_model_version_id": job.base_model_version_id,
+        "hyperparameters": job.hyperparameters or {},
+        "attempt": job.attempts,
+        "sweep_id": job.sweep_id,
+    }
+
+
+async def claim_jobs(
+    db: AsyncSession,
+    worker_id: str,
+    limit: int,
+    max_running: int = settings.FINE_TUNING_MAX_RUNNING_JOBS,
+    max_per_org: int = settings.FINE_TUNING_MAX_RUNNING_JOBS_PER_ORG
+) -> List[FineTuningJob]:
+    """Mark up to ``limit`` pending jobs RUNNING for ``worker_id``, within
+    the global and per-organization caps. The caller commits."""
+    if limit <= 0:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(ADMISSION_LOCK_KEY)))
+
+    running = dict((await db.execute(
+        select(Agent.organization_id, func.count())
+        .select_from(FineTuningJob)
+        .outerjoin(Agent, Agent.id == FineTuningJob.agent_id)
+        .where(FineTuningJob.status == FineTuningStatus.RUNNING)
+        .group_by(Agent.organization_id)
+    )).all())
+    free = min(limit, max_running - sum(running.values()))
+    if free <= 0:
+        return []
+
+    query = (
+        select(FineTuningJob.id, Agent.organization_id)
+        .outerjoin(Agent, Agent.id == FineTuningJob.agent_id)
+        .where(FineTuningJob.status == FineTuningStatus.PENDING)
+        .order_by(FineTuningJob.priority.desc(), FineTuningJob.created_at, FineTuningJob.id)
+        .limit(free * CANDIDATES_PER_SLOT)
+        .with_for_update(of=FineTuningJob, skip_locked=True)
+    )
+    full = [org for org, count in running.items() if org is not None and count >= max_per_org]
+    if full:
+        query = query.where(or_(Agent.organization_id.is_(None), Agent.organization_id.notin_(full)))
+    candidates = [(job_id, org) for job_id, org in (await db.execute(query)).all()]
+    job_ids = admit(candidates, running, free, max_per_org)
+    if not job_ids:
+        return []
+
+    now = _now()
+    await db.execute(
+        update(FineTuningJob)
+        .where(FineTuningJob.id.in_(job_ids))
+        .values(
+            status=FineTuningStatus.RUNNING,
+            worker_id=worker_id,
+            heartbeat_at=now,
+            started_at=now,
+            completed_at=None,
+            error_message=None,
+            attempts=FineTuningJob.attempts + 1,
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    jobs = (await db.execute(select(FineTuningJob).where(FineTuningJob.id.in_(job_ids)))).scalars().all()
+    position = {job_id: i for i, job_id in enumerate(job_ids)}
+    return sorted(jobs, key=lambda job: position[job.id])
+
+
+async def requeue_stale_jobs(
+    db: AsyncSession,
+    timeout_seconds: float = settings.FINE_TUNING_HEARTBEAT_TIMEOUT_SECONDS,
+    max_attempts: int = settings.FINE_TUNING_MAX_ATTEMPTS
+) -> int:
+    """Requeue RUNNING jobs whose scheduler stopped heartbeating (failing
+    those out of attempts); returns how many went back to the queue"""
+    now = _now()
+    stale = (FineTuningJob.status == FineTuningStatus.RUNNING) & (
+        FineTuningJob.heartbeat_at < now - timedelta(seconds=timeout_seconds)
+    )
+    # Sweeps are locked before their jobs (see services.sweeps); a trial
+    # of a sweep that went stale after this read waits for the next pass
+    sweep_ids = set((await db.execute(
+        select(FineTuningJob.sweep_id).where(stale, FineTuningJob.sweep_id.isnot(None)).distinct()
+    )).scalars())
+    await lock_sweeps(db, sweep_ids)
+    in_locked_sweep = FineTuningJob.sweep_id.is_(None) | FineTuningJob.sweep_id.in_(sweep_ids)
+    failed = await db.execute(
+        update(FineTuningJob)
+        .where(stale, in_locked_sweep, FineTuningJob.attempts >= max_attempts)
+        .values(
+            status=FineTuningStatus.FAILED,
+            completed_at=now,
+            updated_at=now,
+            error_message=f"Scheduler heartbeat lost on all {max_attempts} attempts",
+        )
+        .returning(FineTuningJob.sweep_id)
+        .execution_options(synchronize_session=False)
+    )
+    for sweep_id in {sweep_id for sweep_id, in failed.all() if sweep_id}:
+        await finish_sweep(db, sweep_id)
+    result = await db.execute(
+        update(FineTuningJob)
+        .where(stale, in_locked_sweep)
+        .values(status=FineTuningStatus.PENDING, worker_id=None, heartbeat_at=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+class FineTuningScheduler:
+    def __init__(
+        self,
+        processes: int = settings.FINE_TUNING_WORKER_PROCESSES,
+        trainer_path: str = settings.FINE_TUNING_TRAINER,
+        heartbeat_seconds: float = settings.FINE_TUNING_HEARTBEAT_SECONDS,
+        idle_poll_seconds: float = settings.FINE_TUNING_IDLE_POLL_SECONDS,
+        report_timeout_seconds: float = settings.FINE_TUNING_REPORT_TIMEOUT_SECONDS,
+    ):
+        self.processes = processes
+        self.trainer_path = trainer_path
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_poll_seconds = idle_poll_seconds
+        self.report_timeout_seconds = report_timeout_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._active: Dict[str, asyncio.Task] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._sweep_tasks: Set[asyncio.Task] = set()
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        # job id -> monotonic time of its trainer's last report (or start)
+        self._last_report: Dict[str, float] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._events = None
+        self._stop_flags = None
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+    # -- trainer reports -------------------------------------------------
+
+    def _pump_events(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Thread: forward trainer reports from the manager queue to the loop"""
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            loop.call_soon_threadsafe(self._on_report, *item)
+
+    def _on_report(self, job_id: str, step: int, metrics: Dict[str, Any]) -> None:
+        if job_id not in self._active:
+            return
+        if job_id in self._last_report:
+            self._last_report[job_id] = time.monotonic()
+        progress = self._progress.setdefault(job_id, {"history": []})
+        history = progress["history"]
+        history.append({"step": step, **metrics})
+        del history[:-HISTORY_LIMIT]
+        progress.update(metrics, step=step)
+
+        sweep = self._jobs[job_id].get("sweep")
+        if sweep and step in sweep["milestones"] and isinstance(metrics.get(sweep["objective"]), (int, float)):
+            task = asyncio.create_task(self._judge(job_id, sweep["id"], step, float(metrics[sweep["objective"]])))
+            self._sweep_tasks.add(task)
+            task.add_done_callback(self._sweep_tasks.discard)
+
+    async def _judge(self, job_id: str, sweep_id: str, step: int, value: float) -> None:
+        """Record a sweep trial at a rung and stop it if it falls behind"""
+        try:
+            async with AsyncSessionLocal() as db:
+                keep = await record_rung(db, sweep_id, job_id, step, value)
+                if not keep:
+                    await notify_jobs_changed(db)
+                await db.commit()
+        except Exception as e:
+            # The trial simply runs on; later rungs get another chance
+            logger.error(f"Recording rung {step} of sweep trial {job_id} failed: {e}")
+            return
+        if not keep:
+            logger.info(f"Sweep {sweep_id} stopped trial {job_id} at step {step}")
+            if job_id in self._active:
+                self._request_stop(job_id)
+
+    def _request_stop(self, job_id: str) -> None:
+        self._stop_flags[job_id] = True
+
+    # -- job lifecycle ---------------------------------------------------
+
+    async def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            jobs = await claim_jobs(db, self.worker_id, limit)
+            payloads = [job_payload(job) for job in jobs]
+            sweep_ids = {job.sweep_id for job in jobs if job.sweep_id}
+            if sweep_ids:
+                sweeps = (await db.execute(
+                    select(FineTuningSweep).where(FineTuningSweep.id.in_(sweep_ids))
+                )).scalars().all()
+                by_id = {sweep.id: sweep_payload(sweep) for sweep in sweeps}
+                for payload in payloads:
+                    payload["sweep"] = by_id.get(payload["sweep_id"])
+                # The claimed jobs are already locked, so waiting on a sweep
+                # here would invert the sweep-then-job lock order; a sweep
+                # that is busy is marked RUNNING by record_rung instead
+                started = (await db.execute(
+                    select(FineTuningSweep.id)
+                    .where(FineTuningSweep.id.in_(sweep_ids), FineTuningSweep.status == FineTuningStatus.PENDING)
+                    .with_for_update(skip_locked=True)
+                )).scalars().all()
+                if started:
+                    await db.execute(
+                        update(FineTuningSweep)
+                        .where(FineTuningSweep.id.in_(started))
+                        .values(status=FineTuningStatus.RUNNING, updated_at=_now())
+                        .execution_options(synchronize_session=False)
+                    )
+            await db.commit()
+        return payloads
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            outcome = await loop.run_in_executor(
+                pool, run_trainer, self.trainer_path, job, self._events, self._stop_flags
+            )
+        except BrokenProcessPool as e:
+            # A trainer took its worker process down; later jobs get a new pool
+            if self._pool is pool:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            outcome = {"error": f"Trainer process died: {e}", "history": [], "stopped": False}
+        except Exception as e:
+            outcome = {"error": f"{type(e).__name__}: {e}", "history": [], "stopped": False}
+
+        try:
+            await self._finish(job, outcome)
+        except Exception as e:
+            # The heartbeat timeout requeues the job if this never lands
+            logger.error(f"Failed to record the outcome of fine-tuning job {job['id']}: {e}")
+        finally:
+            self._active.pop(job["id"], None)
+            self._jobs.pop(job["id"], None)
+            self._progress.pop(job["id"], None)
+            self._last_report.pop(job["id"], None)
+            self._stop_flags.pop(job["id"], None)
+            self._wake.set()
+
+    async def _finish(self, job: Dict[str, Any], outcome: Dict[str, Any]) -> None:
+        async with AsyncSessionLocal() as db:
+            db_job = (await db.execute(
+                select(FineTuningJob).where(FineTuningJob.id == job["id"]).with_for_update()
+            )).scalar_one_or_none()
+            if db_job is None or db_job.worker_id != self.worker_id:
+                # Reaped and handed to another scheduler meanwhile
+                return
+
+            now = _now()
+            result = outcome.get("result") or {}
+            history = outcome["history"][-HISTORY_LIMIT:]
+            latest = history[-1] if history else {}
+            db_job.metrics = {**latest, **(result.get("metrics") or {}), "history": history}
+            db_job.heartbeat_at = now
+            db_job.updated_at = now
+            # A job cancelled while running keeps its metrics but gets no model
+            if db_job.status == FineTuningStatus.RUNNING:
+                db_job.completed_at = now
+                if "error" in outcome:
+                    db_job.status = FineTuningStatus.FAILED
+                    db_job.error_message = outcome["error"]
+                    logger.warning(f"Fine-tuning job {db_job.id} failed: {outcome['error']}")
+                else:
+                    model_version = await self._register_model(db, db_job, result)
+                    db_job.new_model_version_id = model_version.id
+                    db_job.status = FineTuningStatus.COMPLETED
+                    logger.info(f"Fine-tuning job {db_job.id} completed as model version {model_version.version}")
+                await notify_jobs_changed(db)
+            await db.commit()
+
+        if job.get("sweep_id"):
+            async with AsyncSessionLocal() as db:
+                await finish_sweep(db, job["sweep_id"])
+                await db.commit()
+
+    async def _register_model(self, db: AsyncSession, job: FineTuningJob, result: Dict[str, Any]) -> ModelVersion:
+        base_version = None
+        if job.base_model_version_id:
+            base_version = await db.scalar(
+                select(ModelVersion.version).where(ModelVersion.id == job.base_model_version_id)
+            )
+        build_state = None
+        if job.training_dataset_id:
+            build_state = await db.scalar(
+                select(TrainingDataset.build_state).where(TrainingDataset.id == job.training_dataset_id)
+            )
+        model_version = ModelVersion(
+            id=str(uuid.uuid4()),
+            agent_id=job.agent_id,
+            # Semver build metadata ties the version to its base and job
+            version=f"{base_version or '0.0.0'}+ft.{job.id[:8]}",
+            model_path=result.get("model_path"),
+            performance_metrics=result.get("metrics") or {},
+            training_data_hash=(build_state or {}).get("set_hash"),
+            is_production=False,
+        )
+        db.add(model_version)
+        await db.flush()
+        return model_version
+
+    async def _release_active(self) -> None:
+        """On shutdown: hand running jobs back to the queue and stop their trainers"""
+        job_ids = list(self._active)
+        if not job_ids:
+            return
+        for job_id in job_ids:
+            self._request_stop(job_id)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(FineTuningJob)
+                    .where(
+                        FineTuningJob.id.in_(job_ids),
+                        FineTuningJob.worker_id == self.worker_id,
+                        FineTuningJob.status == FineTuningStatus.RUNNING,
+                    )
+                    .values(status=FineTuningStatus.PENDING, worker_id=None, heartbeat_at=None, updated_at=_now())
+                    .execution_options(synchronize_session=False)
+                )
+                await notify_jobs_changed(db)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to release fine-tuning jobs, the heartbeat timeout will requeue them: {e}")
+        await asyncio.gather(*self._active.values(), return_exceptions=True)
+
+    # -- background loops ------------------------------------------------
+
+    def _silent_jobs(self) -> List[str]:
+        """Running jobs whose trainer is past the report timeout"""
+        if self.report_timeout_seconds <= 0:
+            return []
+        cutoff = time.monotonic() - self.report_timeout_seconds
+        return [job_id for job_id, at in self._last_report.items() if at < cutoff]
+
+    async def _fail_silent(self, db: AsyncSession, job_ids: List[str]) -> None:
+        """Fail jobs whose trainer stopped reporting and ask it to stop"""
+        sweep_ids = {self._jobs[job_id]["sweep_id"] for job_id in job_ids if self._jobs[job_id].get("sweep_id")}
+        await lock_sweeps(db, sweep_ids)
+        now = _now()
+        await db.execute(
+            update(FineTuningJob)
+            .where(
+                FineTuningJob.id.in_(job_ids),
+                FineTuningJob.worker_id == self.worker_id,
+                FineTuningJob.status == FineTuningStatus.RUNNING,
+            )
+            .values(
+                status=FineTuningStatus.FAILED,
+                completed_at=now,
+                updated_at=now,
+                error_message=f"No trainer report for {self.report_timeout_seconds:.0f}s",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        for sweep_id in sweep_ids:
+            await finish_sweep(db, sweep_id)
+        await notify_jobs_changed(db)
+        for job_id in job_ids:
+            self._last_report.pop(job_id, None)
+            self._request_stop(job_id)
+        logger.warning(f"Failed fine-tuning jobs {', '.join(job_ids)}: trainer stopped reporting")
+
+    async def _heartbeat(self) -> None:
+        job_ids = list(self._active)
+        now = _now()
+        async with AsyncSessionLocal() as db:
+            silent = self._silent_jobs()
+            if silent:
+                # Before the heartbeat touches the jobs: sweeps lock first
+                await self._fail_silent(db, silent)
+            if job_ids:
+                table = FineTuningJob.__table__
+                await db.execute(
+                    update(table)
+                    .where(
+                        table.c.id == bindparam("b_id"),
+                        table.c.worker_id == self.worker_id,
+                        table.c.status == FineTuningStatus.RUNNING,
+                    )
+                    .values(heartbeat_at=now, metrics=bindparam("b_metrics", type_=JSON)),
+                    [{"b_id": job_id, "b_metrics": self._progress.get(job_id, {})} for job_id in job_ids]
+                )
+                owned = set((await db.execute(
+                    select(FineTuningJob.id).where(
+                        FineTuningJob.id.in_(job_ids),
+                        FineTuningJob.worker_id == self.worker_id,
+                        FineTuningJob.status == FineTuningStatus.RUNNING,
+                    )
+                )).scalars())
+                for job_id in set(job_ids) - owned:
+                    self._request_stop(job_id)
+            requeued = await requeue_stale_jobs(db)
+            if requeued:
+                logger.warning(f"Requeued {requeued} fine-tuning jobs with a lost heartbeat")
+                await notify_jobs_changed(db)
+            await db.commit()
+        if requeued:
+            self._wake.set()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self._heartbeat()
+            except Exception as e:
+                logger.error(f"Fine-tuning heartbeat failed: {e}")
+
+    async def _listen(self) -> None:
+        url = make_url(settings.DATABASE_URL)
+        if not url.drivername.startswith("postgresql"):
+            return
+        import asyncpg
+
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        delay = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+                try:
+                    await conn.add_listener(CHANNEL, lambda *args: self._wake.set())
+                    delay = 1.0
+                    # Catch up on anything queued while not listening
+                    self._wake.set()
+                    while not conn.is_closed():
+                        await asyncio.sleep(self.heartbeat_seconds)
+                finally:
+                    await conn.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The idle poll keeps the queue moving until LISTEN is back
+                logger.warning(f"Fine-tuning LISTEN lost, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        self._stop_flags = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        pump = threading.Thread(target=self._pump_events, args=(loop,), daemon=True)
+        pump.start()
+        tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._heartbeat_loop())]
+        logger.info(f"Fine-tuning scheduler {self.worker_id} running {self.processes} jobs at a time")
+
+        try:
+            while not self._stopping:
+                self._wake.clear()
+                free = self.processes - len(self._active)
+                if free > 0:
+                    try:
+                        claimed = await self._claim(free)
+                    except Exception as e:
+                        logger.error(f"Claiming fine-tuning jobs failed: {e}")
+                        claimed = []
+                    for job in claimed:
+                        logger.info(f"Starting fine-tuning job {job['id']} (attempt {job['attempt']})")
+                        self._jobs[job["id"]] = job
+                        self._last_report[job["id"]] = time.monotonic()
+                        self._active[job["id"]] = asyncio.create_task(self._execute(job))
+                # Woken by a NOTIFY, a finished job, or the idle poll
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.idle_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._release_active()
+            self._events.put(None)
+            pump.join()
+            self._pool.shutdown()
+            self._manager.shutdown()
+
+
+async def main() -> None:
+    scheduler = FineTuningScheduler()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    await scheduler.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Write-behind buffer for agent executions.
+
+Executions are acknowledged as soon as they are queued; a background task
+writes them to ``agent_executions`` in micro-batches bounded by
+WRITE_BEHIND_BATCH_SIZE rows or WRITE_BEHIND_FLUSH_INTERVAL_MS, whichever
+comes first.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from database import AsyncSessionLocal
+from services.ab_stats import ab_stats
+from services.execution_service import insert_execution_rows
+from services.metrics_service import sketch_buffer
+from services.near_duplicates import near_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFullError(Exception):
+    """Raised when the buffer cannot accept a row within the enqueue timeout"""
+
+
+class ExecutionBuffer:
+    """Bounded in-process queue drained by a single flusher task"""
+
+    def __init__(
+        self,
+        max_pending: int = settings.WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = settings.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms: int = settings.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        enqueue_timeout_ms: int = settings.WRITE_BEHIND_ENQUEUE_TIMEOUT_MS,
+    ):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Execution write-behind buffer started")
+
+    async def submit(self, row: Dict[str, Any]) -> None:
+        """Queue a row; waits up to the enqueue timeout when the buffer is full"""
+        if not self.running or self._closing:
+            raise BufferFullError("Write-behind buffer is not accepting rows")
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                raise BufferFullError(f"{self.max_pending} executions pending")
+
+    async def stop(self) -> None:
+        """Stop accepting rows and flush everything already queued"""
+        if not self.running:
+            return
+        self._closing = True
+        await self._task
+        self._task = None
+        logger.info(f"Execution write-behind buffer drained ({self.flushed_rows} rows written)")
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+        except asyncio.TimeoutError:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closing:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while not (self._closing and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        # Rows were already acknowledged to clients, so retry with backoff
+        # before giving up on the batch.
+        delay = 0.1
+        for attempt in range(1, settings.WRITE_BEHIND_MAX_RETRIES + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    inserted = await insert_execution_rows(db, batch)
+                    await db.commit()
+                ab_stats.record_executions(inserted)
+                sketch_buffer.record_executions(inserted)
+                near_duplicates.record_executions(inserted)
+                self.flushed_rows += len(batch)
+                return
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Failed to flush {len(batch)} executions (attempt {attempt}): {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        logger.error(
+            f"Dropping {len(batch)} executions after {settings.WRITE_BEHIND_MAX_RETRIES} attempts: "
+            f"{[row['id'] for row in batch]}"
+        )
+
+
+execution_buffer = ExecutionBuffer()
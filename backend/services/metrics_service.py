@@ -0,0 +1,414 @@
+"""
+Aggregate execution metrics computed in the database.
+
+Per-agent rollups are kept in ``execution_rollups`` at minute, hour and
+day granularity and are updated in the same transaction that writes the
+executions, so dashboards can read a handful of bucket rows instead of
+scanning ``agent_executions``. Hour and day buckets also carry mergeable
+quantile sketches of execution time and cost, so tail percentiles for any
+range come from merging a few hundred sketches.
+
+Sketches are not merged in the ingest transaction: that would hold a
+lock on the bucket row across a read-modify-write of two JSON sketches
+for every writer to the agent's current hour. Instead ``sketch_buffer``
+accumulates committed executions per bucket in memory and merges them
+into the rollup rows every METRICS_SKETCH_FLUSH_SECONDS, so each worker
+locks a bucket once per interval. Quantiles lag by up to that interval,
+and a worker that dies loses its unflushed sketch values (counts and
+averages are unaffected).
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, bindparam, cast, delete, func, literal, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import AgentExecution, ExecutionRollup, RollupGranularity
+from utils.quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[str, RollupGranularity, datetime]
+
+SKETCH_GRANULARITIES = (RollupGranularity.HOUR, RollupGranularity.DAY)
+SKETCH_RELATIVE_ACCURACY = 0.01
+# Ranges longer than this merge day sketches instead of hour sketches
+HOURLY_SKETCH_MAX_RANGE = timedelta(days=7)
+
+
+def _utc(ts: datetime) -> datetime:
+    """Aware UTC timestamp; naive timestamps are taken to be UTC already"""
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def _non_negative(value: Optional[float]) -> Optional[float]:
+    return value if value is not None and value >= 0 else None
+
+
+def bucket_start(ts: datetime, granularity: RollupGranularity) -> datetime:
+    """Truncate a timestamp to the start of its UTC bucket"""
+    ts = _utc(ts).replace(second=0, microsecond=0)
+    if granularity in (RollupGranularity.HOUR, RollupGranularity.DAY):
+        ts = ts.replace(minute=0)
+    if granularity == RollupGranularity.DAY:
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def rollup_deltas(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold execution rows into one delta per (agent, granularity, bucket)"""
+    deltas: Dict[RollupKey, Dict[str, Any]] = defaultdict(lambda: {
+        "executions_count": 0,
+        "success_count": 0,
+        "total_execution_time_ms": 0,
+        "total_cost": 0.0,
+        "last_execution_at": None,
+    })
+    for row in rows:
+        # Rows may mix naive and aware timestamps, which do not compare
+        created_at = _utc(row["created_at"])
+        for granularity in RollupGranularity:
+            delta = deltas[(row["agent_id"], granularity, bucket_start(created_at, granularity))]
+            delta["executions_count"] += 1
+            delta["success_count"] += 1 if row.get("success") else 0
+            delta["total_execution_time_ms"] += row.get("execution_time_ms") or 0
+            delta["total_cost"] += row.get("cost") or 0.0
+            if delta["last_execution_at"] is None or created_at > delta["last_execution_at"]:
+                delta["last_execution_at"] = created_at
+
+    # Sorted so concurrent writers lock bucket rows in the same order
+    return [
+        {"agent_id": agent_id, "granularity": granularity, "bucket_start": start, **values}
+        for (agent_id, granularity, start), values in sorted(
+            deltas.items(), key=lambda item: (item[0][0], item[0][1].value, item[0][2])
+        )
+    ]
+
+
+async def apply_rollups(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Add freshly written executions to their rollup buckets (caller commits)"""
+    deltas = rollup_deltas(rows)
+    if not deltas:
+        return
+
+    is_postgres = db.bind.dialect.name == "postgresql"
+    dialect = postgresql if is_postgres else sqlite
+    # Two-argument max() is spelled greatest() on Postgres
+    latest = func.greatest if is_postgres else func.max
+    table = ExecutionRollup.__table__
+    stmt = dialect.insert(table).values(deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.agent_id, table.c.granularity, table.c.bucket_start],
+        set_={
+            "executions_count": table.c.executions_count + stmt.excluded.executions_count,
+            "success_count": table.c.success_count + stmt.excluded.success_count,
+            "total_execution_time_ms": table.c.total_execution_time_ms + stmt.excluded.total_execution_time_ms,
+            "total_cost": table.c.total_cost + stmt.excluded.total_cost,
+            "last_execution_at": latest(
+                func.coalesce(table.c.last_execution_at, stmt.excluded.last_execution_at),
+                stmt.excluded.last_execution_at
+            ),
+            "updated_at": func.now(),
+        }
+    )
+    await db.execute(stmt)
+
+
+SketchPair = Tuple[QuantileSketch, QuantileSketch]
+
+
+async def _merge_sketches(db: AsyncSession, fresh: Dict[RollupKey, SketchPair]) -> None:
+    """Merge buffered values into the hour/day bucket sketches (caller commits).
+
+    The bucket rows were created by ``apply_rollups`` when the executions
+    were committed; they are locked in key order for the merge.
+    """
+    table = ExecutionRollup.__table__
+    result = await db.execute(
+        select(
+            table.c.agent_id, table.c.granularity, table.c.bucket_start,
+            table.c.execution_time_sketch, table.c.cost_sketch
+        ).where(
+            tuple_(table.c.agent_id, table.c.granularity, table.c.bucket_start).in_(list(fresh))
+        ).order_by(table.c.agent_id, table.c.granularity, table.c.bucket_start).with_for_update()
+    )
+
+    updates = []
+    for agent_id, granularity, start, stored_time, stored_cost in result:
+        key = (agent_id, granularity, bucket_start(start, granularity))
+        if key not in fresh:
+            continue
+        time_sketch = QuantileSketch.from_dict(stored_time, SKETCH_RELATIVE_ACCURACY)
+        cost_sketch = QuantileSketch.from_dict(stored_cost, SKETCH_RELATIVE_ACCURACY)
+        time_sketch.merge(fresh[key][0])
+        cost_sketch.merge(fresh[key][1])
+        updates.append({
+            "b_agent_id": agent_id,
+            "b_granularity": granularity,
+            "b_bucket_start": start,
+            "execution_time_sketch": time_sketch.to_dict(),
+            "cost_sketch": cost_sketch.to_dict(),
+        })
+
+    if updates:
+        await db.execute(
+            update(table).where(
+                table.c.agent_id == bindparam("b_agent_id"),
+                table.c.granularity == bindparam("b_granularity"),
+                table.c.bucket_start == bindparam("b_bucket_start"),
+            ).values(
+                execution_time_sketch=bindparam("execution_time_sketch"),
+                cost_sketch=bindparam("cost_sketch"),
+            ),
+            updates
+        )
+
+
+class SketchBuffer:
+    """Per-worker buffer of committed executions' sketch values"""
+
+    def __init__(self, flush_seconds: float = settings.METRICS_SKETCH_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[RollupKey, SketchPair] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _sketches(self, key: RollupKey) -> SketchPair:
+        sketches = self._pending.get(key)
+        if sketches is None:
+            sketches = self._pending[key] = (
+                QuantileSketch(SKETCH_RELATIVE_ACCURACY),
+                QuantileSketch(SKETCH_RELATIVE_ACCURACY),
+            )
+        return sketches
+
+    def record_executions(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Add committed execution rows to their buckets' pending sketches"""
+        for row in rows:
+            for granularity in SKETCH_GRANULARITIES:
+                time_sketch, cost_sketch = self._sketches(
+                    (row["agent_id"], granularity, bucket_start(row["created_at"], granularity))
+                )
+                # Sketches hold non-negative values; anything else is left out
+                time_sketch.add(_non_negative(row.get("execution_time_ms")))
+                cost_sketch.add(_non_negative(row.get("cost")))
+
+    async def flush(self) -> int:
+        """Merge pending sketches; returns the number of buckets touched"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            async with AsyncSessionLocal() as db:
+                await _merge_sketches(db, pending)
+                await db.commit()
+        except Exception:
+            # Put everything back so the next flush retries it
+            for key, (time_sketch, cost_sketch) in pending.items():
+                stored_time, stored_cost = self._sketches(key)
+                stored_time.merge(time_sketch)
+                stored_cost.merge(cost_sketch)
+            raise
+        return len(pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final sketch flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Sketch flush failed, will retry: {e}")
+
+
+sketch_buffer = SketchBuffer()
+
+
+def _summarize(total, successful, total_time, total_cost, last_execution) -> Dict[str, Any]:
+    return {
+        "total_executions": total,
+        "success_rate": successful / total if total else 0.0,
+        "avg_execution_time_ms": total_time / total if total else 0.0,
+        "avg_cost": total_cost / total if total else 0.0,
+        "last_execution": last_execution.isoformat() if last_execution else None
+    }
+
+
+async def get_execution_stats(
+    db: AsyncSession,
+    agent_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Count, success rate, averages and last timestamp for an agent.
+
+    Lifetime totals are summed from day rollups; bounded windows fall back
+    to one aggregate query over the raw executions.
+    """
+    if since is None and until is None:
+        query = select(
+            func.coalesce(func.sum(ExecutionRollup.executions_count), 0),
+            func.coalesce(func.sum(ExecutionRollup.success_count), 0),
+            func.coalesce(func.sum(ExecutionRollup.total_execution_time_ms), 0),
+            func.coalesce(func.sum(ExecutionRollup.total_cost), 0.0),
+            func.max(ExecutionRollup.last_execution_at),
+        ).where(
+            ExecutionRollup.agent_id == agent_id,
+            ExecutionRollup.granularity == RollupGranularity.DAY
+        )
+        return _summarize(*(await db.execute(query)).one())
+
+    query = select(
+        func.count(AgentExecution.id),
+        func.coalesce(func.sum(cast(AgentExecution.success, Integer)), 0),
+        func.coalesce(func.sum(AgentExecution.execution_time_ms), 0),
+        func.coalesce(func.sum(AgentExecution.cost), 0.0),
+        func.max(AgentExecution.created_at),
+    ).where(AgentExecution.agent_id == agent_id)
+    if since:
+        query = query.where(AgentExecution.created_at >= since)
+    if until:
+        query = query.where(AgentExecution.created_at < until)
+
+    return _summarize(*(await db.execute(query)).one())
+
+
+async def get_timeseries(
+    db: AsyncSession,
+    agent_id: str,
+    granularity: RollupGranularity,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Read metric buckets for an agent straight from the rollup table"""
+    query = select(ExecutionRollup).where(
+        ExecutionRollup.agent_id == agent_id,
+        ExecutionRollup.granularity == granularity
+    )
+    if since:
+        query = query.where(ExecutionRollup.bucket_start >= bucket_start(since, granularity))
+    if until:
+        query = query.where(ExecutionRollup.bucket_start < until)
+
+    result = await db.execute(query.order_by(ExecutionRollup.bucket_start))
+    buckets = []
+    for rollup in result.scalars():
+        count = rollup.executions_count
+        buckets.append({
+            "bucket_start": rollup.bucket_start,
+            "executions_count": count,
+            "success_rate": rollup.success_count / count if count else 0.0,
+            "avg_execution_time_ms": rollup.total_execution_time_ms / count if count else 0.0,
+            "avg_cost": rollup.total_cost / count if count else 0.0,
+        })
+    return buckets
+
+
+async def get_quantiles(
+    db: AsyncSession,
+    agent_id: str,
+    quantiles: Sequence[float],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Estimate execution time and cost quantiles by merging bucket sketches.
+
+    The range is widened to whole buckets: hour buckets for ranges up to
+    HOURLY_SKETCH_MAX_RANGE, day buckets otherwise.
+    """
+    since = _utc(since) if since is not None else None
+    until = _utc(until) if until is not None else None
+    if since is not None and (until or datetime.now(timezone.utc)) - since <= HOURLY_SKETCH_MAX_RANGE:
+        granularity = RollupGranularity.HOUR
+    else:
+        granularity = RollupGranularity.DAY
+
+    query = select(ExecutionRollup.execution_time_sketch, ExecutionRollup.cost_sketch).where(
+        ExecutionRollup.agent_id == agent_id,
+        ExecutionRollup.granularity == granularity
+    )
+    if since:
+        query = query.where(ExecutionRollup.bucket_start >= bucket_start(since, granularity))
+    if until:
+        query = query.where(ExecutionRollup.bucket_start < until)
+
+    time_sketch = QuantileSketch(SKETCH_RELATIVE_ACCURACY)
+    cost_sketch = QuantileSketch(SKETCH_RELATIVE_ACCURACY)
+    for stored_time, stored_cost in await db.execute(query):
+        time_sketch.merge(QuantileSketch.from_dict(stored_time, SKETCH_RELATIVE_ACCURACY))
+        cost_sketch.merge(QuantileSketch.from_dict(stored_cost, SKETCH_RELATIVE_ACCURACY))
+
+    def _labelled(sketch: QuantileSketch) -> Dict[str, Optional[float]]:
+        return {f"p{q * 100:g}": sketch.quantile(q) for q in quantiles}
+
+    return {
+        "agent_id": agent_id,
+        "granularity": granularity,
+        "sample_count": time_sketch.count,
+        "execution_time_ms": _labelled(time_sketch),
+        "cost": _labelled(cost_sketch),
+    }
+
+
+async def rebuild_rollups(db: AsyncSession, agent_id: Optional[str] = None) -> None:
+    """Recompute rollups from raw executions (Postgres only; caller commits).
+
+    Used to backfill history that predates the rollup table. Quantile
+    sketches are not rebuilt; backfilled buckets report counts and
+    averages only.
+    """
+    clear = delete(ExecutionRollup)
+    if agent_id:
+        clear = clear.where(ExecutionRollup.agent_id == agent_id)
+    await db.execute(clear)
+
+    table = ExecutionRollup.__table__
+    for granularity in RollupGranularity:
+        bucket = func.timezone("UTC", func.date_trunc(
+            granularity.value, func.timezone("UTC", AgentExecution.created_at)
+        ))
+        source = select(
+            AgentExecution.agent_id,
+            literal(granularity, table.c.granularity.type),
+            bucket,
+            func.count(AgentExecution.id),
+            func.coalesce(func.sum(cast(AgentExecution.success, Integer)), 0),
+            func.coalesce(func.sum(AgentExecution.execution_time_ms), 0),
+            func.coalesce(func.sum(AgentExecution.cost), 0.0),
+            func.max(AgentExecution.created_at),
+        ).group_by(AgentExecution.agent_id, bucket)
+        if agent_id:
+            source = source.where(AgentExecution.agent_id == agent_id)
+
+        await db.execute(table.insert().from_select([
+            "agent_id", "granularity", "bucket_start", "executions_count", "success_count",
+            "total_execution_time_ms", "total_cost", "last_execution_at",
+        ], source))
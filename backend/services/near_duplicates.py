@@ -0,0 +1,209 @@
+"""
+Near-duplicate index over execution and scenario inputs.
+
+Each agent's ``AgentExecution.input_data`` and ``SyntheticScenario.input_data``
+are MinHashed (utils.minhash) into one in-memory LSH index per agent, keyed
+``execution:<id>`` / ``scenario:<id>``, so "inputs similar to X" is a
+bucket lookup rather than a scan.
+
+An agent's index is built from its newest NEAR_DUP_MAX_ITEMS inputs the
+first time it is asked for, off the event loop. After that it is kept
+current incrementally: write paths in this worker call
+``record_executions`` / ``record_scenarios`` once their rows are
+committed, and ``index_for`` reads in rows other workers committed since
+the last sync (at most every NEAR_DUP_SYNC_SECONDS, re-reading
+NEAR_DUP_SYNC_OVERLAP_SECONDS behind the watermark for late commits such
+as write-behind batches). Only NEAR_DUP_MAX_AGENTS indexes, holding at
+most NEAR_DUP_MAX_TOTAL_ITEMS signatures between them (about 1.2 KB
+each), are kept per worker; the least recently used are dropped and
+rebuilt on demand.
+
+Building an index reads and MinHashes up to NEAR_DUP_MAX_ITEMS inputs
+(off the event loop, but inside the request), so the first lookup for a
+cold or evicted agent takes seconds; later lookups take well under a
+millisecond.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import AgentExecution, SyntheticScenario
+from utils.minhash import LSHIndex, MinHasher
+
+logger = logging.getLogger(__name__)
+
+EXECUTION = "execution"
+SCENARIO = "scenario"
+SOURCES = ((EXECUTION, AgentExecution), (SCENARIO, SyntheticScenario))
+
+# (key, created_at, input_data)
+Item = Tuple[str, datetime, Any]
+
+
+def item_key(source: str, item_id: str) -> str:
+    return f"{source}:{item_id}"
+
+
+def new_hasher() -> MinHasher:
+    return MinHasher(settings.NEAR_DUP_PERMUTATIONS)
+
+
+def new_index(max_items: Optional[int] = settings.NEAR_DUP_MAX_ITEMS) -> LSHIndex:
+    return LSHIndex(settings.NEAR_DUP_PERMUTATIONS, settings.NEAR_DUP_BANDS, max_items)
+
+
+class NearDuplicateIndex:
+    def __init__(
+        self,
+        max_items: int = settings.NEAR_DUP_MAX_ITEMS,
+        max_total_items: int = settings.NEAR_DUP_MAX_TOTAL_ITEMS,
+        max_agents: int = settings.NEAR_DUP_MAX_AGENTS,
+        sync_seconds: float = settings.NEAR_DUP_SYNC_SECONDS,
+        overlap_seconds: float = settings.NEAR_DUP_SYNC_OVERLAP_SECONDS,
+    ):
+        self.hasher = new_hasher()
+        self.max_items = min(max_items, max_total_items)
+        self.max_total_items = max_total_items
+        self.max_agents = max_agents
+        self.sync_seconds = sync_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._indexes: "OrderedDict[str, LSHIndex]" = OrderedDict()
+        self._watermarks: Dict[str, Optional[datetime]] = {}
+        self._synced_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def signature(self, input_data: Any) -> np.ndarray:
+        return self.hasher.signature_of(input_data)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used indexes past the agent or item caps"""
+        total = sum(len(index) for index in self._indexes.values())
+        for agent_id in list(self._indexes):
+            if len(self._indexes) <= self.max_agents and total <= self.max_total_items:
+                return
+            if agent_id != keep:
+                total -= len(self._indexes[agent_id])
+                self.forget(agent_id)
+
+    def _record(self, source: str, rows: Iterable[Dict[str, Any]]) -> None:
+        # Agents without a loaded index pick the rows up when it is built
+        for row in rows:
+            index = self._indexes.get(row.get("agent_id"))
+            if index is not None and row.get("input_data") is not None:
+                index.add(item_key(source, row["id"]), self.signature(row["input_data"]))
+        self._evict()
+
+    def record_executions(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Add committed execution rows to their agents' loaded indexes"""
+        self._record(EXECUTION, rows)
+
+    def record_scenarios(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Add committed scenario rows to their agents' loaded indexes"""
+        self._record(SCENARIO, rows)
+
+    def record_signatures(
+        self,
+        agent_id: Optional[str],
+        source: str,
+        items: Iterable[Tuple[str, np.ndarray]]
+    ) -> None:
+        """``record_*`` for committed rows whose signatures are already known"""
+        index = self._indexes.get(agent_id)
+        if index is not None:
+            for item_id, signature in items:
+                index.add(item_key(source, item_id), signature)
+            self._evict()
+
+    def discard(self, agent_id: Optional[str], source: str, item_id: str) -> None:
+        """Remove a deleted execution or scenario from its agent's index"""
+        index = self._indexes.get(agent_id)
+        if index is not None:
+            index.remove(item_key(source, item_id))
+
+    def forget(self, agent_id: str) -> None:
+        """Drop an agent's index; it is rebuilt from the database on next use"""
+        self._indexes.pop(agent_id, None)
+        self._watermarks.pop(agent_id, None)
+        self._synced_at.pop(agent_id, None)
+
+    async def _load_items(self, db: AsyncSession, agent_id: str, since: Optional[datetime]) -> List[Item]:
+        """The agent's newest inputs (created at or after ``since``), oldest first"""
+        items: List[Item] = []
+        for source, model in SOURCES:
+            query = (
+                select(model.id, model.created_at, model.input_data)
+                .where(model.agent_id == agent_id, model.input_data.isnot(None))
+                .order_by(model.created_at.desc(), model.id.desc())
+                .limit(self.max_items)
+            )
+            if since is not None:
+                query = query.where(model.created_at >= since)
+            items.extend((item_key(source, item_id), created_at, input_data)
+                         for item_id, created_at, input_data in await db.execute(query))
+        items.sort(key=lambda item: item[1])
+        return items[-self.max_items:]
+
+    def _build(self, items: List[Item]) -> LSHIndex:
+        index = new_index(self.max_items)
+        for key, _, input_data in items:
+            index.add(key, self.signature(input_data))
+        return index
+
+    async def index_for(self, db: AsyncSession, agent_id: str) -> LSHIndex:
+        """The agent's index, built or brought up to date as needed"""
+        lock = self._locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(agent_id)
+            if index is not None and time.monotonic() - self._synced_at[agent_id] < self.sync_seconds:
+                self._indexes.move_to_end(agent_id)
+                return index
+
+            watermark = self._watermarks.get(agent_id)
+            since = watermark - self.overlap if index is not None and watermark else None
+            items = await self._load_items(db, agent_id, since)
+            if index is None:
+                index = await asyncio.to_thread(self._build, items)
+                logger.info(f"Built near-duplicate index for agent {agent_id}: {len(index)} inputs")
+            else:
+                fresh = [item for item in items if item[0] not in index]
+                signatures = await asyncio.to_thread(lambda: [self.signature(item[2]) for item in fresh])
+                for (key, _, _), signature in zip(fresh, signatures):
+                    index.add(key, signature)
+
+            if items:
+                self._watermarks[agent_id] = max(items[-1][1], watermark) if watermark else items[-1][1]
+            self._synced_at[agent_id] = time.monotonic()
+            self._indexes[agent_id] = index
+            self._indexes.move_to_end(agent_id)
+            self._evict(keep=agent_id)
+            return index
+
+    async def similar(
+        self,
+        db: AsyncSession,
+        agent_id: str,
+        input_data: Any,
+        threshold: float = settings.NEAR_DUP_THRESHOLD,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Indexed inputs of ``agent_id`` similar to ``input_data``, most similar first.
+
+        Slow (seconds) when the agent's index has to be built first.
+        """
+        index = await self.index_for(db, agent_id)
+        return [
+            {"source": key.partition(":")[0], "id": key.partition(":")[2], "similarity": score}
+            for key, score in index.query(self.signature(input_data), threshold, limit)
+        ]
+
+
+near_duplicates = NearDuplicateIndex()
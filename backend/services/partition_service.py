@@ -0,0 +1,248 @@
+"""
+Monthly range partitions for ``agent_executions``.
+
+The table is partitioned by ``created_at`` (see migration 0003). This
+module pre-creates upcoming monthly partitions and retires partitions that
+fall entirely before the retention cutoff by detaching or dropping them,
+which avoids the bloat and vacuum pressure of bulk DELETEs.
+
+Rows that land in the DEFAULT partition (because maintenance fell behind)
+are moved into their month's partition when it is created, since Postgres
+refuses to attach a partition whose range the DEFAULT partition already
+holds rows for; rows left there past the retention cutoff are deleted in
+batches.
+
+Run it periodically, e.g. from cron or celery beat:
+
+    python -m services.partition_service
+"""
+
+import argparse
+import logging
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ["agent_executions"]
+_PARTITION_RE = re.compile(r"^(?P<table>.+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[Tuple[str, datetime]]:
+    match = _PARTITION_RE.match(name)
+    if not match:
+        return None
+    month = datetime(int(match["year"]), int(match["month"]), 1, tzinfo=timezone.utc)
+    return match["table"], month
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def has_default_partition(conn: Connection, table: str) -> bool:
+    return conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f'"{default_partition_name(table)}"'}
+    ).scalar()
+
+
+def create_partition(conn: Connection, table: str, month: datetime) -> None:
+    """Create ``month``'s partition, moving its rows out of the DEFAULT partition.
+
+    Run in one transaction: the DEFAULT partition is locked from the move
+    until the commit, so no row for the month can land there in between.
+    """
+    name = partition_name(table, month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    default = default_partition_name(table)
+    in_range = {"start": month, "end": add_months(month, 1)}
+    if not has_default_partition(conn, table) or not conn.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE created_at >= :start AND created_at < :end)'
+    ), in_range).scalar():
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" FOR VALUES {bounds}'))
+        return
+
+    conn.execute(text(f'LOCK TABLE "{default}" IN SHARE ROW EXCLUSIVE MODE'))
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    moved = conn.execute(text(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE created_at >= :start AND created_at < :end RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    ), in_range).rowcount
+    # ATTACH builds the parent's indexes on the new partition
+    conn.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES {bounds}'))
+    logger.info(f"{name}: moved {moved} rows out of {default}")
+
+
+def create_default_partition(conn: Connection, table: str) -> None:
+    """Catch-all so inserts never fail if maintenance falls behind"""
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT'))
+
+
+def list_partitions(conn: Connection, table: str) -> List[Tuple[str, datetime]]:
+    """Monthly partitions currently attached to ``table``, oldest first"""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = :table"
+    ), {"table": table}).scalars()
+
+    partitions = []
+    for name in rows:
+        parsed = parse_partition_name(name)
+        if parsed and parsed[0] == table:
+            partitions.append((name, parsed[1]))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def retention_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    return add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+
+
+def ensure_partitions(
+    conn: Connection,
+    table: str,
+    months_ahead: int = settings.PARTITION_PRECREATE_MONTHS,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """Create partitions for the current month and the next ``months_ahead``"""
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = {name for name, _ in list_partitions(conn, table)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        if name not in existing:
+            create_partition(conn, table, month)
+            created.append(name)
+    return created
+
+
+def expire_partitions(
+    conn: Connection,
+    table: str,
+    retention_months: int = settings.EXECUTION_RETENTION_MONTHS,
+    action: str = settings.PARTITION_RETENTION_ACTION,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """Detach (and optionally drop) partitions wholly older than the cutoff"""
+    if action not in ("drop", "detach"):
+        raise ValueError(f"Unknown retention action: {action}")
+
+    cutoff = retention_cutoff(retention_months, now)
+    expired = []
+    for name, month in list_partitions(conn, table):
+        if add_months(month, 1) > cutoff:
+            break
+        conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        if action == "drop":
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        expired.append(name)
+    return expired
+
+
+def purge_default_partition(
+    conn: Connection,
+    table: str,
+    retention_months: int = settings.EXECUTION_RETENTION_MONTHS,
+    batch_size: int = settings.FEEDBACK_PURGE_BATCH_SIZE,
+    now: Optional[datetime] = None
+) -> int:
+    """Delete DEFAULT-partition rows older than the cutoff in small batches.
+
+    Their months never got a partition, so ``expire_partitions`` cannot
+    retire them.
+    """
+    if not has_default_partition(conn, table):
+        return 0
+    default = default_partition_name(table)
+    cutoff = retention_cutoff(retention_months, now)
+    deleted = 0
+    while True:
+        result = conn.execute(text(
+            f'DELETE FROM "{default}" WHERE ctid IN ('
+            f'SELECT ctid FROM "{default}" WHERE created_at < :cutoff LIMIT :batch_size)'
+        ), {"cutoff": cutoff, "batch_size": batch_size})
+        conn.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def purge_feedback(
+    conn: Connection,
+    retention_months: int = settings.EXECUTION_RETENTION_MONTHS,
+    batch_size: int = settings.FEEDBACK_PURGE_BATCH_SIZE,
+    now: Optional[datetime] = None
+) -> int:
+    """Delete feedback past retention in small batches.
+
+    Feedback stays unpartitioned so execution_id can remain globally
+    unique; it is far smaller than agent_executions, and short batched
+    deletes keep vacuum able to keep up.
+    """
+    cutoff = retention_cutoff(retention_months, now)
+    deleted = 0
+    while True:
+        result = conn.execute(text(
+            "DELETE FROM feedback WHERE id IN ("
+            "SELECT id FROM feedback WHERE created_at < :cutoff LIMIT :batch_size)"
+        ), {"cutoff": cutoff, "batch_size": batch_size})
+        conn.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def run_maintenance(engine=None, purge: bool = True) -> None:
+    if engine is None:
+        from database import engine
+
+    if engine.dialect.name != "postgresql":
+        logger.info("Partition maintenance skipped: not a Postgres database")
+        return
+
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            created = ensure_partitions(conn, table)
+            conn.commit()
+            expired = expire_partitions(conn, table)
+            conn.commit()
+            purged = purge_default_partition(conn, table)
+            logger.info(
+                f"{table}: created {created or 'no'} partitions, retired {expired or 'no'} partitions, "
+                f"purged {purged} default-partition rows past retention"
+            )
+        if purge:
+            deleted = purge_feedback(conn)
+            logger.info(f"feedback: purged {deleted} rows past retention")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain agent_executions partitions")
+    parser.add_argument("--no-purge-feedback", action="store_true", help="skip feedback retention")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_maintenance(purge=not args.no_purge_feedback)
@@ -0,0 +1,462 @@
+"""
+Synthetic scenario generation.
+
+Seeds -- an agent's recent executions and/or caller-supplied templates --
+are turned into scenario variants by a pluggable mutator running in a
+process pool, and the variants are streamed into ``synthetic_scenarios``
+with one bulk ``INSERT ... ON CONFLICT DO NOTHING`` per batch.
+
+A mutator is any picklable callable ``mutator(seed: dict, rng) -> dict |
+None`` that returns the variant's ``input_data`` and optionally
+``expected_output``, ``scenario_type``, ``difficulty``, ``tags`` and
+``metadata`` (anything missing is taken from the seed); None skips the
+variant. Select one with SYNTHETIC_MUTATOR as a ``module:function`` path.
+The default, ``offline_mutator``, needs no network or model
+(utils.scenario_mutations).
+
+Memory stays flat however many scenarios are requested: seeds are capped
+at SYNTHETIC_MAX_SEEDS and handed to each pool process once, work is cut
+into SYNTHETIC_BATCH_SIZE chunks, and at most two chunks per process are
+in flight; each chunk is inserted and dropped as soon as it arrives. The
+near-duplicate index below is the exception, capped at NEAR_DUP_MAX_ITEMS
+signatures.
+
+Runs keep drawing variants until ``count`` are accepted (or
+SYNTHETIC_MAX_DRAWS_PER_SCENARIO x ``count`` have been drawn, which ends
+the run as ``exhausted``). With ``drop_near_duplicates``, a variant whose
+input is a near-duplicate of an earlier variant in the run is not
+accepted: pool processes MinHash each variant's input and the parent
+checks it against a run-local LSH index, so each check costs one bucket
+lookup however long the run. Variants are not compared with their seeds
+-- small edits of the seed are what the mutator produces -- so the
+filter is off by default; the offline mutator's edits are often
+near-identical to each other, so expect many draws per kept variant.
+
+Variant ``i`` of a run is drawn from ``Random(f"{seed}:{i}")`` and gets a
+uuid5 id from the run id and ``i``. A seed drawn for a run is saved in its
+checkpoint and reused when the run id is run again, so re-running a run
+id is idempotent.
+Progress and throughput (scenarios/sec) are kept in ``job_checkpoints``
+under ``synthetic_data:<run_id>``, saved at least once per chunk. Runs
+execute inside the API process that accepted them, so a restart
+interrupts them: ``fail_orphaned_runs`` (run at API startup, and when a
+run is polled) marks queued or running runs whose checkpoint has not
+moved for SYNTHETIC_RUN_STALE_SECONDS as failed. Each run owns a process
+pool, so ``run_slots`` caps the runs an API process accepts at
+SYNTHETIC_MAX_CONCURRENT_RUNS.
+
+    python -m services.scenario_generator AGENT_ID --count 100000
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy import select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import AgentExecution, JobCheckpoint, SyntheticScenario
+from services.near_duplicates import SCENARIO, near_duplicates, new_hasher, new_index
+from utils.minhash import MinHasher
+from utils.scenario_mutations import EDGE_MUTATIONS, mutate_json
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "synthetic_data:"
+SCENARIO_ID_NAMESPACE = uuid.UUID("0b7c2f4e-5d1a-4c8e-9f63-2a8d4e6b1c07")
+# Keeps one INSERT's bind parameters well under Postgres' 32767 limit
+INSERT_ROWS_PER_STATEMENT = 2000
+
+Mutator = Callable[[Dict[str, Any], random.Random], Optional[Dict[str, Any]]]
+
+
+def offline_mutator(seed: Dict[str, Any], rng: random.Random) -> Optional[Dict[str, Any]]:
+    """Default mutator: structural JSON mutations of the seed's input.
+
+    Edge-case mutations make the variant an ``edge_case`` without an
+    expected output; otherwise the seed's expected output is kept.
+    """
+    input_data, applied = mutate_json(seed["input_data"], rng)
+    if not applied:
+        return None
+    edge = any(name in EDGE_MUTATIONS for name in applied)
+    return {
+        "input_data": input_data,
+        "expected_output": None if edge else seed.get("expected_output"),
+        "scenario_type": "edge_case" if edge else seed.get("scenario_type"),
+        "difficulty": min(5, (seed.get("difficulty") or 1) + len(applied) - 1 + int(edge)),
+        "tags": sorted(set(seed.get("tags") or []) | set(applied)),
+        "metadata": {"mutations": applied},
+    }
+
+
+def load_mutator(path: str = settings.SYNTHETIC_MUTATOR) -> Mutator:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def checkpoint_name(run_id: str) -> str:
+    return CHECKPOINT_PREFIX + run_id
+
+
+def new_run_state(requested: int) -> Dict[str, Any]:
+    return {
+        "status": "queued", "requested": requested, "generated": 0, "inserted": 0,
+        "near_duplicates": 0,
+        "seeds": 0, "seed": None, "elapsed_seconds": 0.0, "scenarios_per_second": 0.0, "error": None,
+    }
+
+
+class RunSlots:
+    """Count of generation runs in progress in this process, up to ``limit``"""
+
+    def __init__(self, limit: int = settings.SYNTHETIC_MAX_CONCURRENT_RUNS):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active = max(0, self.active - 1)
+
+
+run_slots = RunSlots()
+
+
+def seed_from_template(template: Dict[str, Any], index: int) -> Dict[str, Any]:
+    input_data = template["input_data"]
+    return {
+        "name": template.get("name") or f"template {index}",
+        "source": f"template:{index}",
+        "input_data": input_data if isinstance(input_data, dict) else {"input": input_data},
+        "expected_output": template.get("expected_output"),
+        "scenario_type": template.get("scenario_type") or "common",
+        "difficulty": template.get("difficulty") or 1,
+        "tags": list(template.get("tags") or []),
+    }
+
+
+async def load_execution_seeds(
+    db: AsyncSession,
+    agent_id: str,
+    limit: int = settings.SYNTHETIC_MAX_SEEDS,
+    success: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """Seeds from an agent's most recent executions"""
+    query = (
+        select(AgentExecution.id, AgentExecution.input_data, AgentExecution.output_data, AgentExecution.success)
+        .where(AgentExecution.agent_id == agent_id, AgentExecution.input_data.isnot(None))
+        .order_by(AgentExecution.created_at.desc(), AgentExecution.id.desc())
+        .limit(limit)
+    )
+    if success is not None:
+        query = query.where(AgentExecution.success == success)
+
+    seeds = []
+    for execution_id, input_data, output_data, succeeded in await db.execute(query):
+        seeds.append({
+            "name": f"execution {execution_id[:8]}",
+            "source": f"execution:{execution_id}",
+            "input_data": input_data if isinstance(input_data, dict) else {"input": input_data},
+            "expected_output": output_data if succeeded else None,
+            "scenario_type": "failure" if succeeded is False else "common",
+            "difficulty": 2 if succeeded is False else 1,
+            "tags": ["from_execution"],
+        })
+    return seeds
+
+
+# Per-process state installed by the pool initializer, so seeds are
+# pickled once per process rather than once per chunk
+_mutator: Optional[Mutator] = None
+_seeds: List[Dict[str, Any]] = []
+_hasher: Optional[MinHasher] = None
+
+
+def _init_worker(mutator_path: str, seeds: List[Dict[str, Any]], hash_inputs: bool) -> None:
+    global _mutator, _seeds, _hasher
+    _mutator = load_mutator(mutator_path)
+    _seeds = seeds
+    _hasher = new_hasher() if hash_inputs else None
+
+
+def generate_variants(
+    mutator: Mutator,
+    seeds: List[Dict[str, Any]],
+    run_id: str,
+    agent_id: Optional[str],
+    start: int,
+    count: int,
+    seed: int
+) -> List[Dict[str, Any]]:
+    """Variants ``start .. start + count - 1`` of a run, as table rows"""
+    rows = []
+    for index in range(start, start + count):
+        base = seeds[index % len(seeds)]
+        variant = mutator(base, random.Random(f"{seed}:{index}"))
+        if variant is None:
+            continue
+        input_data = variant["input_data"]
+        rows.append({
+            "id": str(uuid.uuid5(SCENARIO_ID_NAMESPACE, f"{run_id}:{index}")),
+            "agent_id": agent_id,
+            "name": f"{base['name']} variant {index}",
+            "description": f"Synthetic variant of {base['source']}",
+            "scenario_type": variant.get("scenario_type") or base["scenario_type"],
+            "input_data": input_data if isinstance(input_data, dict) else {"input": input_data},
+            "expected_output": variant.get("expected_output", base.get("expected_output")),
+            "difficulty": max(1, min(5, variant.get("difficulty") or base["difficulty"])),
+            "tags": sorted(set(variant.get("tags") or base["tags"]) | {"synthetic"}),
+            "metadata": {**(variant.get("metadata") or {}), "run_id": run_id, "source": base["source"]},
+        })
+    return rows
+
+
+def input_signatures(hasher: Optional[MinHasher], rows: List[Dict[str, Any]]) -> Optional[List[np.ndarray]]:
+    return [hasher.signature_of(row["input_data"]) for row in rows] if hasher is not None else None
+
+
+Chunk = Tuple[List[Dict[str, Any]], Optional[List[np.ndarray]]]
+
+
+def generate_chunk(run_id: str, agent_id: Optional[str], start: int, count: int, seed: int) -> Chunk:
+    """Pool entry point: ``generate_variants`` plus their input signatures"""
+    rows = generate_variants(_mutator, _seeds, run_id, agent_id, start, count, seed)
+    return rows, input_signatures(_hasher, rows)
+
+
+async def insert_scenarios(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """Bulk insert scenario rows (caller commits); returns how many were new"""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = SyntheticScenario.__table__
+    inserted = 0
+    for i in range(0, len(rows), INSERT_ROWS_PER_STATEMENT):
+        result = await db.execute(
+            dialect.insert(table)
+            .values(rows[i:i + INSERT_ROWS_PER_STATEMENT])
+            .on_conflict_do_nothing()
+            .returning(true())
+        )
+        inserted += len(result.all())
+    return inserted
+
+
+async def _save_state(db: AsyncSession, run_id: str, state: Dict[str, Any]) -> None:
+    checkpoint = await db.get(JobCheckpoint, checkpoint_name(run_id))
+    if checkpoint is None:
+        db.add(JobCheckpoint(name=checkpoint_name(run_id), state=dict(state)))
+    else:
+        checkpoint.state = dict(state)
+
+
+def is_orphaned(checkpoint: JobCheckpoint, now: Optional[datetime] = None) -> bool:
+    """Whether a queued or running run has stopped saving progress"""
+    if checkpoint.state.get("status") not in ("queued", "running") or checkpoint.updated_at is None:
+        return False
+    updated_at = checkpoint.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return now - updated_at > timedelta(seconds=settings.SYNTHETIC_RUN_STALE_SECONDS)
+
+
+def mark_orphaned(checkpoint: JobCheckpoint) -> None:
+    checkpoint.state = {
+        **checkpoint.state,
+        "status": "failed",
+        "error": "Interrupted: the process running it stopped before it finished",
+    }
+
+
+async def fail_orphaned_runs(db: AsyncSession) -> int:
+    """Mark runs left queued or running by a stopped process as failed
+    (caller commits); returns how many were marked"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.SYNTHETIC_RUN_STALE_SECONDS)
+    checkpoints = (await db.execute(
+        select(JobCheckpoint).where(
+            JobCheckpoint.name.startswith(CHECKPOINT_PREFIX), JobCheckpoint.updated_at < cutoff
+        )
+    )).scalars().all()
+    orphaned = [checkpoint for checkpoint in checkpoints if is_orphaned(checkpoint)]
+    for checkpoint in orphaned:
+        mark_orphaned(checkpoint)
+    return len(orphaned)
+
+
+async def run_generation(
+    run_id: str,
+    agent_id: Optional[str],
+    seeds: List[Dict[str, Any]],
+    count: int,
+    seed: Optional[int] = None,
+    processes: int = settings.SYNTHETIC_PROCESSES,
+    batch_size: int = settings.SYNTHETIC_BATCH_SIZE,
+    mutator_path: str = settings.SYNTHETIC_MUTATOR,
+    drop_near_duplicates: bool = False,
+    threshold: float = settings.NEAR_DUP_THRESHOLD
+) -> Dict[str, Any]:
+    """Generate ``count`` variants of ``seeds`` and insert them as they arrive.
+
+    Returns the run's final state (see ``new_run_state``).
+    """
+    state = new_run_state(count)
+    state.update(status="running", seeds=len(seeds))
+    loop = asyncio.get_running_loop()
+    pool = None
+    if processes > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(mutator_path, seeds, drop_near_duplicates)
+        )
+    else:
+        mutator = load_mutator(mutator_path)
+        hasher = near_duplicates.hasher if drop_near_duplicates else None
+    window = max(processes, 1) * 2
+    max_draws = count * settings.SYNTHETIC_MAX_DRAWS_PER_SCENARIO
+    started = time.monotonic()
+
+    async with AsyncSessionLocal() as db:
+        try:
+            if seed is None:
+                # Re-running a run id draws the same variants again
+                previous = await db.get(JobCheckpoint, checkpoint_name(run_id))
+                seed = previous.state.get("seed") if previous is not None else None
+            state["seed"] = seed = random.randrange(2 ** 32) if seed is None else seed
+            await _save_state(db, run_id, state)
+            await db.commit()
+            if not seeds:
+                raise ValueError("No seeds: the agent has no executions and no templates were given")
+            # Variants are only compared with each other: most are small
+            # edits of their seed, which is itself indexed for the agent
+            index = new_index() if drop_near_duplicates else None
+            accepted = 0
+            next_start = 0
+            processed = 0
+            # start -> (size, future), in submission order
+            in_flight: "OrderedDict[int, Tuple[int, asyncio.Future]]" = OrderedDict()
+            while accepted < count and (in_flight or next_start < max_draws):
+                # Submit as if every in-flight variant will be kept, so the
+                # run draws little more than it needs
+                while len(in_flight) < window and next_start < max_draws:
+                    size = min(batch_size, count - accepted - (next_start - processed), max_draws - next_start)
+                    if size <= 0:
+                        break
+                    if pool is not None:
+                        future = loop.run_in_executor(pool, generate_chunk, run_id, agent_id, next_start, size, seed)
+                    else:
+                        rows = generate_variants(mutator, seeds, run_id, agent_id, next_start, size, seed)
+                        future = loop.create_future()
+                        future.set_result((rows, input_signatures(hasher, rows)))
+                    in_flight[next_start] = (size, future)
+                    next_start += size
+
+                # Chunks are filtered in start order, so which variants are
+                # kept does not depend on which process finished first and
+                # re-running a run id stays idempotent
+                start, (size, future) = in_flight.popitem(last=False)
+                rows, signatures = await future
+                processed = start + size
+                state["generated"] += len(rows)
+                kept_at = []
+                for i, row in enumerate(rows):
+                    if accepted + len(kept_at) == count:
+                        break
+                    if index is not None and index.add_unless_duplicate(row["id"], signatures[i], threshold) is not None:
+                        state["near_duplicates"] += 1
+                        continue
+                    kept_at.append(i)
+                kept = [rows[i] for i in kept_at]
+                accepted += len(kept)
+                state["inserted"] += await insert_scenarios(db, kept)
+                elapsed = time.monotonic() - started
+                state["elapsed_seconds"] = elapsed
+                state["scenarios_per_second"] = state["generated"] / elapsed if elapsed else 0.0
+                await _save_state(db, run_id, state)
+                await db.commit()
+                if signatures is not None:
+                    near_duplicates.record_signatures(
+                        agent_id, SCENARIO, ((rows[i]["id"], signatures[i]) for i in kept_at)
+                    )
+                else:
+                    near_duplicates.record_scenarios(kept)
+
+            if accepted < count:
+                state.update(
+                    status="exhausted",
+                    error=f"Only {accepted} distinct variants in {next_start} draws; add seeds or templates"
+                )
+            else:
+                state["status"] = "completed"
+        except Exception as e:
+            await db.rollback()
+            state.update(status="failed", error=f"{type(e).__name__}: {e}")
+            logger.error(f"Synthetic generation run {run_id} failed: {e}")
+        finally:
+            if pool is not None:
+                # Joining the pool's processes blocks; keep it off the event loop
+                await asyncio.to_thread(pool.shutdown, cancel_futures=True)
+        await _save_state(db, run_id, state)
+        await db.commit()
+
+    logger.info(
+        f"Synthetic generation run {run_id}: {state['inserted']} scenarios from {len(seeds)} seeds "
+        f"({state['near_duplicates']} near-duplicates dropped) "
+        f"in {state['elapsed_seconds']:.1f}s ({state['scenarios_per_second']:.0f} scenarios/s)"
+    )
+    return state
+
+
+async def generate_for_agent(
+    run_id: str,
+    agent_id: str,
+    count: int,
+    templates: Optional[List[Dict[str, Any]]] = None,
+    from_executions: bool = True,
+    execution_success: Optional[bool] = None,
+    max_seeds: int = settings.SYNTHETIC_MAX_SEEDS,
+    seed: Optional[int] = None,
+    processes: int = settings.SYNTHETIC_PROCESSES,
+    drop_near_duplicates: bool = False
+) -> Dict[str, Any]:
+    """Collect seeds for ``agent_id`` and run the generation"""
+    seeds = [seed_from_template(template, i) for i, template in enumerate(templates or [])]
+    if from_executions and len(seeds) < max_seeds:
+        async with AsyncSessionLocal() as db:
+            seeds.extend(await load_execution_seeds(db, agent_id, max_seeds - len(seeds), execution_success))
+    return await run_generation(
+        run_id, agent_id, seeds[:max_seeds], count, seed=seed, processes=processes,
+        drop_near_duplicates=drop_near_duplicates
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("agent_id")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=settings.SYNTHETIC_PROCESSES)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--run-id", default=None, help="re-use a run id to resume it idempotently")
+    parser.add_argument("--drop-near-duplicates", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(generate_for_agent(
+        args.run_id or str(uuid.uuid4()), args.agent_id, args.count,
+        seed=args.seed, processes=args.processes, drop_near_duplicates=args.drop_near_duplicates
+    ))
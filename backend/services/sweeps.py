@@ -0,0 +1,188 @@
+"""
+Hyperparameter sweeps over fine-tuning jobs.
+
+Creating a sweep samples ``num_trials`` configurations from its search
+space (utils.sweeps) and queues one child FineTuningJob per trial, each
+budgeted ``max_resource`` steps (``epochs`` for the bundled trainers).
+The fine-tuning scheduler runs trials like any other job, so a sweep
+fans out across every scheduler's pool within the usual concurrency caps.
+
+Trials are pruned with asynchronous successive halving: whenever a trial
+reports its objective at a rung milestone, the scheduler calls
+``record_rung``, which stores the value on the sweep under a row lock
+(so schedulers judge against the same records) and cancels the trial if
+it is outside the top ``1 / reduction_factor`` at that rung. The freed
+slot goes straight to the next queued trial.
+
+Once every trial has finished, ``finish_sweep`` picks the completed trial
+with the best final objective, records its ModelVersion on the sweep and,
+with ``promote``, makes it the agent's production version.
+
+Lock order: a transaction that locks both a sweep and its trial jobs
+locks the sweep first (``lock_sweeps``), so rung recording, cancels and
+the heartbeat reaper cannot deadlock on each other.
+"""
+
+import logging
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import FineTuningJob, FineTuningStatus, FineTuningSweep, ModelVersion
+from utils.sweeps import best_trial, rung_milestones, sample_configs, survives_rung
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (FineTuningStatus.COMPLETED, FineTuningStatus.FAILED, FineTuningStatus.CANCELLED)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def sweep_payload(sweep: FineTuningSweep) -> Dict[str, Any]:
+    """What the scheduler needs to judge a trial's reports"""
+    return {
+        "id": sweep.id,
+        "objective": sweep.objective,
+        "mode": sweep.mode,
+        "milestones": rung_milestones(sweep.min_resource, sweep.max_resource, sweep.reduction_factor),
+    }
+
+
+async def create_sweep(
+    db: AsyncSession,
+    sweep: FineTuningSweep,
+    base_hyperparameters: Dict[str, Any],
+    priority: int = 0,
+    seed: Optional[int] = None
+) -> FineTuningSweep:
+    """Add ``sweep`` and one pending trial job per sampled configuration.
+    The caller commits (and notifies the schedulers)."""
+    sweep.status = FineTuningStatus.PENDING
+    sweep.rungs = {}
+    db.add(sweep)
+    configs = sample_configs(sweep.search_space, sweep.num_trials, seed)
+    db.add_all(
+        FineTuningJob(
+            id=str(uuid.uuid4()),
+            agent_id=sweep.agent_id,
+            sweep_id=sweep.id,
+            name=f"{sweep.name} #{number}",
+            status=FineTuningStatus.PENDING,
+            priority=priority,
+            training_dataset_id=sweep.training_dataset_id,
+            base_model_version_id=sweep.base_model_version_id,
+            hyperparameters={**base_hyperparameters, **config, "epochs": sweep.max_resource},
+        )
+        for number, config in enumerate(configs, start=1)
+    )
+    await db.flush()
+    return sweep
+
+
+async def lock_sweeps(db: AsyncSession, sweep_ids: Iterable[str]) -> None:
+    """Lock sweep rows in id order, before any of their trial jobs"""
+    sweep_ids = sorted(set(sweep_ids))
+    if sweep_ids:
+        await db.execute(
+            select(FineTuningSweep.id).where(FineTuningSweep.id.in_(sweep_ids))
+            .order_by(FineTuningSweep.id).with_for_update()
+        )
+
+
+async def record_rung(db: AsyncSession, sweep_id: str, job_id: str, step: int, value: float) -> bool:
+    """Record a trial's objective at a rung; returns False if the trial was
+    stopped. The caller commits."""
+    sweep = await db.scalar(select(FineTuningSweep).where(FineTuningSweep.id == sweep_id).with_for_update())
+    if sweep is None:
+        return True
+    if sweep.status == FineTuningStatus.PENDING:
+        # Skipped by a claim that found the sweep locked
+        sweep.status = FineTuningStatus.RUNNING
+    rungs = {rung: dict(values) for rung, values in (sweep.rungs or {}).items()}
+    values = rungs.setdefault(str(step), {})
+    values[job_id] = value if math.isfinite(value) else None
+    sweep.rungs = rungs
+    recorded = [math.inf if v is None else v for v in values.values()]
+    if survives_rung(recorded, value, sweep.reduction_factor, sweep.mode):
+        return True
+
+    now = _now()
+    result = await db.execute(
+        update(FineTuningJob)
+        .where(FineTuningJob.id == job_id, FineTuningJob.status == FineTuningStatus.RUNNING)
+        .values(
+            status=FineTuningStatus.CANCELLED,
+            completed_at=now,
+            updated_at=now,
+            error_message=(
+                f"Stopped early by sweep at step {step}: {sweep.objective}={value:.6g} "
+                f"outside the top 1/{sweep.reduction_factor} of {len(recorded)} trials"
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 0
+
+
+async def finish_sweep(db: AsyncSession, sweep_id: str) -> Optional[FineTuningSweep]:
+    """Complete the sweep if all its trials have finished. The caller commits."""
+    sweep = await db.scalar(select(FineTuningSweep).where(FineTuningSweep.id == sweep_id).with_for_update())
+    if sweep is None or sweep.status in FINISHED:
+        return None
+    unfinished = await db.scalar(
+        select(func.count()).select_from(FineTuningJob)
+        .where(FineTuningJob.sweep_id == sweep_id, FineTuningJob.status.notin_(FINISHED))
+    )
+    if unfinished:
+        return None
+
+    completed = (await db.execute(
+        select(FineTuningJob.id, FineTuningJob.metrics, FineTuningJob.new_model_version_id)
+        .where(FineTuningJob.sweep_id == sweep_id, FineTuningJob.status == FineTuningStatus.COMPLETED)
+    )).all()
+    versions = {job_id: version_id for job_id, _, version_id in completed if version_id}
+    best = best_trial(
+        {job_id: (metrics or {}).get(sweep.objective) for job_id, metrics, _ in completed if job_id in versions},
+        sweep.mode
+    )
+
+    now = _now()
+    sweep.completed_at = now
+    sweep.updated_at = now
+    if best is None:
+        sweep.status = FineTuningStatus.FAILED
+        logger.warning(f"Sweep {sweep_id} finished without a completed trial")
+        return sweep
+
+    sweep.status = FineTuningStatus.COMPLETED
+    sweep.best_job_id = best
+    sweep.best_model_version_id = versions[best]
+    if sweep.promote:
+        await db.execute(
+            update(ModelVersion)
+            .where(ModelVersion.agent_id == sweep.agent_id)
+            .values(is_production=ModelVersion.id == versions[best])
+            .execution_options(synchronize_session=False)
+        )
+    logger.info(f"Sweep {sweep_id} completed; best trial {best} -> model version {versions[best]}")
+    return sweep
+
+
+async def cancel_sweep(db: AsyncSession, sweep: FineTuningSweep) -> None:
+    """Cancel every unfinished trial and the sweep. The caller commits."""
+    now = _now()
+    await db.execute(
+        update(FineTuningJob)
+        .where(FineTuningJob.sweep_id == sweep.id, FineTuningJob.status.notin_(FINISHED))
+        .values(status=FineTuningStatus.CANCELLED, completed_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    sweep.status = FineTuningStatus.CANCELLED
+    sweep.completed_at = now
+    sweep.updated_at = now
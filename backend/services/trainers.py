@@ -0,0 +1,117 @@
+"""
+Fine-tuning trainers.
+
+A trainer is any picklable callable ``trainer(job: dict, report) -> dict``
+run inside the scheduler's process pool (services.fine_tuning_scheduler).
+``job`` holds the job's id, agent, dataset, base model version and
+hyperparameters; ``report(step, metrics)`` publishes intermediate metrics
+and returns False once the job should stop (cancelled, or early-stopped),
+after which the trainer should return promptly. The returned dict has the
+final ``metrics`` and the ``model_path`` of the trained artifact. Select
+one with FINE_TUNING_TRAINER as a ``module:function`` path.
+"""
+
+import hashlib
+import importlib
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from config import settings
+
+Report = Callable[[int, Dict[str, Any]], bool]
+Trainer = Callable[[Dict[str, Any], Report], Dict[str, Any]]
+
+
+def load_trainer(path: str = settings.FINE_TUNING_TRAINER) -> Trainer:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def run_trainer(trainer_path: str, job: Dict[str, Any], events, stop_flags) -> Dict[str, Any]:
+    """Pool entry point: run the trainer and collect its reports.
+
+    Reports go to the ``events`` queue as ``(job_id, step, metrics)``;
+    the trainer is told to stop once ``stop_flags[job_id]`` is set. A
+    trainer error is returned as ``error`` with the history so far.
+    """
+    history: List[Dict[str, Any]] = []
+    stopped = False
+
+    def report(step: int, metrics: Dict[str, Any]) -> bool:
+        nonlocal stopped
+        history.append({"step": step, **metrics})
+        events.put((job["id"], step, metrics))
+        stopped = stopped or bool(stop_flags.get(job["id"], False))
+        return not stopped
+
+    try:
+        result = load_trainer(trainer_path)(job, report)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "history": history, "stopped": stopped}
+    return {"result": result, "history": history, "stopped": stopped}
+
+
+def model_dir(job_id: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "models", job_id)
+
+
+def _seed(*parts: Any) -> int:
+    return int.from_bytes(hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=8).digest(), "big")
+
+
+def dummy_trainer(job: Dict[str, Any], report: Report) -> Dict[str, Any]:
+    """CPU-only stand-in for a real trainer.
+
+    Fits a small linear model with minibatch SGD on synthetic data seeded
+    by the job's dataset, so loss curves respond to ``learning_rate``,
+    ``batch_size`` and ``epochs`` the way a real run would and sweeps have
+    something to compare. ``seconds_per_epoch`` slows it down for trying
+    out heartbeats and cancellation.
+    """
+    params = job.get("hyperparameters") or {}
+    epochs = max(1, int(params.get("epochs", 3)))
+    learning_rate = float(params.get("learning_rate", 0.01))
+    batch_size = max(1, int(params.get("batch_size", 32)))
+    examples = int(params.get("examples", 1024))
+    features = int(params.get("features", 16))
+    pause = float(params.get("seconds_per_epoch", 0.0))
+
+    data_rng = random.Random(_seed(job.get("training_dataset_id"), features))
+    true_weights = [data_rng.gauss(0, 1) for _ in range(features)]
+    rows: List[List[float]] = [[data_rng.gauss(0, 1) for _ in range(features)] for _ in range(examples)]
+    targets = [sum(w * x for w, x in zip(true_weights, row)) + data_rng.gauss(0, 0.1) for row in rows]
+
+    rng = random.Random(_seed(job["id"]))
+    weights = [0.0] * features
+    order = list(range(examples))
+    loss = math.inf
+    for epoch in range(1, epochs + 1):
+        rng.shuffle(order)
+        for start in range(0, examples, batch_size):
+            batch = order[start:start + batch_size]
+            gradient = [0.0] * features
+            for i in batch:
+                error = sum(w * x for w, x in zip(weights, rows[i])) - targets[i]
+                for k in range(features):
+                    gradient[k] += error * rows[i][k]
+            for k in range(features):
+                weights[k] -= learning_rate * gradient[k] / len(batch)
+
+        residuals = (sum(w * x for w, x in zip(weights, row)) - target for row, target in zip(rows, targets))
+        loss = sum(r * r for r in residuals) / examples
+        if not math.isfinite(loss):
+            raise ValueError(f"Training diverged at epoch {epoch} (learning_rate={learning_rate})")
+        if pause:
+            time.sleep(pause)
+        if not report(epoch, {"epoch": epoch, "loss": loss}):
+            break
+
+    path = model_dir(job["id"])
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "weights.json"), "w") as f:
+        json.dump({"weights": weights, "hyperparameters": params}, f)
+    return {"metrics": {"loss": loss, "epochs": epoch}, "model_path": path}
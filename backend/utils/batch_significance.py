@@ -0,0 +1,145 @@
+"""
+Vectorized challenger-vs-baseline significance for many A/B tests at once.
+
+Every function takes NumPy arrays with one element per (test, challenger)
+pair, so hundreds of tests are analyzed in a handful of array operations
+instead of a Python loop per test. The statistics match
+``utils.significance.compare_proportions``; bootstrap intervals for the
+relative lift are parametric (binomial resampling of both arms) and drawn
+in row chunks so memory stays bounded by ``chunk_rows * resamples``.
+"""
+
+from statistics import NormalDist
+from typing import Dict, Optional
+
+import numpy as np
+
+# Abramowitz & Stegun 7.1.26 (|error| < 1.5e-7); NumPy has no erfc
+_ERFC_P = 0.3275911
+_ERFC_A = (0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429)
+
+
+def erfc(x: np.ndarray) -> np.ndarray:
+    ax = np.abs(x)
+    t = 1.0 / (1.0 + _ERFC_P * ax)
+    a1, a2, a3, a4, a5 = _ERFC_A
+    y = t * (a1 + t * (a2 + t * (a3 + t * (a4 + t * a5)))) * np.exp(-ax * ax)
+    return np.where(x >= 0, y, 2.0 - y)
+
+
+def msprt_p_values(difference: np.ndarray, variance: np.ndarray, tau: float) -> np.ndarray:
+    tau2 = tau * tau
+    log_ratio = 0.5 * np.log(variance / (variance + tau2)) + (
+        tau2 * difference * difference / (2 * variance * (variance + tau2))
+    )
+    return np.minimum(1.0, np.exp(-log_ratio))
+
+
+def bootstrap_lift_interval(
+    base_n: np.ndarray,
+    base_p: np.ndarray,
+    n: np.ndarray,
+    p: np.ndarray,
+    confidence: float,
+    resamples: int,
+    rng: np.random.Generator,
+    chunk_rows: int = 256
+):
+    """Percentile interval of the relative lift under binomial resampling"""
+    tail = (1 - confidence) / 2 * 100
+    low = np.full(len(n), np.nan)
+    high = np.full(len(n), np.nan)
+    valid = np.flatnonzero((base_n > 0) & (n > 0) & (base_p > 0))
+    for start in range(0, len(valid), chunk_rows):
+        rows = valid[start:start + chunk_rows]
+        base = rng.binomial(base_n[rows, None], base_p[rows, None], (len(rows), resamples)) / base_n[rows, None]
+        arm = rng.binomial(n[rows, None], p[rows, None], (len(rows), resamples)) / n[rows, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lift = (arm - base) / base
+        lift[~np.isfinite(lift)] = np.nan
+        low[rows], high[rows] = np.nanpercentile(lift, [tail, 100 - tail], axis=1)
+    return low, high
+
+
+def analyze_pairs(
+    base_s: np.ndarray,
+    base_n: np.ndarray,
+    s: np.ndarray,
+    n: np.ndarray,
+    confidence: float = 0.95,
+    tau: float = 0.05,
+    resamples: int = 1000,
+    seed: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """Success-rate comparison for every (baseline, challenger) pair.
+
+    Pairs without data on both arms (or zero variance) get NaN.
+    """
+    base_s, base_n, s, n = (np.asarray(a, dtype=np.float64) for a in (base_s, base_n, s, n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base_p = np.where(base_n > 0, base_s / base_n, np.nan)
+        p = np.where(n > 0, s / n, np.nan)
+        variance = base_p * (1 - base_p) / base_n + p * (1 - p) / n
+        variance = np.where(variance > 0, variance, np.nan)
+        se = np.sqrt(variance)
+        difference = p - base_p
+        z = difference / se
+        lift = np.where(base_p > 0, difference / base_p, np.nan)
+        sequential = msprt_p_values(difference, variance, tau)
+
+    z_crit = NormalDist().inv_cdf(0.5 + confidence / 2)
+    lift_low, lift_high = bootstrap_lift_interval(
+        base_n.astype(np.int64), np.nan_to_num(base_p), n.astype(np.int64), np.nan_to_num(p),
+        confidence, resamples, np.random.default_rng(seed)
+    ) if resamples else (np.full(len(n), np.nan), np.full(len(n), np.nan))
+
+    return {
+        "base_rate": base_p,
+        "rate": p,
+        "difference": difference,
+        "difference_low": difference - z_crit * se,
+        "difference_high": difference + z_crit * se,
+        "lift": lift,
+        "lift_low": lift_low,
+        "lift_high": lift_high,
+        "z": z,
+        "p_value": erfc(np.abs(z) / np.sqrt(2)),
+        "sequential_p_value": sequential,
+    }
+
+
+def select_winners(
+    pair_test: np.ndarray,
+    difference: np.ndarray,
+    sequential_p_value: np.ndarray,
+    challengers: np.ndarray,
+    current_confidence: np.ndarray,
+    alpha: float
+) -> Dict[str, np.ndarray]:
+    """Per-test confidence and winner from the pair results.
+
+    ``pair_test`` maps each pair to its test's position; ``challengers``
+    and ``current_confidence`` are per test. Confidence is one minus the
+    best Bonferroni-adjusted sequential p-value and never decreases. The
+    returned ``winner_pair`` is the winning pair's index, -1 for the
+    baseline and -2 for no winner yet.
+    """
+    tests = len(challengers)
+    adjusted = np.minimum(1.0, np.nan_to_num(sequential_p_value, nan=1.0) * challengers[pair_test])
+
+    best_pair = np.full(tests, -1)
+    order = np.lexsort((adjusted, pair_test))
+    present, first = np.unique(pair_test[order], return_index=True)
+    best_pair[present] = order[first]
+
+    best_adjusted = np.ones(tests)
+    best_adjusted[present] = adjusted[best_pair[present]]
+    confidence = np.fmax(np.nan_to_num(current_confidence, nan=0.0), 1.0 - best_adjusted)
+
+    winner_pair = np.full(tests, -2)
+    decided = (confidence >= 1 - alpha) & (best_pair >= 0)
+    improves = np.zeros(tests, dtype=bool)
+    improves[present] = difference[best_pair[present]] > 0
+    winner_pair[decided & improves] = best_pair[decided & improves]
+    winner_pair[decided & ~improves] = -1
+    return {"confidence": confidence, "winner_pair": winner_pair, "best_pair": best_pair}
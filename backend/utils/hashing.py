@@ -0,0 +1,62 @@
+"""
+Content hashing for training examples.
+
+``content_hash`` identifies an example by its normalized input/output so
+trivially different copies (key order, surrounding or repeated
+whitespace) dedupe to the same hash. ``SetHash`` is an order-independent
+hash of a set of content hashes: it is the sum of the digests modulo
+2**256, so adding examples updates it in O(added) without rehashing the
+whole dataset.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Iterable
+
+_WHITESPACE = re.compile(r"\s+")
+_MODULUS = 1 << 256
+
+
+def normalize_payload(value: Any) -> Any:
+    """Recursively collapse whitespace in strings; containers keep their shape"""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {str(k): normalize_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(v) for v in value]
+    return value
+
+
+def content_hash(input_data: Any, output_data: Any) -> str:
+    canonical = json.dumps(
+        {"input": normalize_payload(input_data), "output": normalize_payload(output_data)},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SetHash:
+    """Incremental, order-independent hash over a set of hex digests"""
+
+    PREFIX = "sum256:"
+
+    def __init__(self, state: int = 0):
+        self.state = state % _MODULUS
+
+    def add(self, digest: str) -> None:
+        self.state = (self.state + int(digest, 16)) % _MODULUS
+
+    def update(self, digests: Iterable[str]) -> None:
+        for digest in digests:
+            self.add(digest)
+
+    def hexdigest(self) -> str:
+        return f"{self.PREFIX}{self.state:064x}"
+
+    @classmethod
+    def from_hexdigest(cls, value: str) -> "SetHash":
+        if not value:
+            return cls()
+        return cls(int(value[len(cls.PREFIX):] if value.startswith(cls.PREFIX) else value, 16))
@@ -0,0 +1,254 @@
+"""
+MinHash signatures and a locality-sensitive hashing index for spotting
+near-duplicate JSON inputs.
+
+An input is normalized to the lowercase word tokens of its values, taken
+in sorted-key order (so key order, punctuation, case and whitespace do
+not matter, and neither do key names, which inputs of one agent mostly
+share), and cut into overlapping word shingles. ``MinHasher`` turns the
+shingle set into a fixed-size signature whose per-slot agreement with
+another signature estimates the Jaccard similarity of the two sets.
+
+``LSHIndex`` splits each signature into ``bands`` bands and buckets items
+by band, so a lookup only compares against items sharing at least one
+band with the query instead of against every item. With the defaults
+(128 permutations, 16 bands of 8 rows) a pair at similarity 0.8 shares a
+band with probability ~0.95 and a pair at 0.5 with ~0.06; candidates are
+then checked against the estimated similarity, so results never include
+pairs below the threshold asked for.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+DEFAULT_PERMUTATIONS = 128
+DEFAULT_BANDS = 16
+SHINGLE_WORDS = 2
+
+_TOKEN = re.compile(r"\w+")
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SORT_KEY_MASK = np.int64((1 << 48) - 1)
+
+
+def _values(value: Any) -> Iterator[str]:
+    """Scalar values of a JSON value as text, objects in sorted-key order"""
+    if isinstance(value, dict):
+        for key in sorted(value, key=str):
+            yield from _values(value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _values(item)
+    elif value is not None:
+        yield value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def shingles(value: Any, size: int = SHINGLE_WORDS) -> Set[str]:
+    """Word ``size``-grams of a JSON value's normalized values (keys excluded)"""
+    tokens = _TOKEN.findall(" ".join(_values(value)).lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class MinHasher:
+    """Signatures from ``num_perm`` universal hash functions.
+
+    Functions are drawn from ``seed``, so signatures are only comparable
+    between hashers built with the same ``num_perm`` and ``seed``.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_PERMUTATIONS, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # a, b < 2**32 keep a * h + b inside uint64 for 32-bit h
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in tokens),
+            dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def signature_of(self, value: Any) -> np.ndarray:
+        return self.signature(shingles(value))
+
+
+class LSHIndex:
+    """Banded LSH index from keys to MinHash signatures.
+
+    Holds at most ``max_items`` signatures; past that the oldest are
+    evicted. Not thread-safe.
+
+    Storage is a few NumPy arrays rather than per-band dicts: signatures
+    and band hashes live in row slots, and each band has a sorted array
+    of (hash, slot) pairs searched with ``searchsorted`` (all bands in one
+    array, the band number in the key's top bits). Items added
+    since the last sort sit in a small dict that lookups also check;
+    the sorted arrays are rebuilt once the tail (or the number of removed
+    slots they still reference) grows past a fraction of the index. That
+    keeps an item at about 1 KB at 128 permutations and 16 bands.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = DEFAULT_PERMUTATIONS,
+        bands: int = DEFAULT_BANDS,
+        max_items: Optional[int] = None
+    ):
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} permutations do not split into {bands} bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_items = max_items
+        # key -> slot, oldest first
+        self._slots: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._keys: List[Optional[Hashable]] = []
+        self._free: List[int] = []
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        # Band keys are Python hashes of the band bytes: an index never
+        # leaves its process, and an int64 is far smaller than the bytes
+        self._band_hashes = np.empty((0, bands), dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        # One sorted array over all bands: (band << 48) | low 48 hash bits
+        self._band_offsets = np.arange(bands, dtype=np.int64) << 48
+        self._sorted_keys = np.empty(0, dtype=np.int64)
+        self._sorted_slots = np.empty(0, dtype=np.int32)
+        # Sort key -> slots added since the last sort
+        self._tail: Dict[int, List[int]] = {}
+        self._tail_size = 0
+        self._stale = 0
+
+    def _band_keys(self, signature: np.ndarray) -> np.ndarray:
+        if len(signature) != self.num_perm:
+            raise ValueError(f"Expected a signature of {self.num_perm} values, got {len(signature)}")
+        data = np.ascontiguousarray(signature, dtype=np.uint32).tobytes()
+        width = self.rows * 4
+        return np.array([hash(data[i * width:(i + 1) * width]) for i in range(self.bands)], dtype=np.int64)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        slot = len(self._keys)
+        if slot == len(self._signatures):
+            capacity = max(16, slot * 2)
+            if self.max_items is not None:
+                capacity = min(capacity, self.max_items + 1)
+            self._signatures = np.resize(self._signatures, (capacity, self.num_perm))
+            self._band_hashes = np.resize(self._band_hashes, (capacity, self.bands))
+            self._alive = np.resize(self._alive, capacity)
+        self._keys.append(None)
+        return slot
+
+    def _sort_keys(self, band_hashes: np.ndarray) -> np.ndarray:
+        return (band_hashes & _SORT_KEY_MASK) | self._band_offsets
+
+    def _resort(self) -> None:
+        slots = np.fromiter(self._slots.values(), dtype=np.int32, count=len(self._slots))
+        keys = self._sort_keys(self._band_hashes[slots]).ravel()
+        order = np.argsort(keys)
+        self._sorted_keys = keys[order]
+        self._sorted_slots = np.repeat(slots, self.bands)[order]
+        self._tail = {}
+        self._tail_size = 0
+        self._stale = 0
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        band_keys = self._band_keys(signature)
+        if key in self._slots:
+            self.remove(key)
+        slot = self._allocate()
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._signatures[slot] = signature
+        self._band_hashes[slot] = band_keys
+        self._alive[slot] = True
+        for sort_key in self._sort_keys(band_keys).tolist():
+            self._tail.setdefault(sort_key, []).append(slot)
+        self._tail_size += 1
+        while self.max_items is not None and len(self._slots) > self.max_items:
+            self.remove(next(iter(self._slots)))
+        if self._tail_size + self._stale > max(1024, len(self._slots) // 16):
+            self._resort()
+
+    def remove(self, key: Hashable) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._keys[slot] = None
+        self._alive[slot] = False
+        self._free.append(slot)
+        # Sorted arrays still point at the slot; lookups check the owner
+        self._stale += 1
+
+    def _candidate_slots(self, signature: np.ndarray) -> np.ndarray:
+        band_keys = self._band_keys(signature)
+        sort_keys = self._sort_keys(band_keys)
+        found: Set[int] = set()
+        if len(self._sorted_keys):
+            starts = self._sorted_keys.searchsorted(sort_keys, "left")
+            ends = self._sorted_keys.searchsorted(sort_keys, "right")
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    found.update(self._sorted_slots[start:end].tolist())
+        for sort_key in sort_keys.tolist():
+            found.update(self._tail.get(sort_key, ()))
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        slots = np.fromiter(found, dtype=np.int32, count=len(found))
+        # Drop removed slots, and reused ones whose new item shares no band
+        slots = slots[self._alive[slots]]
+        return slots[(self._band_hashes[slots] == band_keys).any(axis=1)]
+
+    def candidates(self, signature: np.ndarray) -> Set[Hashable]:
+        """Keys sharing at least one band with ``signature``"""
+        return {self._keys[slot] for slot in self._candidate_slots(signature)}
+
+    def query(
+        self,
+        signature: np.ndarray,
+        threshold: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """Keys at estimated similarity >= ``threshold``, most similar first"""
+        slots = self._candidate_slots(signature)
+        if not len(slots):
+            return []
+        scores = np.count_nonzero(self._signatures[slots] == signature, axis=1) / self.num_perm
+        order = np.argsort(-scores, kind="stable")
+        matches = [(self._keys[slots[i]], float(scores[i])) for i in order if scores[i] >= threshold]
+        return matches[:limit] if limit is not None else matches
+
+    def find_duplicate(self, signature: np.ndarray, threshold: float) -> Optional[Hashable]:
+        """Any key at estimated similarity >= ``threshold``, or None"""
+        matches = self.query(signature, threshold, limit=1)
+        return matches[0][0] if matches else None
+
+    def add_unless_duplicate(self, key: Hashable, signature: np.ndarray, threshold: float) -> Optional[Hashable]:
+        """Add ``key`` unless it near-duplicates an indexed key; returns that key"""
+        duplicate = self.find_duplicate(signature, threshold)
+        if duplicate is None:
+            self.add(key, signature)
+        return duplicate
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
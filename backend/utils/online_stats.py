@@ -0,0 +1,113 @@
+"""
+Mergeable online accumulators.
+
+``RunningStats`` keeps count, mean and the sum of squared deviations
+(Welford), so a value is folded in with O(1) work and no history, and two
+accumulators merge exactly (Chan et al.) -- per-period accumulators from
+several workers combine into the same result as one pass over all values.
+``VariantStats`` bundles the accumulators an A/B variant needs.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+
+class RunningStats:
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: Optional[float]) -> None:
+        if value is None:
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "RunningStats") -> None:
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 with fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def mean_or_none(self) -> Optional[float]:
+        return self.mean if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "RunningStats":
+        if not data:
+            return cls()
+        return cls(data["count"], data["mean"], data["m2"])
+
+
+class VariantStats:
+    """Executions, successes and running execution time / cost / rating"""
+
+    METRICS = ("execution_time", "cost", "rating")
+
+    def __init__(self):
+        self.executions = 0
+        self.successes = 0
+        self.execution_time = RunningStats()
+        self.cost = RunningStats()
+        self.rating = RunningStats()
+
+    def add_execution(
+        self,
+        success: Optional[bool],
+        execution_time_ms: Optional[float] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        self.executions += 1
+        if success:
+            self.successes += 1
+        self.execution_time.add(execution_time_ms)
+        self.cost.add(cost)
+
+    def add_rating(self, rating: Optional[float]) -> None:
+        self.rating.add(rating)
+
+    def merge(self, other: "VariantStats") -> None:
+        self.executions += other.executions
+        self.successes += other.successes
+        for name in self.METRICS:
+            getattr(self, name).merge(getattr(other, name))
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return self.successes / self.executions if self.executions else None
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """Accumulator state for ``ABTestResult.metrics``"""
+        return {name: getattr(self, name).to_dict() for name in self.METRICS}
+
+    @classmethod
+    def from_result(cls, executions: int, successes: int, metrics: Optional[Dict[str, Any]]) -> "VariantStats":
+        stats = cls()
+        stats.executions = executions or 0
+        stats.successes = successes or 0
+        for name in cls.METRICS:
+            setattr(stats, name, RunningStats.from_dict((metrics or {}).get(name)))
+        return stats
@@ -0,0 +1,79 @@
+"""
+Keyset pagination over ``(created_at, id)``.
+
+Cursors are opaque URL-safe strings. A page is fetched with
+``WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC``
+so every page costs the same index range scan regardless of depth, and rows
+inserted after the walk started never shift later pages.
+
+``paginate`` and ``set_next_cursor`` are the list endpoints' side of it:
+the cursor comes in as a query parameter and goes out in the
+``X-Next-Cursor`` response header.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(query, created_at_column, id_column, cursor: Optional[str]):
+    """Order newest-first and, given a cursor, start strictly after it"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """Cursor for the page after ``items``, or None when this was the last page"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def _bad_request(detail: str):
+    from fastapi import HTTPException, status
+
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def paginate(query, created_at_column, id_column, cursor: Optional[str], skip: int):
+    """Apply keyset pagination when a cursor is given, legacy OFFSET otherwise.
+
+    Raises a 400 HTTPException for a malformed cursor or a cursor with skip.
+    """
+    if cursor and skip:
+        raise _bad_request("Use either cursor or skip, not both")
+    try:
+        query = keyset_page(query, created_at_column, id_column, cursor)
+    except ValueError as e:
+        raise _bad_request(str(e))
+    return query.offset(skip) if skip else query
+
+
+def set_next_cursor(response, items: Sequence, limit: int) -> None:
+    """Put the cursor for the page after ``items`` in ``response``'s headers"""
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,184 @@
+"""
+Offline JSON mutations for synthetic scenario variants.
+
+``mutate_json`` copies a JSON value and applies a few random mutations at
+random places in it: character typos, case and whitespace changes,
+truncation and word-order changes in strings, jitter in numbers, shuffled,
+dropped and duplicated list items, and dropped object keys. Some
+mutations produce edge cases (empty, oversized or non-ASCII strings,
+boundary numbers, empty lists) that the original expected output may no
+longer fit; they are listed in ``EDGE_MUTATIONS``.
+
+Everything is driven by the ``random.Random`` passed in, so a variant is
+reproducible from its seed and index.
+"""
+
+import copy
+import random
+from typing import Any, Callable, Dict, List, Tuple
+
+Path = Tuple[Any, ...]
+
+EDGE_MUTATIONS = {"empty_string", "long_string", "unicode", "boundary_number", "empty_list", "drop_key"}
+BOUNDARY_NUMBERS = (0, -1, 1, 2 ** 31 - 1, -(2 ** 31))
+UNICODE_SAMPLES = ("éèê", "你好", "مرحبا", "\U0001F600", "​")
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    if len(text) < 2:
+        return text + text
+    i = rng.randrange(len(text) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    return text[:i] + text[i] + text[i:]
+
+
+def _shuffle_words(text: str, rng: random.Random) -> str:
+    words = text.split()
+    if len(words) < 2:
+        return text
+    i, j = rng.sample(range(len(words)), 2)
+    words[i], words[j] = words[j], words[i]
+    return " ".join(words)
+
+
+def _drop_word(text: str, rng: random.Random) -> str:
+    words = text.split()
+    if len(words) < 2:
+        return text
+    del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+STRING_MUTATIONS: Dict[str, Callable[[str, random.Random], str]] = {
+    "typo": _typo,
+    "uppercase": lambda text, rng: text.upper(),
+    "lowercase": lambda text, rng: text.lower(),
+    "whitespace": lambda text, rng: " " * rng.randint(1, 3) + text + " " * rng.randint(1, 3),
+    "truncate": lambda text, rng: text[:max(1, len(text) // 2)],
+    "shuffle_words": _shuffle_words,
+    "drop_word": _drop_word,
+    "empty_string": lambda text, rng: "",
+    "long_string": lambda text, rng: (text or "x") * rng.randint(10, 50),
+    "unicode": lambda text, rng: text + rng.choice(UNICODE_SAMPLES),
+}
+
+
+def _jitter(number: Any, rng: random.Random) -> Any:
+    value = number * rng.uniform(0.5, 1.5) if number else rng.uniform(-10, 10)
+    return int(round(value)) if isinstance(number, int) else value
+
+
+NUMBER_MUTATIONS: Dict[str, Callable[[Any, random.Random], Any]] = {
+    "jitter": _jitter,
+    "negate": lambda number, rng: -number,
+    "boundary_number": lambda number, rng: rng.choice(BOUNDARY_NUMBERS),
+}
+
+
+def _shuffle_list(items: List[Any], rng: random.Random) -> List[Any]:
+    items = list(items)
+    rng.shuffle(items)
+    return items
+
+
+def _drop_item(items: List[Any], rng: random.Random) -> List[Any]:
+    items = list(items)
+    if items:
+        del items[rng.randrange(len(items))]
+    return items
+
+
+def _duplicate_item(items: List[Any], rng: random.Random) -> List[Any]:
+    items = list(items)
+    if items:
+        i = rng.randrange(len(items))
+        items.insert(i, copy.deepcopy(items[i]))
+    return items
+
+
+LIST_MUTATIONS: Dict[str, Callable[[List[Any], random.Random], List[Any]]] = {
+    "shuffle_list": _shuffle_list,
+    "drop_item": _drop_item,
+    "duplicate_item": _duplicate_item,
+    "empty_list": lambda items, rng: [],
+}
+
+
+def _drop_key(obj: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    obj = dict(obj)
+    if len(obj) > 1:
+        del obj[rng.choice(sorted(obj))]
+    return obj
+
+
+DICT_MUTATIONS: Dict[str, Callable[[Dict[str, Any], random.Random], Dict[str, Any]]] = {
+    "drop_key": _drop_key,
+}
+
+
+def _mutations_for(value: Any) -> Dict[str, Callable]:
+    if isinstance(value, bool) or value is None:
+        return {}
+    if isinstance(value, str):
+        return STRING_MUTATIONS
+    if isinstance(value, (int, float)):
+        return NUMBER_MUTATIONS
+    if isinstance(value, list):
+        return LIST_MUTATIONS
+    if isinstance(value, dict):
+        return DICT_MUTATIONS
+    return {}
+
+
+def mutable_paths(value: Any, prefix: Path = ()) -> List[Path]:
+    """Paths of every node some mutation applies to, in a stable order"""
+    paths = [prefix] if _mutations_for(value) else []
+    if isinstance(value, dict):
+        for key in sorted(value):
+            paths.extend(mutable_paths(value[key], prefix + (key,)))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            paths.extend(mutable_paths(item, prefix + (i,)))
+    return paths
+
+
+def _resolve(root: Any, path: Path) -> Tuple[bool, Any]:
+    node = root
+    for step in path:
+        try:
+            node = node[step]
+        except (KeyError, IndexError, TypeError):
+            return False, None
+    return True, node
+
+
+def mutate_json(value: Any, rng: random.Random, max_mutations: int = 3) -> Tuple[Any, List[str]]:
+    """A mutated copy of ``value`` and the names of the mutations applied"""
+    result = copy.deepcopy(value)
+    paths = mutable_paths(result)
+    if not paths:
+        return result, []
+
+    targets = rng.sample(paths, min(rng.randint(1, max_mutations), len(paths)))
+    applied: List[str] = []
+    # Deepest first, so dropping a container never invalidates a later target
+    for path in sorted(targets, key=len, reverse=True):
+        found, node = _resolve(result, path)
+        if not found:
+            continue
+        mutations = _mutations_for(node)
+        if not mutations:
+            continue
+        name = rng.choice(sorted(mutations))
+        mutated = mutations[name](node, rng)
+        if not path:
+            result = mutated
+        else:
+            _, parent = _resolve(result, path[:-1])
+            parent[path[-1]] = mutated
+        applied.append(name)
+    return result, applied
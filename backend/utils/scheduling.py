@@ -0,0 +1,38 @@
+"""
+Admission control for capped job queues.
+
+``admit`` walks candidates in queue order (highest priority first) and
+takes each one whose group still has room, until the global budget is
+spent. Candidates without a group are bounded only by the global budget.
+Skipping a capped group never blocks the jobs queued behind it, so one
+busy organization cannot starve the others.
+"""
+
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def admit(
+    candidates: Sequence[Tuple[T, Optional[Hashable]]],
+    running: Dict[Hashable, int],
+    free_slots: int,
+    per_group_cap: int
+) -> List[T]:
+    """Pick ``(item, group)`` candidates that fit the caps.
+
+    ``running`` counts the jobs each group already has; ``free_slots`` is
+    what is left of the global cap.
+    """
+    taken: Counter = Counter()
+    admitted: List[T] = []
+    for item, group in candidates:
+        if len(admitted) >= free_slots:
+            break
+        if group is not None:
+            if running.get(group, 0) + taken[group] >= per_group_cap:
+                continue
+            taken[group] += 1
+        admitted.append(item)
+    return admitted
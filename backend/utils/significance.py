@@ -0,0 +1,55 @@
+"""
+Significance tests for comparing a challenger variant to a baseline.
+
+``compare_proportions`` reports both a fixed-horizon two-proportion z-test
+and a sequential p-value from the mixture SPRT (mSPRT) with a normal
+mixing distribution of variance ``tau ** 2`` over the true difference.
+The sequential p-value stays valid however often it is checked, so a
+test can be stopped as soon as it drops below alpha; keeping the running
+minimum across checks is what makes it "always valid".
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+
+def normal_sf(z: float) -> float:
+    """P(Z > z) for a standard normal"""
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def msprt_p_value(difference: float, variance: float, tau: float) -> float:
+    """1 / likelihood ratio of the normal-mixture SPRT, capped at 1"""
+    tau2 = tau * tau
+    # log of sqrt(V / (V + tau2)) * exp(tau2 * d^2 / (2 V (V + tau2)))
+    log_ratio = 0.5 * math.log(variance / (variance + tau2)) + (
+        tau2 * difference * difference / (2 * variance * (variance + tau2))
+    )
+    return min(1.0, math.exp(-log_ratio))
+
+
+def compare_proportions(
+    baseline_successes: int,
+    baseline_total: int,
+    successes: int,
+    total: int,
+    tau: float = 0.05
+) -> Optional[Dict[str, Any]]:
+    """Challenger vs baseline success rate, or None without enough data"""
+    if not baseline_total or not total:
+        return None
+    p_base = baseline_successes / baseline_total
+    p = successes / total
+    variance = p_base * (1 - p_base) / baseline_total + p * (1 - p) / total
+    if variance <= 0:
+        return None
+
+    difference = p - p_base
+    z = difference / math.sqrt(variance)
+    return {
+        "difference": difference,
+        "lift": difference / p_base if p_base else None,
+        "z": z,
+        "p_value": 2 * normal_sf(abs(z)),
+        "sequential_p_value": msprt_p_value(difference, variance, tau),
+    }
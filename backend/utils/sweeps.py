@@ -0,0 +1,100 @@
+"""
+Hyperparameter sweep helpers.
+
+``sample_configs`` draws trial configurations from a search space, where
+each parameter is a fixed value or a spec dict::
+
+    {"learning_rate": {"type": "loguniform", "low": 1e-4, "high": 1e-1},
+     "batch_size": {"type": "choice", "values": [16, 32, 64]},
+     "warmup": {"type": "int", "low": 0, "high": 100},
+     "dropout": {"type": "uniform", "low": 0.0, "high": 0.5},
+     "epochs": 27}
+
+``rung_milestones`` and ``survives_rung`` implement the stopping rule of
+asynchronous successive halving (ASHA): rungs sit at
+``min_resource * reduction_factor ** k`` training steps, and a trial
+reaching a rung keeps training only if its objective is among the top
+``1 / reduction_factor`` of every value recorded at that rung so far.
+Decisions never wait for other trials, so no worker idles at a rung.
+"""
+
+import math
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+PARAM_TYPES = ("choice", "uniform", "loguniform", "int")
+MODES = ("min", "max")
+
+
+def validate_space(space: Dict[str, Any]) -> None:
+    """Raise ValueError for a malformed search space"""
+    for name, spec in space.items():
+        if not isinstance(spec, dict):
+            continue
+        kind = spec.get("type")
+        if kind not in PARAM_TYPES:
+            raise ValueError(f"{name}: type must be one of {', '.join(PARAM_TYPES)}")
+        if kind == "choice":
+            if not spec.get("values"):
+                raise ValueError(f"{name}: choice needs a non-empty 'values' list")
+            continue
+        if "low" not in spec or "high" not in spec or spec["low"] > spec["high"]:
+            raise ValueError(f"{name}: {kind} needs 'low' <= 'high'")
+        if kind == "loguniform" and spec["low"] <= 0:
+            raise ValueError(f"{name}: loguniform needs a positive 'low'")
+
+
+def _sample(spec: Any, rng: random.Random) -> Any:
+    if not isinstance(spec, dict):
+        return spec
+    kind = spec["type"]
+    if kind == "choice":
+        return rng.choice(spec["values"])
+    if kind == "uniform":
+        return rng.uniform(spec["low"], spec["high"])
+    if kind == "loguniform":
+        return math.exp(rng.uniform(math.log(spec["low"]), math.log(spec["high"])))
+    return rng.randint(int(spec["low"]), int(spec["high"]))
+
+
+def sample_configs(space: Dict[str, Any], count: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{name: _sample(spec, rng) for name, spec in sorted(space.items())} for _ in range(count)]
+
+
+def rung_milestones(min_resource: int, max_resource: int, reduction_factor: int) -> List[int]:
+    """Steps at which trials are judged (the full budget is not a rung)"""
+    if min_resource < 1 or reduction_factor < 2:
+        raise ValueError("min_resource must be >= 1 and reduction_factor >= 2")
+    milestones = []
+    resource = min_resource
+    while resource < max_resource:
+        milestones.append(resource)
+        resource *= reduction_factor
+    return milestones
+
+
+def survives_rung(recorded: Sequence[float], value: float, reduction_factor: int, mode: str = "min") -> bool:
+    """Whether a trial reporting ``value`` at a rung keeps training.
+
+    ``recorded`` holds every value seen at the rung, this trial's
+    included. Until ``reduction_factor`` trials have reached the rung
+    there is too little to compare against, so everyone continues.
+    Non-finite values rank last.
+    """
+    if not math.isfinite(value):
+        return len(recorded) < reduction_factor
+    if len(recorded) < reduction_factor:
+        return True
+    worst = math.inf if mode == "min" else -math.inf
+    ranked = sorted((v if math.isfinite(v) else worst for v in recorded), reverse=mode == "max")
+    cutoff = ranked[len(recorded) // reduction_factor - 1]
+    return value <= cutoff if mode == "min" else value >= cutoff
+
+
+def best_trial(results: Dict[str, float], mode: str = "min") -> Optional[str]:
+    """Key of the best finite result"""
+    finite = {key: value for key, value in results.items() if value is not None and math.isfinite(value)}
+    if not finite:
+        return None
+    return (min if mode == "min" else max)(finite, key=finite.get)
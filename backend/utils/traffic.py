@@ -0,0 +1,62 @@
+"""
+Deterministic weighted traffic splitting.
+
+Arms are chosen by weighted rendezvous hashing: every arm scores a subject
+key with its own salted hash (BLAKE2b, salted with the split's id and
+personalized with the arm's label), the score is scaled by the arm's
+weight and the highest score wins. The same key therefore always lands on
+the same arm, splits with different salts are independent of each other,
+and changing one arm's weight only moves subjects into that arm (when it
+grows) or out of it (when it shrinks); subjects never move between the
+other arms. Adding or removing an arm likewise only moves its own
+subjects.
+"""
+
+import hashlib
+import math
+from typing import Callable, Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def _salt_bytes(salt: str) -> bytes:
+    # blake2b salts are at most 16 bytes; fold longer ids down
+    return hashlib.blake2b(salt.encode(), digest_size=16).digest()
+
+
+class WeightedSplit(Generic[T]):
+    """Assigns subject keys to arms in proportion to their weights.
+
+    ``label`` names an arm stably across weight changes; it defaults to
+    ``str(arm)``.
+    """
+
+    __slots__ = ("salt", "arms", "_weights", "_hashers")
+
+    def __init__(self, salt: str, arms: Sequence[Tuple[T, float]], label: Callable[[T], str] = str):
+        arms = [(arm, weight) for arm, weight in arms if weight > 0]
+        if not arms:
+            raise ValueError("A split needs at least one arm with positive weight")
+
+        salt_bytes = _salt_bytes(salt)
+        self.salt = salt
+        self.arms = [arm for arm, _ in arms]
+        self._weights: List[float] = [float(weight) for _, weight in arms]
+        self._hashers = [
+            hashlib.blake2b(digest_size=8, salt=salt_bytes, person=_salt_bytes(label(arm)))
+            for arm in self.arms
+        ]
+
+    def _score(self, index: int, key: bytes) -> float:
+        hasher = self._hashers[index].copy()
+        hasher.update(key)
+        # Uniform in (0, 1) from the top 53 bits; -w / ln(u) wins with probability w / sum(w)
+        uniform = ((int.from_bytes(hasher.digest(), "big") >> 11) + 0.5) / (1 << 53)
+        return -self._weights[index] / math.log(uniform)
+
+    def pick(self, subject_key: str) -> T:
+        if len(self.arms) == 1:
+            return self.arms[0]
+        key = subject_key.encode()
+        best = max(range(len(self.arms)), key=lambda index: self._score(index, key))
+        return self.arms[best]
@@ -0,0 +1,83 @@
+"""
+Celery worker and beat schedule for background jobs.
+
+    celery -A worker.celery_app worker --loglevel=info
+    celery -A worker.celery_app beat --loglevel=info
+"""
+
+import asyncio
+import logging
+from typing import Any, Coroutine, TypeVar
+
+from celery import Celery
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+celery_app = Celery("agent_gym", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        # A run that has not started by the next beat is dropped rather
+        # than piling up behind it
+        "auto-feedback": {
+            "task": "worker.auto_feedback",
+            "schedule": float(settings.AUTO_FEEDBACK_INTERVAL_SECONDS),
+            "options": {"expires": float(settings.AUTO_FEEDBACK_INTERVAL_SECONDS)},
+        },
+        "ab-analysis": {
+            "task": "worker.ab_analysis",
+            "schedule": float(settings.AB_ANALYSIS_INTERVAL_SECONDS),
+            "options": {"expires": float(settings.AB_ANALYSIS_INTERVAL_SECONDS)},
+        },
+        "partition-maintenance": {
+            "task": "worker.partition_maintenance",
+            "schedule": 24 * 60 * 60.0,
+        },
+    },
+)
+
+
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run ``coro`` on a fresh event loop.
+
+    Pooled asyncpg connections belong to the loop that opened them, so the
+    engine's pool is disposed before each task's loop closes and the next
+    task opens connections on its own loop.
+    """
+    from database import async_engine
+
+    async def main() -> T:
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(main())
+
+
+@celery_app.task(name="worker.auto_feedback")
+def auto_feedback(max_batches: int = None) -> dict:
+    """Score executions that have no feedback yet; resumes from its checkpoint"""
+    from services.auto_feedback import run_auto_feedback
+
+    return _run(run_auto_feedback(max_batches=max_batches))
+
+
+@celery_app.task(name="worker.ab_analysis")
+def ab_analysis() -> int:
+    """Re-analyze every running A/B test and write back winners/confidence"""
+    from services.ab_analysis import run_analysis
+
+    return len(_run(run_analysis()))
+
+
+@celery_app.task(name="worker.partition_maintenance")
+def partition_maintenance() -> None:
+    from services.partition_service import run_maintenance
+
+    run_maintenance()
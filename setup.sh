@@ -92,11 +92,7 @@ sleep 10
 echo "🗄️ Initializing database..."
 cd backend
 source venv/bin/activate
-python -c "
-from database import init_db
-init_db()
-print('✅ Database initialized successfully')
-"
+alembic upgrade head && echo "✅ Database initialized successfully"
 
 cd ..
 
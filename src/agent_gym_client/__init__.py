@@ -0,0 +1,16 @@
+"""
+Python client for the Agent Gym API.
+
+``AsyncAgentGymClient`` keeps a pooled ``httpx.AsyncClient`` and batches
+executions and feedback in the background; ``AgentGymClient`` wraps it for
+synchronous code by running the async client on a private event loop
+thread. Recording an execution only appends to an in-memory queue; pass
+``spool_path`` to back that queue with a DiskSpool so records survive API
+outages and restarts.
+"""
+
+from agent_gym_client.client import AgentGymClient, AsyncAgentGymClient
+from agent_gym_client.retry import RetryPolicy
+from agent_gym_client.spool import DiskSpool
+
+__all__ = ["AgentGymClient", "AsyncAgentGymClient", "DiskSpool", "RetryPolicy"]
@@ -0,0 +1,487 @@
+"""
+Async and sync Agent Gym clients with background batching.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from agent_gym_client.retry import RETRYABLE_STATUS, RetryPolicy, send_with_retry
+from agent_gym_client.spool import DEFAULT_MAX_BYTES, DiskSpool
+
+logger = logging.getLogger(__name__)
+
+EXECUTIONS = "execution"
+FEEDBACK = "feedback"
+BATCH_PATHS = {
+    EXECUTIONS: "/api/v1/agents/executions/batch",
+    FEEDBACK: "/api/v1/feedback/batch",
+}
+# Feedback can reach the server before its execution's batch; retry those
+MAX_FEEDBACK_REQUEUES = 3
+# Responses meaning "down or busy, try later" rather than "this batch fails"
+UNAVAILABLE_STATUS = {429, 502, 503, 504}
+DEAD_LETTER_SUFFIX = ".dead"
+
+
+def dead_letter_kind(kind: str) -> str:
+    return kind + DEAD_LETTER_SUFFIX
+
+
+def build_execution_record(
+    agent_id: str,
+    input_data: Dict[str, Any],
+    output_data: Optional[Dict[str, Any]] = None,
+    success: Optional[bool] = None,
+    execution_time_ms: Optional[int] = None,
+    cost: Optional[float] = None,
+    context: Optional[Dict[str, Any]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    execution_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Execution payload with a client-generated id and timestamp"""
+    return {
+        "id": execution_id or str(uuid.uuid4()),
+        "agent_id": agent_id,
+        "input_data": input_data,
+        "output_data": output_data,
+        "success": success,
+        "execution_time_ms": execution_time_ms,
+        "cost": cost,
+        "context": context or {},
+        "metadata": metadata or {},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def build_feedback_record(
+    execution_id: str,
+    rating: Optional[int] = None,
+    type: str = "rating",
+    comment: Optional[str] = None,
+    correction: Optional[str] = None,
+    binary_feedback: Optional[bool] = None,
+    reviewer_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Feedback payload for the batch feedback endpoint"""
+    return {
+        "execution_id": execution_id,
+        "type": type,
+        "rating": rating,
+        "comment": comment,
+        "correction": correction,
+        "binary_feedback": binary_feedback,
+        "reviewer_id": reviewer_id,
+        "metadata": metadata or {},
+    }
+
+
+def _is_transient(error: httpx.HTTPError) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+def _is_not_found(error: httpx.HTTPError) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404
+
+
+def _is_unavailable(error: httpx.HTTPError) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in UNAVAILABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+class AsyncAgentGymClient:
+    """Pooled async client; executions and feedback are sent in batches.
+
+    Use as ``async with AsyncAgentGymClient(...) as gym:`` or call
+    ``start()``/``close()``. ``record_execution`` and ``submit_feedback``
+    are plain methods that only enqueue; a background task flushes the
+    queues every ``flush_interval`` seconds or as soon as ``batch_size``
+    records are waiting. When ``max_pending`` records are queued the
+    oldest are dropped (counted in ``stats["dropped"]``) rather than
+    blocking the caller.
+
+    With ``spool_path`` set, queued records are moved to a DiskSpool every
+    ``flush_interval`` and a separate task drains the spool to the API.
+    Batches that fail because the API is unreachable or overloaded stay
+    spooled and are retried on the next drain, including after a restart.
+    A batch the API keeps answering with another retryable error (e.g. a
+    500) is moved to the ``<kind>.dead`` spool kind after
+    ``max_batch_attempts`` drains, so it cannot hold up the records behind
+    it. The spool is capped at ``spool_max_bytes``, evicting the oldest
+    records first.
+
+    Feedback the API answers with ``execution_not_found`` (its execution
+    is not in yet) is sent again on the next flush, up to
+    MAX_FEEDBACK_REQUEUES times, and then dropped. An execution batch
+    rejected because an agent does not exist is resent per agent, so
+    only the unknown agent's records are dropped.
+
+    Records sit in memory for up to ``flush_interval`` before they reach
+    the spool, and are lost if the process crashes in that window; lower
+    ``flush_interval`` or call ``flush()`` to narrow it.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        api_key: Optional[str] = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_pending: int = 100_000,
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        retry: Optional[RetryPolicy] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        spool_path: Optional[str] = None,
+        spool_max_bytes: int = DEFAULT_MAX_BYTES,
+        max_batch_attempts: int = 5,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self._transport = transport
+        self.spool_path = spool_path
+        self.spool_max_bytes = spool_max_bytes
+        self.max_batch_attempts = max_batch_attempts
+
+        self._executions: Deque[Dict[str, Any]] = deque()
+        self._feedback: Deque[Dict[str, Any]] = deque()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._spool: Optional[DiskSpool] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._drain_wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        # kind -> (seq at the spool head, failed drains of that batch)
+        self._head_failures: Dict[str, Tuple[int, int]] = {}
+        self.stats = {
+            "executions_sent": 0, "feedback_sent": 0, "dropped": 0, "failed_batches": 0,
+            "dead_lettered": 0,
+        }
+
+    async def __aenter__(self) -> "AsyncAgentGymClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        if self._http is not None:
+            return
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self._transport,
+        )
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._flusher = asyncio.create_task(self._run())
+        if self.spool_path:
+            self._spool = DiskSpool(self.spool_path, self.spool_max_bytes)
+            self._drain_wake = asyncio.Event()
+            # Replay whatever a previous process left behind
+            self._drain_wake.set()
+            self._drainer = asyncio.create_task(self._drain_loop())
+
+    async def close(self) -> None:
+        """Flush everything still queued, then release connections.
+
+        With a spool, records the API did not accept stay on disk.
+        """
+        if self._http is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._flusher
+        if self._drainer is not None:
+            self._drain_wake.set()
+            await self._drainer
+        await self.flush()
+        if self._feedback:
+            # Requeued feedback has no later flush to wait for
+            self.stats["dropped"] += len(self._feedback)
+            logger.warning(f"Dropping {len(self._feedback)} feedback records whose executions were not found")
+            self._feedback.clear()
+        await self._http.aclose()
+        self._http = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    # Buffered writes
+
+    @property
+    def pending(self) -> int:
+        return len(self._executions) + len(self._feedback)
+
+    def _append(self, queue: Deque[Dict[str, Any]], record: Dict[str, Any]) -> None:
+        if self.pending >= self.max_pending:
+            (self._executions or self._feedback).popleft()
+            self.stats["dropped"] += 1
+        queue.append(record)
+        if self._wake is not None and len(queue) >= self.batch_size:
+            self._wake.set()
+
+    def _append_execution(self, record: Dict[str, Any]) -> None:
+        self._append(self._executions, record)
+
+    def _append_feedback(self, record: Dict[str, Any]) -> None:
+        self._append(self._feedback, record)
+
+    def record_execution(self, agent_id: str, input_data: Dict[str, Any], **fields) -> str:
+        """Queue an execution and return its id without waiting on the API"""
+        record = build_execution_record(agent_id, input_data, **fields)
+        self._append_execution(record)
+        return record["id"]
+
+    def submit_feedback(self, execution_id: str, **fields) -> None:
+        """Queue feedback for an execution"""
+        self._append_feedback(build_feedback_record(execution_id, **fields))
+
+    async def flush(self) -> None:
+        """Send everything queued right now"""
+        if self._spool is not None:
+            await self._persist()
+            async with self._flush_lock:
+                await self._drain()
+            return
+        async with self._flush_lock:
+            while self._executions:
+                await self._send(EXECUTIONS, self._take(self._executions))
+            # Feedback whose execution is not in yet waits for the next flush
+            requeue: List[Dict[str, Any]] = []
+            while self._feedback:
+                requeue.extend(await self._send(FEEDBACK, self._take(self._feedback)))
+            self._feedback.extend(requeue)
+
+    def _take(self, queue: Deque[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                if self._spool is None:
+                    await self.flush()
+                else:
+                    await self._persist()
+                    self._drain_wake.set()
+            except Exception as e:
+                logger.error(f"Agent Gym flush failed: {e}")
+
+    async def _persist(self) -> None:
+        """Move queued records into the spool"""
+        for kind, queue in ((EXECUTIONS, self._executions), (FEEDBACK, self._feedback)):
+            records = [queue.popleft() for _ in range(len(queue))]
+            if records:
+                self.stats["dropped"] += await asyncio.to_thread(self._spool.append, kind, records)
+
+    async def _drain_loop(self) -> None:
+        while not self._closing:
+            await self._drain_wake.wait()
+            self._drain_wake.clear()
+            try:
+                async with self._flush_lock:
+                    await self._drain()
+            except Exception as e:
+                logger.error(f"Agent Gym spool drain failed: {e}")
+
+    async def _drain(self) -> None:
+        """Send spooled batches oldest first until empty or the API is unreachable.
+
+        Only records spooled before the drain started are sent, so
+        requeued feedback waits for the next drain.
+        """
+        horizon = await asyncio.to_thread(self._spool.last_seq)
+        for kind in (EXECUTIONS, FEEDBACK):
+            while True:
+                items = await asyncio.to_thread(self._spool.peek, kind, self.batch_size, horizon)
+                if not items:
+                    break
+                seqs = [seq for seq, _ in items]
+                try:
+                    requeue = await self._send(kind, [record for _, record in items])
+                except httpx.HTTPError as e:
+                    if _is_unavailable(e) or not self._give_up(kind, seqs[0]):
+                        logger.warning(f"Agent Gym unavailable, {len(self._spool)} records spooled: {e}")
+                        return
+                    await asyncio.to_thread(self._spool.move, seqs, dead_letter_kind(kind))
+                    self.stats["dead_lettered"] += len(seqs)
+                    logger.error(
+                        f"Moved {len(seqs)} {kind} records to {dead_letter_kind(kind)} after "
+                        f"{self.max_batch_attempts} failed attempts: {e}"
+                    )
+                    continue
+                self._head_failures.pop(kind, None)
+                self.stats["dropped"] += await asyncio.to_thread(self._spool.ack_and_append, seqs, kind, requeue)
+
+    def _give_up(self, kind: str, head_seq: int) -> bool:
+        """Count a failed drain of the batch at ``head_seq``; True once it is out of attempts"""
+        seq, failures = self._head_failures.get(kind, (head_seq, 0))
+        failures = failures + 1 if seq == head_seq else 1
+        if failures >= self.max_batch_attempts:
+            self._head_failures.pop(kind, None)
+            return True
+        self._head_failures[kind] = (head_seq, failures)
+        return False
+
+    async def _send(self, kind: str, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """POST one batch; returns feedback records to send again later.
+
+        Batches the API rejects outright are dropped. Transient failures
+        are dropped too unless a spool can hold them, in which case the
+        error propagates and the batch stays spooled.
+        """
+        try:
+            response = await send_with_retry(
+                lambda: self._http.post(BATCH_PATHS[kind], json=batch), self.retry
+            )
+        except httpx.HTTPError as e:
+            if self._spool is not None and _is_transient(e):
+                raise
+            agents = {record.get("agent_id") for record in batch} if kind == EXECUTIONS else set()
+            if _is_not_found(e) and len(agents) > 1:
+                # One unknown agent fails the whole batch; resend per agent
+                for agent_id in agents:
+                    await self._send(kind, [record for record in batch if record.get("agent_id") == agent_id])
+                return []
+            self.stats["failed_batches"] += 1
+            if _is_not_found(e) and agents:
+                logger.error(f"Dropping {len(batch)} execution records for unknown agent {agents.pop()}: {e}")
+            else:
+                logger.error(f"Dropping {len(batch)} {kind} records: {e}")
+            return []
+
+        if kind == EXECUTIONS:
+            self.stats["executions_sent"] += len(batch)
+            return []
+
+        requeue = []
+        not_found = 0
+        for result in response.json().get("results", []):
+            if result["status"] != "execution_not_found":
+                continue
+            not_found += 1
+            record = batch[result["index"]]
+            record["_requeues"] = record.get("_requeues", 0) + 1
+            if record["_requeues"] <= MAX_FEEDBACK_REQUEUES:
+                requeue.append(record)
+        exhausted = not_found - len(requeue)
+        if exhausted:
+            self.stats["dropped"] += exhausted
+            logger.error(
+                f"Dropping {exhausted} feedback records whose executions were not found "
+                f"after {MAX_FEEDBACK_REQUEUES} retries"
+            )
+        self.stats["feedback_sent"] += len(batch) - not_found
+        return requeue
+
+    # Direct calls
+
+    async def request(self, method: str, path: str, **kwargs) -> Any:
+        await self.start()
+        response = await send_with_retry(lambda: self._http.request(method, path, **kwargs), self.retry)
+        return response.json() if response.content else None
+
+    async def register_agent(
+        self,
+        name: str,
+        description: str = "",
+        model_type: str = "custom",
+        model_config: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return await self.request("POST", "/api/v1/agents/", json={
+            "name": name,
+            "description": description,
+            "model_type": model_type,
+            "model_config": model_config or {},
+        })
+
+    async def get_agent_metrics(self, agent_id: str) -> Dict[str, Any]:
+        return await self.request("GET", f"/api/v1/agents/{agent_id}/metrics")
+
+
+class AgentGymClient:
+    """Synchronous facade over AsyncAgentGymClient.
+
+    The async client runs on a private event-loop thread. Recording
+    executions and feedback hands the record to that thread and returns
+    immediately; direct calls block until the response arrives.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", api_key: Optional[str] = None, **options):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="agent-gym-client", daemon=True)
+        self._thread.start()
+        self._client = AsyncAgentGymClient(base_url, api_key, **options)
+        self._call(self._client.start())
+        atexit.register(self.close)
+
+    def _call(self, coro) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._client.stats)
+
+    def record_execution(self, agent_id: str, input_data: Dict[str, Any], **fields) -> str:
+        record = build_execution_record(agent_id, input_data, **fields)
+        self._loop.call_soon_threadsafe(self._client._append_execution, record)
+        return record["id"]
+
+    def submit_feedback(self, execution_id: str, **fields) -> None:
+        record = build_feedback_record(execution_id, **fields)
+        self._loop.call_soon_threadsafe(self._client._append_feedback, record)
+
+    def flush(self) -> None:
+        self._call(self._client.flush())
+
+    def request(self, method: str, path: str, **kwargs) -> Any:
+        return self._call(self._client.request(method, path, **kwargs))
+
+    def register_agent(self, name: str, description: str = "", **kwargs) -> Dict[str, Any]:
+        return self._call(self._client.register_agent(name, description, **kwargs))
+
+    def get_agent_metrics(self, agent_id: str) -> Dict[str, Any]:
+        return self._call(self._client.get_agent_metrics(agent_id))
+
+    def close(self) -> None:
+        if not self._loop.is_running():
+            return
+        self._call(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        atexit.unregister(self.close)
@@ -0,0 +1,59 @@
+"""
+Retry with exponential backoff and full jitter.
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 0.1
+    max_delay: float = 10.0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number ``attempt`` (1-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    policy: RetryPolicy
+) -> httpx.Response:
+    """Call ``send`` until it succeeds, fails permanently or attempts run out.
+
+    Transport errors and RETRYABLE_STATUS responses are retried; other
+    error responses raise ``httpx.HTTPStatusError`` straight away.
+    """
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            response = await send()
+        except httpx.TransportError:
+            if attempt == policy.max_attempts:
+                raise
+            await asyncio.sleep(policy.backoff(attempt))
+            continue
+
+        if response.status_code in RETRYABLE_STATUS and attempt < policy.max_attempts:
+            await asyncio.sleep(policy.backoff(attempt, _retry_after(response)))
+            continue
+        response.raise_for_status()
+        return response
+    raise RuntimeError("unreachable")
@@ -0,0 +1,164 @@
+"""
+Durable on-disk spool for records waiting to be sent.
+
+A single SQLite database in WAL mode used as a FIFO: records are appended
+with an increasing sequence number, read oldest first and deleted once
+the server has accepted them. Anything still spooled when the process
+exits is replayed by the next client that opens the same file. One spool
+file should be owned by one client at a time.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_CHUNK = 1000
+ACK_CHUNK = 500
+MAX_SEQ = 2 ** 63 - 1
+
+
+class DiskSpool:
+    """FIFO of JSON records per ``kind``, capped at ``max_bytes`` of payload.
+
+    When an append would exceed the cap the oldest records (of any kind)
+    are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "kind TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_spool_kind_seq ON spool (kind, seq)")
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM spool").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def append(self, kind: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Durably append records; returns how many old records were evicted"""
+        return self.ack_and_append((), kind, records)
+
+    def ack_and_append(self, seqs: Iterable[int], kind: str, records: Iterable[Dict[str, Any]]) -> int:
+        """``ack(seqs)`` and ``append(kind, records)`` in one transaction.
+
+        Used to re-file records that must be sent again, so a crash can
+        neither lose them nor leave both copies spooled. Returns how many
+        old records were evicted.
+        """
+        seqs = list(seqs)
+        rows = []
+        for record in records:
+            payload = json.dumps(record, default=str)
+            rows.append((kind, payload, len(payload)))
+        if not rows and not seqs:
+            return 0
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(seqs)
+                self._db.executemany("INSERT INTO spool (kind, payload, size) VALUES (?, ?, ?)", rows)
+                self._bytes += sum(row[2] for row in rows)
+                evicted = self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM spool").fetchone()[0]
+                raise
+        self.evicted += evicted
+        return evicted
+
+    def _evict(self) -> int:
+        evicted = 0
+        while self._bytes > self.max_bytes:
+            oldest = self._db.execute(
+                "SELECT seq, size FROM spool ORDER BY seq LIMIT ?", (EVICT_CHUNK,)
+            ).fetchall()
+            if not oldest:
+                break
+            # Drop only as many as needed to get back under the cap
+            excess = self._bytes - self.max_bytes
+            cut = 0
+            for seq, size in oldest:
+                cut += 1
+                excess -= size
+                if excess <= 0:
+                    break
+            self._db.execute("DELETE FROM spool WHERE seq <= ?", (oldest[cut - 1][0],))
+            self._bytes -= sum(size for _, size in oldest[:cut])
+            evicted += cut
+        return evicted
+
+    def last_seq(self) -> int:
+        """Sequence number of the newest record, or 0 when empty"""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM spool").fetchone()[0]
+
+    def peek(self, kind: str, limit: int, max_seq: Optional[int] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """Oldest ``limit`` records of ``kind`` as (seq, record), without removing them.
+
+        With ``max_seq``, records appended after that sequence number are
+        left out.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, payload FROM spool WHERE kind = ? AND seq <= ? ORDER BY seq LIMIT ?",
+                (kind, max_seq if max_seq is not None else MAX_SEQ, limit)
+            ).fetchall()
+        return [(seq, json.loads(payload)) for seq, payload in rows]
+
+    def ack(self, seqs: Iterable[int]) -> None:
+        """Delete records that no longer need sending"""
+        self.ack_and_append(seqs, "", ())
+
+    def _delete(self, seqs: List[int]) -> None:
+        # Stay under SQLite's bound-parameter limit on older builds
+        for start in range(0, len(seqs), ACK_CHUNK):
+            chunk = seqs[start:start + ACK_CHUNK]
+            where = f"seq IN ({','.join('?' * len(chunk))})"
+            self._bytes -= self._db.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM spool WHERE {where}", chunk
+            ).fetchone()[0]
+            self._db.execute(f"DELETE FROM spool WHERE {where}", chunk)
+
+    def move(self, seqs: Iterable[int], kind: str) -> None:
+        """Re-file records under another ``kind`` (e.g. a dead-letter kind)"""
+        seqs = list(seqs)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            for start in range(0, len(seqs), ACK_CHUNK):
+                chunk = seqs[start:start + ACK_CHUNK]
+                self._db.execute(
+                    f"UPDATE spool SET kind = ? WHERE seq IN ({','.join('?' * len(chunk))})", [kind, *chunk]
+                )
+            self._db.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
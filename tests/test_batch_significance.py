@@ -0,0 +1,41 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.batch_significance import analyze_pairs, select_winners
+from utils.significance import compare_proportions
+
+
+def test_matches_scalar_comparison() -> None:
+    pairs = [(500, 1000, 540, 1000), (500, 5000, 650, 5000), (20, 200, 25, 300)]
+    result = analyze_pairs(*map(np.array, zip(*pairs)), resamples=500, seed=1)
+
+    for i, pair in enumerate(pairs):
+        expected = compare_proportions(*pair)
+        assert result["lift"][i] == pytest.approx(expected["lift"])
+        assert result["p_value"][i] == pytest.approx(expected["p_value"], abs=1e-6)
+        assert result["sequential_p_value"][i] == pytest.approx(expected["sequential_p_value"])
+        assert result["lift_low"][i] < expected["lift"] < result["lift_high"][i]
+
+
+def test_missing_data_is_nan() -> None:
+    result = analyze_pairs(np.array([0, 0]), np.array([0, 100]), np.array([5, 0]), np.array([10, 100]))
+    assert np.isnan(result["p_value"]).all()
+
+
+def test_select_winners_per_test() -> None:
+    # Test 0: pair 1 clearly wins; test 1: baseline wins; test 2: undecided
+    pair_test = np.array([0, 0, 1, 2])
+    difference = np.array([0.01, 0.05, -0.04, 0.001])
+    sequential = np.array([0.5, 0.001, 0.002, 0.9])
+    result = select_winners(
+        pair_test, difference, sequential,
+        challengers=np.array([2, 1, 1]),
+        current_confidence=np.array([np.nan, 0.0, 0.9]),
+        alpha=0.05
+    )
+
+    assert result["winner_pair"].tolist() == [1, -1, -2]
+    assert result["confidence"][0] == pytest.approx(0.998)
+    # Confidence never drops below what was already recorded
+    assert result["confidence"][2] == pytest.approx(0.9)
@@ -0,0 +1,26 @@
+import time
+
+from utils.cache import TTLCache
+
+
+def test_entries_expire_and_invalidate() -> None:
+    cache = TTLCache(ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("b")
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_lru_eviction() -> None:
+    cache = TTLCache(ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
@@ -0,0 +1,187 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from agent_gym_client import AsyncAgentGymClient, RetryPolicy
+from agent_gym_client.client import MAX_FEEDBACK_REQUEUES
+
+
+def test_batches_executions_then_feedback() -> None:
+    posts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        posts.append((request.url.path, len(batch)))
+        if request.url.path.endswith("/feedback/batch"):
+            results = [
+                {"index": i, "execution_id": item["execution_id"], "status": "created"}
+                for i, item in enumerate(batch)
+            ]
+            return httpx.Response(200, json={"results": results})
+        return httpx.Response(201, json={"inserted": len(batch), "execution_ids": []})
+
+    async def run() -> AsyncAgentGymClient:
+        client = AsyncAgentGymClient(
+            batch_size=2, flush_interval=60, transport=httpx.MockTransport(handler)
+        )
+        async with client:
+            ids = [client.record_execution("agent", {"q": i}) for i in range(3)]
+            client.submit_feedback(ids[0], rating=5)
+        return client
+
+    client = asyncio.run(run())
+
+    assert posts == [
+        ("/api/v1/agents/executions/batch", 2),
+        ("/api/v1/agents/executions/batch", 1),
+        ("/api/v1/feedback/batch", 1),
+    ]
+    assert client.stats["executions_sent"] == 3
+    assert client.stats["feedback_sent"] == 1
+
+
+def test_retries_retryable_status() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"id": "agent"})
+
+    async def run() -> dict:
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+        async with AsyncAgentGymClient(retry=policy, transport=httpx.MockTransport(handler)) as client:
+            return await client.get_agent_metrics("agent")
+
+    assert asyncio.run(run()) == {"id": "agent"}
+    assert len(calls) == 3
+
+
+def test_backoff_is_capped() -> None:
+    policy = RetryPolicy(base_delay=1.0, max_delay=2.0)
+    assert all(0 <= policy.backoff(10) <= 2.0 for _ in range(100))
+    assert policy.backoff(1, retry_after=30) == 2.0
+
+
+def test_spool_holds_records_through_outage(tmp_path) -> None:
+    up = {"value": False}
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not up["value"]:
+            return httpx.Response(503)
+        received.extend(json.loads(request.content))
+        return httpx.Response(201, json={"inserted": 0, "execution_ids": []})
+
+    def client() -> AsyncAgentGymClient:
+        return AsyncAgentGymClient(
+            flush_interval=60,
+            retry=RetryPolicy(max_attempts=1),
+            transport=httpx.MockTransport(handler),
+            spool_path=str(tmp_path / "spool.db"),
+        )
+
+    async def while_down() -> None:
+        async with client() as gym:
+            gym.record_execution("agent", {"q": 1})
+            gym.record_execution("agent", {"q": 2})
+
+    async def after_restart() -> None:
+        async with client():
+            pass
+
+    asyncio.run(while_down())
+    assert received == []
+
+    up["value"] = True
+    asyncio.run(after_restart())
+    assert [record["input_data"]["q"] for record in received] == [1, 2]
+
+
+def test_failing_batch_is_dead_lettered(tmp_path) -> None:
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        if batch[0]["input_data"]["q"] == "poison":
+            return httpx.Response(500)
+        received.extend(batch)
+        return httpx.Response(201, json={"inserted": len(batch), "execution_ids": []})
+
+    async def run() -> AsyncAgentGymClient:
+        gym = AsyncAgentGymClient(
+            batch_size=1,
+            flush_interval=60,
+            retry=RetryPolicy(max_attempts=1),
+            transport=httpx.MockTransport(handler),
+            spool_path=str(tmp_path / "spool.db"),
+            max_batch_attempts=2,
+        )
+        async with gym:
+            gym.record_execution("agent", {"q": "poison"})
+            gym.record_execution("agent", {"q": "fine"})
+            await gym.flush()
+            await gym.flush()
+            assert gym._spool.count("execution.dead") == 1
+        return gym
+
+    gym = asyncio.run(run())
+    assert [record["input_data"]["q"] for record in received] == ["fine"]
+    assert gym.stats["dead_lettered"] == 1
+
+
+def test_unfound_feedback_waits_for_next_flush_then_is_dropped() -> None:
+    feedback_posts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        if request.url.path.endswith("/feedback/batch"):
+            feedback_posts.append(len(batch))
+            results = [
+                {"index": i, "execution_id": item["execution_id"], "status": "execution_not_found"}
+                for i, item in enumerate(batch)
+            ]
+            return httpx.Response(200, json={"results": results})
+        return httpx.Response(201, json={"inserted": len(batch), "execution_ids": []})
+
+    async def run() -> AsyncAgentGymClient:
+        gym = AsyncAgentGymClient(flush_interval=60, transport=httpx.MockTransport(handler))
+        async with gym:
+            gym.submit_feedback("missing", rating=1)
+            await gym.flush()
+            assert feedback_posts == [1]
+            for _ in range(MAX_FEEDBACK_REQUEUES):
+                await gym.flush()
+        return gym
+
+    gym = asyncio.run(run())
+    assert len(feedback_posts) == MAX_FEEDBACK_REQUEUES + 1
+    assert gym.stats["feedback_sent"] == 0
+    assert gym.stats["dropped"] == 1
+
+
+def test_unknown_agent_only_drops_its_own_executions() -> None:
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        if any(record["agent_id"] == "ghost" for record in batch):
+            return httpx.Response(404, json={"detail": "Agent not found: ghost"})
+        received.extend(batch)
+        return httpx.Response(201, json={"inserted": len(batch), "execution_ids": []})
+
+    async def run() -> AsyncAgentGymClient:
+        async with AsyncAgentGymClient(flush_interval=60, transport=httpx.MockTransport(handler)) as gym:
+            gym.record_execution("agent", {"q": 1})
+            gym.record_execution("ghost", {"q": 2})
+            gym.record_execution("agent", {"q": 3})
+        return gym
+
+    gym = asyncio.run(run())
+    assert [record["input_data"]["q"] for record in received] == [1, 3]
+    assert gym.stats["executions_sent"] == 2
+    assert gym.stats["failed_batches"] == 1
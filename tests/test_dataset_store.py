@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import JSON, Column, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from config import settings
+from services.dataset_store import DatasetWriter, empty_manifest, iter_examples, read_page
+
+Base = declarative_base()
+
+
+class Dataset(Base):
+    __tablename__ = "datasets"
+
+    id = Column(String, primary_key=True)
+    manifest = Column(JSON)
+
+
+def test_appending_to_a_loaded_manifest_is_saved(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Dataset(id="d1", manifest=empty_manifest()))
+        db.commit()
+
+    for run in range(2):
+        with Session(engine) as db:
+            dataset = db.get(Dataset, "d1")
+            writer = DatasetWriter(dataset.id, manifest=dataset.manifest)
+            writer.extend({"run": run, "i": i} for i in range(5))
+            dataset.manifest = writer.close()
+            db.commit()
+
+    with Session(engine) as db:
+        manifest = db.get(Dataset, "d1").manifest
+
+    assert manifest["total_rows"] == 10
+    assert [chunk["path"].rsplit("/", 1)[-1] for chunk in manifest["chunks"]] == [
+        "part-00000.parquet", "part-00001.parquet"
+    ]
+    assert [example["run"] for example in read_page(manifest, 0, 10)] == [0] * 5 + [1] * 5
+
+
+def test_pages_span_row_groups_and_chunks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    writer = DatasetWriter("d2", chunk_rows=25, row_group_rows=10)
+    writer.extend({"i": i} for i in range(60))
+    manifest = writer.close()
+
+    assert [chunk["rows"] for chunk in manifest["chunks"]] == [25, 25, 10]
+    assert [example["i"] for example in read_page(manifest, 18, 15)] == list(range(18, 33))
+    assert [example["i"] for example in read_page(manifest, 55, 100)] == list(range(55, 60))
+    assert read_page(manifest, 60, 10) == []
+    assert [example["i"] for example in iter_examples(manifest)] == list(range(60))
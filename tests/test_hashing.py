@@ -0,0 +1,23 @@
+from utils.hashing import SetHash, content_hash
+
+
+def test_content_hash_ignores_formatting() -> None:
+    a = content_hash({"q": "Where is  my order?", "lang": "en"}, {"answer": " Shipped "})
+    b = content_hash({"lang": "en", "q": "Where is my order?\n"}, {"answer": "Shipped"})
+
+    assert a == b
+    assert a != content_hash({"q": "Where is my order?"}, {"answer": "Shipped"})
+
+
+def test_set_hash_is_incremental_and_order_independent() -> None:
+    digests = [content_hash({"i": i}, {"o": i}) for i in range(100)]
+    forward, backward = SetHash(), SetHash()
+    forward.update(digests)
+    backward.update(reversed(digests))
+
+    resumed = SetHash()
+    resumed.update(digests[:40])
+    resumed = SetHash.from_hexdigest(resumed.hexdigest())
+    resumed.update(digests[40:])
+
+    assert forward.hexdigest() == backward.hexdigest() == resumed.hexdigest()
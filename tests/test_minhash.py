@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.minhash import LSHIndex, MinHasher, shingles, similarity
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi omicron pi rho sigma".split()
+
+
+def test_normalization_ignores_key_order_case_and_punctuation() -> None:
+    a = {"query": "Book a table  for two!", "party_size": 2}
+    b = {"party_size": 2, "query": "book a TABLE for two"}
+
+    assert shingles(a) == shingles(b)
+    assert shingles({}) == {""}
+
+
+def test_keys_do_not_count_towards_similarity() -> None:
+    assert shingles({"query": "weather in paris", "session": {"user": 1}}) == shingles(
+        {"q": "weather in paris", "s": {"id": 1}}
+    )
+    assert not shingles({"query": "weather", "user": 1}) & shingles({"query": "stocks", "user": 2})
+
+
+def test_signature_similarity_tracks_jaccard() -> None:
+    hasher = MinHasher()
+    base = {"query": " ".join(WORDS)}
+    edited = {"query": " ".join(WORDS[:-1] + ["changed"])}
+    other = {"request": "something else entirely"}
+
+    exact = len(shingles(base) & shingles(edited)) / len(shingles(base) | shingles(edited))
+    assert abs(similarity(hasher.signature_of(base), hasher.signature_of(edited)) - exact) < 0.15
+    assert similarity(hasher.signature_of(base), hasher.signature_of(other)) < 0.2
+
+
+def test_index_finds_near_duplicates_only() -> None:
+    hasher = MinHasher()
+    rng = random.Random(0)
+    index = LSHIndex()
+    inputs = {i: {"q": " ".join(rng.choice(WORDS) for _ in range(20)), "n": i} for i in range(500)}
+    for key, value in inputs.items():
+        index.add(key, hasher.signature_of(value))
+
+    probe = dict(inputs[42], q=inputs[42]["q"].upper() + " ")
+    matches = index.query(hasher.signature_of(probe), threshold=0.8)
+
+    assert matches[0] == (42, 1.0)
+    assert all(score >= 0.8 for _, score in matches)
+    assert index.add_unless_duplicate("copy", hasher.signature_of(probe), 0.8) == 42
+    assert "copy" not in index
+
+
+def test_index_remove_and_eviction() -> None:
+    hasher = MinHasher()
+    index = LSHIndex(max_items=2)
+    signatures = [hasher.signature_of({"q": word}) for word in WORDS[:3]]
+    for key, signature in enumerate(signatures):
+        index.add(key, signature)
+
+    assert len(index) == 2 and 0 not in index
+    assert index.find_duplicate(signatures[0], 0.8) is None
+
+    index.remove(1)
+    assert index.query(signatures[1], 0.5) == []
+    assert index.query(signatures[2], 0.5) == [(2, 1.0)]
+
+    with pytest.raises(ValueError):
+        LSHIndex(num_perm=128, bands=10)
+
+
+def test_index_consistent_across_resorts_and_slot_reuse() -> None:
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 1 << 32, size=(3000, 128), dtype=np.uint64).astype(np.uint32)
+    index = LSHIndex(max_items=1500)
+    for key, signature in enumerate(signatures):
+        index.add(key, signature)
+    index.remove(2999)
+
+    assert len(index) == 1499
+    for key in (1500, 2200, 2998):
+        assert index.query(signatures[key], 0.8) == [(key, 1.0)]
+    assert index.query(signatures[10], 0.8) == []
+    assert index.find_duplicate(signatures[2999], 0.8) is None
@@ -0,0 +1,49 @@
+import random
+import statistics
+
+from utils.online_stats import RunningStats, VariantStats
+from utils.significance import compare_proportions, msprt_p_value
+
+
+def test_running_stats_match_batch_and_merge_exactly() -> None:
+    rng = random.Random(7)
+    values = [rng.gauss(100, 15) for _ in range(1000)]
+    whole, left, right = RunningStats(), RunningStats(), RunningStats()
+    for v in values:
+        whole.add(v)
+    for v in values[:300]:
+        left.add(v)
+    for v in values[300:]:
+        right.add(v)
+    left.merge(right)
+
+    assert abs(whole.mean - statistics.fmean(values)) < 1e-9
+    assert abs(whole.variance - statistics.variance(values)) < 1e-6
+    assert left.count == whole.count
+    assert abs(left.mean - whole.mean) < 1e-9
+    assert abs(left.m2 - whole.m2) < 1e-6
+
+
+def test_variant_stats_round_trip_through_result_row() -> None:
+    stats = VariantStats()
+    stats.add_execution(True, 120, 0.01)
+    stats.add_execution(False, 80, None)
+    stats.add_rating(4)
+
+    restored = VariantStats.from_result(stats.executions, stats.successes, stats.to_metrics())
+    assert restored.success_rate == 0.5
+    assert restored.execution_time.mean == 100
+    assert restored.cost.count == 1
+    assert restored.rating.mean == 4
+
+
+def test_sequential_p_value_is_conservative_and_detects_effects() -> None:
+    no_effect = compare_proportions(500, 1000, 500, 1000)
+    effect = compare_proportions(500, 5000, 650, 5000)
+
+    assert no_effect["sequential_p_value"] == 1.0
+    assert effect["p_value"] < 0.01
+    assert effect["sequential_p_value"] >= effect["p_value"]
+    assert effect["sequential_p_value"] < 0.05
+    assert compare_proportions(0, 0, 1, 10) is None
+    assert msprt_p_value(0.0, 0.001, 0.05) == 1.0
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+from utils.pagination import decode_cursor, encode_cursor, paginate, set_next_cursor
+
+
+def test_cursor_round_trip() -> None:
+    created_at = datetime(2024, 1, 20, 23, 15, 0, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, "exec-1")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, "exec-1")
+
+
+def test_malformed_cursor_rejected() -> None:
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_paginate_uses_cursor_or_offset() -> None:
+    table = Table("rows", MetaData(), Column("id", String), Column("created_at", DateTime))
+    cursor = encode_cursor(datetime(2024, 1, 20, tzinfo=timezone.utc), "row-1")
+
+    keyset = str(paginate(select(table), table.c.created_at, table.c.id, cursor, 0))
+    offset = str(paginate(select(table), table.c.created_at, table.c.id, None, 20))
+
+    assert "(rows.created_at, rows.id) <" in keyset and "OFFSET" not in keyset
+    assert "OFFSET" in offset and "ORDER BY rows.created_at DESC, rows.id DESC" in offset
+
+
+def test_next_cursor_header_only_on_full_pages() -> None:
+    class Row:
+        created_at = datetime(2024, 1, 20, tzinfo=timezone.utc)
+        id = "row-1"
+
+    class Response:
+        def __init__(self) -> None:
+            self.headers = {}
+
+    full, partial = Response(), Response()
+    set_next_cursor(full, [Row()], limit=1)
+    set_next_cursor(partial, [Row()], limit=2)
+
+    assert decode_cursor(full.headers["X-Next-Cursor"]) == (Row.created_at, "row-1")
+    assert partial.headers == {}
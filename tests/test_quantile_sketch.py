@@ -0,0 +1,36 @@
+import random
+
+from utils.quantile_sketch import QuantileSketch
+
+
+def test_quantiles_within_relative_accuracy() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(5, 1) for _ in range(20000)]
+    sketch = QuantileSketch(0.01)
+    sketch.update(values)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.011 * exact
+
+
+def test_merge_matches_single_sketch() -> None:
+    left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in range(1, 1001):
+        (left if value % 2 else right).add(value)
+        whole.add(value)
+    left.merge(right)
+
+    assert left.count == whole.count
+    assert left.quantile(0.99) == whole.quantile(0.99)
+
+
+def test_round_trip_and_zeros() -> None:
+    sketch = QuantileSketch()
+    sketch.update([0, 0, 0, 10])
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+
+    assert restored.quantile(0.5) == 0.0
+    assert restored.quantile(1.0) == sketch.quantile(1.0)
+    assert QuantileSketch().quantile(0.5) is None
@@ -0,0 +1,34 @@
+import random
+
+from utils.scenario_mutations import EDGE_MUTATIONS, mutable_paths, mutate_json
+
+SEED = {
+    "query": "book a table for two at seven",
+    "party_size": 2,
+    "options": ["window", "quiet"],
+    "flags": {"vip": True, "notes": "no nuts please"},
+}
+
+
+def test_mutations_are_reproducible_and_leave_the_seed_alone() -> None:
+    original = repr(SEED)
+    first = [mutate_json(SEED, random.Random(f"run:{i}")) for i in range(50)]
+    second = [mutate_json(SEED, random.Random(f"run:{i}")) for i in range(50)]
+
+    assert first == second
+    assert repr(SEED) == original
+    assert all(1 <= len(applied) <= 3 for _, applied in first)
+    assert sum(variant != SEED for variant, _ in first) >= 45
+
+
+def test_mutations_cover_edge_cases() -> None:
+    rng = random.Random(0)
+    applied = {name for _ in range(500) for name in mutate_json(SEED, rng)[1]}
+
+    assert EDGE_MUTATIONS <= applied
+    assert {"typo", "jitter", "shuffle_list"} <= applied
+
+
+def test_booleans_and_nulls_are_not_mutated() -> None:
+    assert mutable_paths({"a": True, "b": None}) == [()]
+    assert mutate_json(True, random.Random(1)) == (True, [])
@@ -0,0 +1,16 @@
+from utils.scheduling import admit
+
+
+def test_admit_respects_group_and_global_caps() -> None:
+    candidates = [("a1", "org-a"), ("a2", "org-a"), ("a3", "org-a"), ("b1", "org-b"), ("c1", "org-c")]
+
+    assert admit(candidates, {"org-a": 1}, free_slots=10, per_group_cap=2) == ["a1", "b1", "c1"]
+    assert admit(candidates, {}, free_slots=3, per_group_cap=2) == ["a1", "a2", "b1"]
+    assert admit(candidates, {}, free_slots=0, per_group_cap=2) == []
+
+
+def test_ungrouped_jobs_only_use_the_global_budget() -> None:
+    candidates = [("x1", None), ("x2", None), ("x3", None), ("a1", "org-a")]
+
+    assert admit(candidates, {"org-a": 5}, free_slots=3, per_group_cap=1) == ["x1", "x2", "x3"]
+    assert admit(candidates, {"org-a": 0}, free_slots=4, per_group_cap=1) == ["x1", "x2", "x3", "a1"]
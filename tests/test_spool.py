@@ -0,0 +1,46 @@
+import pytest
+
+# Importing the package pulls in the HTTP client
+pytest.importorskip("httpx")
+
+from agent_gym_client.spool import DiskSpool
+
+
+def test_fifo_ack_and_replay(tmp_path) -> None:
+    path = str(tmp_path / "spool.db")
+    spool = DiskSpool(path)
+    spool.append("execution", [{"n": i} for i in range(5)])
+    spool.append("feedback", [{"n": 0}])
+
+    items = spool.peek("execution", 3)
+    assert [record["n"] for _, record in items] == [0, 1, 2]
+    spool.ack(seq for seq, _ in items)
+    spool.close()
+
+    reopened = DiskSpool(path)
+    assert [record["n"] for _, record in reopened.peek("execution", 10)] == [3, 4]
+    assert reopened.count("feedback") == 1
+    assert reopened.size_bytes > 0
+
+
+def test_evicts_oldest_over_cap(tmp_path) -> None:
+    spool = DiskSpool(str(tmp_path / "spool.db"), max_bytes=100)
+    evicted = spool.append("execution", [{"n": i, "pad": "x" * 10} for i in range(10)])
+
+    remaining = [record["n"] for _, record in spool.peek("execution", 10)]
+    assert evicted == 10 - len(remaining)
+    assert remaining == list(range(10 - len(remaining), 10))
+    assert spool.size_bytes <= 100
+
+
+def test_ack_and_append_refiles_records_atomically(tmp_path) -> None:
+    spool = DiskSpool(str(tmp_path / "spool.db"))
+    spool.append("feedback", [{"n": 0}, {"n": 1}])
+    items = spool.peek("feedback", 10)
+    size = spool.size_bytes
+
+    spool.ack_and_append([seq for seq, _ in items], "feedback", [{"n": 1}])
+
+    assert [record["n"] for _, record in spool.peek("feedback", 10)] == [1]
+    assert spool.size_bytes < size
+    assert spool.peek("feedback", 10)[0][0] > items[-1][0]
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from utils.sweeps import best_trial, rung_milestones, sample_configs, survives_rung, validate_space
+
+SPACE = {
+    "learning_rate": {"type": "loguniform", "low": 1e-4, "high": 1e-1},
+    "batch_size": {"type": "choice", "values": [16, 32, 64]},
+    "warmup": {"type": "int", "low": 0, "high": 10},
+    "epochs": 27,
+}
+
+
+def test_sampling_is_seeded_and_within_bounds() -> None:
+    configs = sample_configs(SPACE, 200, seed=7)
+
+    assert configs == sample_configs(SPACE, 200, seed=7)
+    assert all(1e-4 <= c["learning_rate"] <= 1e-1 for c in configs)
+    assert {c["batch_size"] for c in configs} == {16, 32, 64}
+    assert all(isinstance(c["warmup"], int) and 0 <= c["warmup"] <= 10 for c in configs)
+    assert all(c["epochs"] == 27 for c in configs)
+
+
+def test_validate_space_rejects_bad_specs() -> None:
+    validate_space(SPACE)
+    for bad in (
+        {"x": {"type": "normal"}},
+        {"x": {"type": "choice", "values": []}},
+        {"x": {"type": "uniform", "low": 2, "high": 1}},
+        {"x": {"type": "loguniform", "low": 0, "high": 1}},
+    ):
+        with pytest.raises(ValueError):
+            validate_space(bad)
+
+
+def test_rung_milestones() -> None:
+    assert rung_milestones(1, 27, 3) == [1, 3, 9]
+    assert rung_milestones(2, 16, 2) == [2, 4, 8]
+    assert rung_milestones(5, 5, 3) == []
+
+
+def test_only_the_top_fraction_survives_a_rung() -> None:
+    # Too few trials at the rung to judge yet
+    assert survives_rung([5.0], 5.0, 3)
+    assert survives_rung([1.0, 5.0], 5.0, 3)
+
+    recorded = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert survives_rung(recorded, 2.0, 3)
+    assert not survives_rung(recorded, 3.0, 3)
+    assert survives_rung(recorded, 5.0, 3, mode="max")
+    assert not survives_rung(recorded + [math.nan], math.nan, 3)
+
+
+def test_best_trial_skips_missing_and_diverged() -> None:
+    results = {"a": 0.5, "b": 0.2, "c": None, "d": math.inf}
+
+    assert best_trial(results) == "b"
+    assert best_trial(results, mode="max") == "a"
+    assert best_trial({"c": None}) is None
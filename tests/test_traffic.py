@@ -0,0 +1,47 @@
+from collections import Counter
+
+from utils.traffic import WeightedSplit
+
+
+def test_assignment_is_stable_and_weighted() -> None:
+    split = WeightedSplit("test-1", [("a", 0.2), ("b", 0.8)])
+    again = WeightedSplit("test-1", [("a", 0.2), ("b", 0.8)])
+    keys = [f"user-{i}" for i in range(20000)]
+
+    assert [split.pick(k) for k in keys] == [again.pick(k) for k in keys]
+    counts = Counter(split.pick(k) for k in keys)
+    assert abs(counts["a"] / len(keys) - 0.2) < 0.02
+
+
+def test_salts_are_independent_and_zero_weight_is_skipped() -> None:
+    one = WeightedSplit("test-1", [("a", 0.5), ("b", 0.5)])
+    two = WeightedSplit("test-2", [("a", 0.5), ("b", 0.5)])
+    keys = [f"user-{i}" for i in range(2000)]
+    agreement = sum(one.pick(k) == two.pick(k) for k in keys) / len(keys)
+
+    assert 0.4 < agreement < 0.6
+    assert WeightedSplit("t", [("off", 0), ("on", 1)]).arms == ["on"]
+
+
+def test_growing_an_arm_only_moves_subjects_into_it() -> None:
+    before = WeightedSplit("t", [("a", 0.1), ("b", 0.3), ("c", 0.6)])
+    after = WeightedSplit("t", [("a", 0.4), ("b", 0.2), ("c", 0.4)])
+    keys = [f"user-{i}" for i in range(20000)]
+
+    moved = 0
+    for key in keys:
+        old, new = before.pick(key), after.pick(key)
+        if old != new:
+            assert new == "a"
+            moved += 1
+    counts = Counter(after.pick(k) for k in keys)
+    assert abs(counts["b"] / len(keys) - 0.2) < 0.02
+    assert abs(moved / len(keys) - 0.3) < 0.02
+
+
+def test_adding_an_arm_only_takes_subjects_from_others() -> None:
+    before = WeightedSplit("t", [("a", 1), ("b", 1)])
+    after = WeightedSplit("t", [("a", 1), ("b", 1), ("c", 2)])
+
+    for key in (f"user-{i}" for i in range(5000)):
+        assert after.pick(key) in (before.pick(key), "c")
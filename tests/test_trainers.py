@@ -0,0 +1,50 @@
+import json
+import os
+import queue
+
+import pytest
+
+from config import settings
+from services.trainers import dummy_trainer, run_trainer
+
+TRAINER = "services.trainers:dummy_trainer"
+
+
+def job(**hyperparameters):
+    params = {"examples": 64, "features": 4, **hyperparameters}
+    return {"id": "job-1", "training_dataset_id": "dataset-1", "hyperparameters": params}
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+
+
+def test_dummy_trainer_reports_every_epoch_and_saves_weights() -> None:
+    reports = []
+    result = dummy_trainer(job(epochs=4, learning_rate=0.05), lambda step, metrics: reports.append((step, metrics)) or True)
+
+    assert [step for step, _ in reports] == [1, 2, 3, 4]
+    assert reports[-1][1]["loss"] < reports[0][1]["loss"]
+    assert result["metrics"] == {"loss": reports[-1][1]["loss"], "epochs": 4}
+    with open(os.path.join(result["model_path"], "weights.json")) as f:
+        assert len(json.load(f)["weights"]) == 4
+
+
+def test_run_trainer_forwards_reports_and_stops_on_the_flag() -> None:
+    events = queue.Queue()
+    outcome = run_trainer(TRAINER, job(epochs=5), events, {"job-1": True})
+
+    assert outcome["stopped"]
+    assert "error" not in outcome
+    assert [entry["step"] for entry in outcome["history"]] == [1]
+    assert outcome["result"]["metrics"]["epochs"] == 1
+    assert events.get_nowait()[:2] == ("job-1", 1)
+
+
+def test_run_trainer_returns_divergence_as_an_error() -> None:
+    outcome = run_trainer(TRAINER, job(epochs=100, learning_rate=100.0), queue.Queue(), {})
+
+    assert "result" not in outcome
+    assert outcome["error"].startswith("ValueError: Training diverged")
+    assert not outcome["stopped"]